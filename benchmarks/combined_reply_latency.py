@@ -0,0 +1,71 @@
+"""Compare chat handler latency with and without the combined intent+reply call.
+
+Replays a recorded mix of DMs through ``main._make_chat_handler`` with an
+AI client that sleeps for a fixed per-call latency, once with the legacy
+parse-then-reply path and once with the combined schema.
+
+    uv run python -m benchmarks.combined_reply_latency --ai-latency 0.4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any
+
+import main
+from benchmarks.fakes import (
+    RECORDED_MESSAGES,
+    FakeAIClient,
+    FakeChatClient,
+    FakeChatMessage,
+    FakeMailClient,
+    Latency,
+)
+from benchmarks.stats import summary
+
+
+async def _run_mode(combined: bool, latency: float, rounds: int) -> dict[str, Any]:
+    ai_client = FakeAIClient(Latency(a=latency))
+    main._COMBINED_REPLY = combined
+    main._STREAM_REPLIES = True
+    main.ai_client_api.get_ai_client = lambda: ai_client
+    main._get_mail_client = lambda user_id: FakeMailClient()
+    handler = main._make_chat_handler(FakeChatClient())
+
+    chat: list[float] = []
+    commands: list[float] = []
+    for _ in range(rounds):
+        for content, command in RECORDED_MESSAGES:
+            started = time.perf_counter()
+            await handler(FakeChatMessage("1", "bench-channel", "bench-user", content))
+            (commands if command else chat).append(time.perf_counter() - started)
+    return {
+        "ai_calls": ai_client.calls,
+        "chit_chat": summary(chat),
+        "commands": summary(commands),
+        "all": summary(chat + commands),
+    }
+
+
+async def _run(latency: float, rounds: int) -> dict[str, Any]:
+    return {
+        "ai_latency_s": latency,
+        "messages": len(RECORDED_MESSAGES) * rounds,
+        "before_two_calls": await _run_mode(False, latency, rounds),
+        "after_combined": await _run_mode(True, latency, rounds),
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ai-latency", type=float, default=0.4, help="seconds per AI call")
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(_run(args.ai_latency, args.rounds)), indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,85 @@
+"""Timing and allocation fixture for the pytest microbenchmarks.
+
+Microbenchmarks are skipped unless SMART_CHAT_BOT_BENCHMARKS=1; set
+SMART_CHAT_BOT_BENCH_OUT to also write the results as JSON.
+
+    SMART_CHAT_BOT_BENCHMARKS=1 uv run pytest benchmarks -m benchmark --no-cov
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import pytest
+
+ENABLED = os.environ.get("SMART_CHAT_BOT_BENCHMARKS") == "1"
+
+_results: list[BenchResult] = []
+
+
+@dataclass
+class BenchResult:
+    name: str
+    rounds: int
+    mean_us: float
+    min_us: float
+    stdev_us: float
+    peak_alloc_kb: float
+
+
+def _peak_allocation(func: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        func()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def bench(request: pytest.FixtureRequest) -> Iterator[Callable[..., BenchResult]]:
+    """Run a callable repeatedly for ``min_time`` seconds and record its cost."""
+
+    def _run(func: Callable[[], Any], *, min_time: float = 0.2, max_rounds: int = 10_000) -> BenchResult:
+        func()  # Warm caches and imports outside the measurement.
+        timings: list[float] = []
+        deadline = time.perf_counter() + min_time
+        while len(timings) < max_rounds and (len(timings) < 3 or time.perf_counter() < deadline):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        result = BenchResult(
+            name=request.node.name,
+            rounds=len(timings),
+            mean_us=round(statistics.fmean(timings) * 1e6, 1),
+            min_us=round(min(timings) * 1e6, 1),
+            stdev_us=round(statistics.pstdev(timings) * 1e6, 1),
+            peak_alloc_kb=round(_peak_allocation(func) / 1024, 1),
+        )
+        _results.append(result)
+        return result
+
+    yield _run
+
+
+def pytest_terminal_summary(terminalreporter: Any) -> None:
+    if not _results:
+        return
+    terminalreporter.section("microbenchmarks")
+    for result in _results:
+        terminalreporter.write_line(
+            f"{result.name:<48} {result.mean_us:>12.1f} us  (min {result.min_us:.1f}, "
+            f"{result.rounds} rounds)  peak {result.peak_alloc_kb:.1f} KiB"
+        )
+    out = os.environ.get("SMART_CHAT_BOT_BENCH_OUT")
+    if out:
+        with open(out, "w", encoding="utf-8") as handle:
+            json.dump([asdict(result) for result in _results], handle, indent=2)
@@ -0,0 +1,330 @@
+"""Offline fakes for the chat, mail and AI clients with injectable latency.
+
+Each fake takes a ``Latency`` describing how long a call takes and how
+often it fails, so benchmarks can model a slow Gmail, a flaky Claude or a
+rate-limited Discord without touching the network.
+
+    Latency.parse("lognormal:0.4:0.5")  # median 400ms, sigma 0.5
+    Latency.parse("uniform:0.05:0.2", error_rate=0.01)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import threading
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+import ai_client_api
+import chat_client_api
+import mail_client_api
+
+# Recorded mix of DMs, roughly 60% chit-chat and 40% mail commands.
+RECORDED_MESSAGES: list[tuple[str, dict[str, Any] | None]] = [
+    ("hi!", None),
+    ("show me my latest 5 emails", {"action": "get_messages", "max_results": 5}),
+    ("thanks, that helps", None),
+    ("what can you do?", None),
+    ("log me into gmail please", {"action": "login"}),
+    ("good morning", None),
+    ("any new mail?", {"action": "get_messages", "max_results": 10}),
+    ("lol ok", None),
+    ("can you explain how you work", None),
+    ("mark 18c2a9f0 as read", {"action": "mark_as_read", "message_id": "18c2a9f0"}),
+    ("you're great", None),
+    ("sign me out", {"action": "logout"}),
+    ("hmm not sure what I need", None),
+    ("open mail 18c2a9f1", {"action": "get_message", "message_id": "18c2a9f1"}),
+    ("bye", None),
+]
+
+
+class InjectedError(RuntimeError):
+    """Failure raised by a fake to simulate a provider error."""
+
+
+@dataclass
+class Latency:
+    """A latency distribution in seconds plus an error rate."""
+
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+    error_rate: float = 0.0
+    seed: int | None = None
+    _rng: random.Random = field(init=False, repr=False)
+    _lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        if self.kind not in {"fixed", "uniform", "lognormal"}:
+            raise ValueError(f"Unknown latency distribution: {self.kind}")
+        self._rng = random.Random(self.seed)
+
+    @classmethod
+    def parse(cls, spec: str, *, error_rate: float = 0.0, seed: int | None = None) -> Latency:
+        """Parse ``seconds``, ``uniform:low:high`` or ``lognormal:median:sigma``."""
+        kind, _, rest = spec.partition(":")
+        if not rest:
+            return cls("fixed", float(kind), error_rate=error_rate, seed=seed)
+        low, _, high = rest.partition(":")
+        return cls(kind, float(low), float(high or 0.0), error_rate=error_rate, seed=seed)
+
+    def sample(self) -> tuple[float, bool]:
+        """Return (seconds, should_fail) for one call."""
+        with self._lock:
+            if self.kind == "uniform":
+                seconds = self._rng.uniform(self.a, self.b)
+            elif self.kind == "lognormal":
+                seconds = self._rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+            else:
+                seconds = self.a
+            fail = self._rng.random() < self.error_rate
+        return seconds, fail
+
+    def wait(self, operation: str) -> None:
+        seconds, fail = self.sample()
+        if seconds:
+            time.sleep(seconds)
+        if fail:
+            raise InjectedError(f"Injected {operation} failure")
+
+    async def wait_async(self, operation: str) -> None:
+        seconds, fail = self.sample()
+        if seconds:
+            await asyncio.sleep(seconds)
+        if fail:
+            raise InjectedError(f"Injected {operation} failure")
+
+
+class FakeChatMessage(chat_client_api.Message):
+    def __init__(self, message_id: str, channel_id: str, sender_id: str, content: str) -> None:
+        self._id = message_id
+        self._channel_id = channel_id
+        self._sender_id = sender_id
+        self._content = content
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def channel_id(self) -> str:
+        return self._channel_id
+
+    @property
+    def sender_id(self) -> str:
+        return self._sender_id
+
+    @property
+    def sender_name(self) -> str:
+        return self._sender_id
+
+    @property
+    def content(self) -> str:
+        return self._content
+
+    @property
+    def timestamp(self) -> str:
+        return ""
+
+    @property
+    def edited_timestamp(self) -> str | None:
+        return None
+
+
+class FakeChatClient(chat_client_api.ChatClient):
+    """Counts outbound messages; every write waits on ``latency``."""
+
+    supports_edits = True
+
+    def __init__(self, latency: Latency | None = None) -> None:
+        self.latency = latency or Latency()
+        self.sent = 0
+        self.edits = 0
+        self._lock = threading.Lock()
+
+    def get_message(self, channel_id: str, message_id: str) -> chat_client_api.Message:
+        return FakeChatMessage(message_id, channel_id, "bot", "")
+
+    def get_messages(self, channel_id: str, limit: int = 10) -> list[chat_client_api.Message]:
+        return []
+
+    def send_message(self, channel_id: str, content: str) -> bool:
+        self.latency.wait("send_message")
+        with self._lock:
+            self.sent += 1
+        return True
+
+    def create_message(self, channel_id: str, content: str) -> chat_client_api.Message:
+        self.latency.wait("create_message")
+        with self._lock:
+            self.sent += 1
+            message_id = str(self.sent)
+        return FakeChatMessage(message_id, channel_id, "bot", content)
+
+    def edit_message(self, channel_id: str, message_id: str, content: str) -> bool:
+        self.latency.wait("edit_message")
+        with self._lock:
+            self.edits += 1
+        return True
+
+    def delete_message(self, channel_id: str, message_id: str) -> bool:
+        self.latency.wait("delete_message")
+        return True
+
+    def get_channels(self) -> Iterator[chat_client_api.Channel]:
+        return iter(())
+
+    async def listen(
+        self, on_message: Callable[[chat_client_api.Message], Awaitable[None]]
+    ) -> None:
+        raise NotImplementedError("Benchmarks call the handler directly")
+
+
+class FakeMailMessage(mail_client_api.Message):
+    def __init__(
+        self, message_id: str, body: str = "Body", *, subject: str | None = None, snippet: str = "Snippet"
+    ) -> None:
+        self._id = message_id
+        self._body = body
+        self._subject = subject if subject is not None else f"Subject {message_id}"
+        self._snippet = snippet
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def from_(self) -> str:
+        return "sender@example.com"
+
+    @property
+    def to(self) -> str:
+        return "me@example.com"
+
+    @property
+    def date(self) -> str:
+        return "Mon, 19 Oct 2026 09:00:00 +0000"
+
+    @property
+    def subject(self) -> str:
+        return self._subject
+
+    @property
+    def snippet(self) -> str:
+        return self._snippet
+
+    @property
+    def body(self) -> str:
+        return self._body
+
+
+class FakeMailClient(mail_client_api.MailClient):
+    """Serves generated messages; every call waits on ``latency``."""
+
+    def __init__(self, latency: Latency | None = None) -> None:
+        self.latency = latency or Latency()
+
+    def login(self) -> dict[str, str]:
+        self.latency.wait("login")
+        return {"authorization_url": "http://auth.local/login", "state": "state"}
+
+    def callback(self, code: str, state: str | None = None) -> dict[str, str]:
+        return {"user_id": "bench-user"}
+
+    def logout(self) -> bool:
+        self.latency.wait("logout")
+        return True
+
+    def get_message(
+        self, message_id: str, *, format: mail_client_api.MessageFormat = "full"
+    ) -> mail_client_api.Message:
+        self.latency.wait("get_message")
+        if format in ("full", "raw"):
+            return FakeMailMessage(message_id)
+        return FakeMailMessage(message_id, body="")
+
+    def delete_message(self, message_id: str) -> bool:
+        self.latency.wait("delete_message")
+        return True
+
+    def mark_as_read(self, message_id: str) -> bool:
+        self.latency.wait("mark_as_read")
+        return True
+
+    def get_messages(self, max_results: int = 10, **filters: Any) -> Iterator[mail_client_api.Message]:
+        self.latency.wait("get_messages")
+        for index in range(max_results):
+            yield FakeMailMessage(f"m{index:06d}", body="")
+
+
+class FakeAIClient(ai_client_api.AIClient):
+    """Answers from a message -> command table, like Claude would.
+
+    Messages without a command get a chat reply when the schema allows the
+    combined ``reply`` action, and a parse error otherwise.
+    """
+
+    def __init__(
+        self,
+        latency: Latency | None = None,
+        commands: dict[str, dict[str, Any] | None] | None = None,
+    ) -> None:
+        self.latency = latency or Latency()
+        self.commands = dict(RECORDED_MESSAGES if commands is None else commands)
+        self.calls = 0
+
+    def _answer(self, user_input: str, response_schema: dict[str, Any] | None) -> str | dict[str, Any]:
+        self.calls += 1
+        if response_schema is None:
+            return f"reply to {user_input}"
+        command = self.commands.get(user_input)
+        if command:
+            return dict(command)
+        if "reply" in response_schema.get("properties", {}):
+            return {"action": "reply", "reply": f"reply to {user_input}"}
+        raise ai_client_api.SchemaValidationError(["$.action: no mail command in message"])
+
+    def generate_response(
+        self,
+        user_input: str,
+        system_prompt: str | None = None,
+        response_schema: dict[str, Any] | None = None,
+        cache_prompt: bool = False,
+        profile: str | None = None,
+        history: Sequence[ai_client_api.Turn] = (),
+    ) -> str | dict[str, Any]:
+        self.latency.wait("generate_response")
+        return self._answer(user_input, response_schema)
+
+    async def generate_response_async(
+        self,
+        user_input: str,
+        system_prompt: str | None = None,
+        response_schema: dict[str, Any] | None = None,
+        timeout: float | None = None,
+        cache_prompt: bool = False,
+        profile: str | None = None,
+        history: Sequence[ai_client_api.Turn] = (),
+    ) -> str | dict[str, Any]:
+        async with asyncio.timeout(timeout):
+            await self.latency.wait_async("generate_response")
+        return self._answer(user_input, response_schema)
+
+    async def stream_response(
+        self,
+        user_input: str,
+        system_prompt: str | None = None,
+        timeout: float | None = None,
+        profile: str | None = None,
+        history: Sequence[ai_client_api.Turn] = (),
+    ) -> AsyncIterator[str]:
+        async with asyncio.timeout(timeout):
+            await self.latency.wait_async("stream_response")
+        self.calls += 1
+        for word in f"reply to {user_input}".split(" "):
+            yield word + " "
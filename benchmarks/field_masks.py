@@ -0,0 +1,178 @@
+"""Bytes and parse time of Gmail responses with and without field masks.
+
+Fetches each operation's response from a local Gmail stand-in twice, once
+as ``GmailClient`` requested it before partial responses and once with its
+``fields`` mask, then times decoding the JSON and parsing it the way the
+client does. Parsed results must match, or the mask dropped a field.
+
+    uv run python -m benchmarks.field_masks --mailbox-size 200 --body-bytes 8192
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import urllib.parse
+import urllib.request
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from benchmarks.standins import GmailStandIn
+from gmail_client_impl import gmail_impl
+
+_PREFIX = "/gmail/v1/users/me"
+
+
+@dataclass
+class MaskResult:
+    operation: str
+    unmasked_bytes: int
+    masked_bytes: int
+    unmasked_parse_us: float
+    masked_parse_us: float
+    same_result: bool
+
+
+@dataclass
+class _Operation:
+    name: str
+    path: str
+    params: dict[str, Any]
+    fields: str
+    parse: Callable[[bytes], Any]
+
+
+def _parse_message(include_body: bool) -> Callable[[bytes], Any]:
+    def _parse(payload: bytes) -> Any:
+        message = gmail_impl._parse_gmail_message(json.loads(payload), include_body=include_body)
+        return (message.id, message.from_, message.to, message.date, message.subject, message.snippet, message.body)
+
+    return _parse
+
+
+def _parse_list(payload: bytes) -> Any:
+    response = json.loads(payload)
+    return [item["id"] for item in response.get("messages", [])], response.get("nextPageToken")
+
+
+def _parse_history(payload: bytes) -> Any:
+    response = json.loads(payload)
+    added = [
+        (change["message"]["id"], change["message"].get("labelIds"))
+        for record in response.get("history", [])
+        for change in record.get("messagesAdded", [])
+    ]
+    return added, response["historyId"], response.get("nextPageToken")
+
+
+def operations(server: GmailStandIn, history_start: int) -> list[_Operation]:
+    """The calls GmailClient makes, with the arguments it sent before field masks."""
+    message_id = next(iter(server.messages))
+    return [
+        _Operation(
+            "list_messages",
+            f"{_PREFIX}/messages",
+            {"maxResults": gmail_impl.LIST_PAGE_SIZE},
+            gmail_impl.LIST_FIELDS,
+            _parse_list,
+        ),
+        _Operation(
+            "get_metadata",
+            f"{_PREFIX}/messages/{message_id}",
+            {"format": "metadata", "metadataHeaders": gmail_impl.METADATA_HEADERS},
+            gmail_impl.MESSAGE_FIELDS["metadata"],
+            _parse_message(include_body=False),
+        ),
+        _Operation(
+            "get_full",
+            f"{_PREFIX}/messages/{message_id}",
+            {"format": "full"},
+            gmail_impl.MESSAGE_FIELDS["full"],
+            _parse_message(include_body=True),
+        ),
+        _Operation(
+            "list_history",
+            f"{_PREFIX}/history",
+            {
+                "startHistoryId": history_start,
+                "historyTypes": "messageAdded",
+                "labelId": "INBOX",
+                "maxResults": gmail_impl.HISTORY_PAGE_SIZE,
+            },
+            gmail_impl.HISTORY_FIELDS,
+            _parse_history,
+        ),
+        _Operation(
+            "get_profile",
+            f"{_PREFIX}/profile",
+            {},
+            gmail_impl.PROFILE_FIELDS,
+            lambda payload: json.loads(payload)["historyId"],
+        ),
+    ]
+
+
+def _fetch(server: GmailStandIn, path: str, params: dict[str, Any]) -> bytes:
+    url = f"{server.base_url}{path}?{urllib.parse.urlencode(params, doseq=True)}"
+    with urllib.request.urlopen(url) as response:
+        body: bytes = response.read()
+    return body
+
+
+def _parse_us(parse: Callable[[bytes], Any], payload: bytes, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        parse(payload)
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1e6, 1)
+
+
+def measure(server: GmailStandIn, history_start: int, rounds: int = 50) -> list[MaskResult]:
+    results = []
+    for operation in operations(server, history_start):
+        unmasked = _fetch(server, operation.path, operation.params)
+        masked = _fetch(server, operation.path, {**operation.params, "fields": operation.fields})
+        results.append(
+            MaskResult(
+                operation=operation.name,
+                unmasked_bytes=len(unmasked),
+                masked_bytes=len(masked),
+                unmasked_parse_us=_parse_us(operation.parse, unmasked, rounds),
+                masked_parse_us=_parse_us(operation.parse, masked, rounds),
+                same_result=operation.parse(unmasked) == operation.parse(masked),
+            )
+        )
+    return results
+
+
+def report(results: list[MaskResult]) -> str:
+    lines = [f"{'operation':<14} {'bytes before':>12} {'after':>8} {'saved':>6}  {'parse us before':>15} {'after':>8}"]
+    for result in results:
+        saved = 1 - result.masked_bytes / result.unmasked_bytes if result.unmasked_bytes else 0.0
+        lines.append(
+            f"{result.operation:<14} {result.unmasked_bytes:>12} {result.masked_bytes:>8} {saved:>6.0%}  "
+            f"{result.unmasked_parse_us:>15.1f} {result.masked_parse_us:>8.1f}"
+            + ("" if result.same_result else "  MISMATCH")
+        )
+    return "\n".join(lines)
+
+
+def main_cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mailbox-size", type=int, default=200)
+    parser.add_argument("--body-bytes", type=int, default=8192)
+    parser.add_argument("--new-messages", type=int, default=50, help="history entries to list")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args(argv)
+    server = GmailStandIn(mailbox_size=args.mailbox_size, body_bytes=args.body_bytes)
+    history_start = server.history_id
+    server.deliver(args.new_messages)
+    with server:
+        print(report(measure(server, history_start, args.rounds)))
+
+
+if __name__ == "__main__":
+    main_cli()
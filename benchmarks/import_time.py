@@ -0,0 +1,69 @@
+"""Import-time report for a module, from ``python -X importtime``.
+
+Runs the import in a fresh interpreter and lists the slowest top-level
+imports by cumulative time, which is most of a cold start.
+
+    uv run python -m benchmarks.import_time main --top 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def measure(module: str) -> list[ImportRecord]:
+    """Import ``module`` in a subprocess and parse its -X importtime output."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse(result.stderr)
+
+
+def parse(output: str) -> list[ImportRecord]:
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        records.append(ImportRecord(name.strip(), depth, int(self_us), int(cumulative_us)))
+    return records
+
+
+def report(records: list[ImportRecord], top: int = 15) -> str:
+    total = max((record.cumulative_us for record in records if record.depth == 0), default=0)
+    slowest = sorted(
+        (record for record in records if record.depth <= 1),
+        key=lambda record: record.cumulative_us,
+        reverse=True,
+    )[:top]
+    lines = [f"{'cumulative ms':>14}  module"]
+    lines += [f"{record.cumulative_us / 1000:>14.1f}  {'  ' * record.depth}{record.module}" for record in slowest]
+    lines.append(f"{len(records)} modules, slowest top-level import {total / 1000:.1f} ms")
+    return "\n".join(lines)
+
+
+def main_cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+    print(report(measure(args.module), args.top))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,351 @@
+"""Replay recorded DM traffic through the chat handler for load and soak tests.
+
+Reads a JSONL recording made with ``SMART_CHAT_BOT_RECORD_FILE`` and feeds
+each event to ``main._make_chat_handler`` at its recorded offset divided by
+``--speed`` (``1`` is real time, ``max`` dispatches as fast as
+``--concurrency`` allows). ``--backend fakes`` uses the in-process fakes;
+``--backend standins`` runs the bot's real Discord, Gmail and Claude clients
+against the local stand-in servers. Every ``--report-interval`` seconds a
+JSON line with throughput, latency percentiles, error rate and RSS is
+printed; ``--duration`` loops the recording to soak for that long.
+
+    uv run python -m benchmarks.replay traffic.jsonl --speed 10 --backend standins \\
+        --duration 7200 --report-interval 300 --out soak.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import array
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from google.oauth2.credentials import Credentials
+
+import main
+from benchmarks.fakes import FakeAIClient, FakeChatClient, FakeChatMessage, FakeMailClient, Latency
+from benchmarks.standins import AnthropicStandIn, DiscordStandIn, GmailStandIn, Knobs
+from benchmarks.stats import summary
+from benchmarks.throughput import _git_commit, _max_rss_mb
+from claude_client_impl import claude_impl
+from discord_client_impl import DiscordClient
+from gmail_client_impl import gmail_impl
+
+Handler = Callable[[FakeChatMessage], Awaitable[None]]
+
+
+@dataclass
+class ReplayEvent:
+    offset: float
+    sender: str
+    channel: str
+    content: str
+
+
+@dataclass
+class ReplayConfig:
+    path: str
+    # None replays as fast as the concurrency limit allows.
+    speed: float | None = 1.0
+    # Loop the recording until this many seconds have passed; None plays it once.
+    duration: float | None = None
+    concurrency: int = 64
+    report_interval: float = 60.0
+    backend: str = "fakes"
+    ai_latency: str = "lognormal:0.4:0.5"
+    mail_latency: str = "uniform:0.05:0.2"
+    chat_latency: str = "uniform:0.02:0.08"
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    seed: int = 0
+
+
+@dataclass
+class _Window:
+    started: float = field(default_factory=time.perf_counter)
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+
+def load_events(path: str) -> list[ReplayEvent]:
+    events = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                data = json.loads(line)
+                events.append(
+                    ReplayEvent(float(data["offset"]), data["sender"], data["channel"], data["content"])
+                )
+    return sorted(events, key=lambda event: event.offset)
+
+
+def schedule(
+    events: list[ReplayEvent], *, speed: float | None, loop: bool = False
+) -> Iterator[tuple[float, ReplayEvent]]:
+    """Yield (seconds from start, event), repeating the recording when ``loop`` is set."""
+    if not events:
+        return
+    # Leave one mean gap between the end of a pass and the start of the next.
+    gap = events[-1].offset / (len(events) - 1) if len(events) > 1 else 1.0
+    length = events[-1].offset + gap
+    passes = 0
+    while True:
+        for event in events:
+            yield ((passes * length + event.offset) / speed if speed else 0.0), event
+        passes += 1
+        if not loop:
+            return
+
+
+def _rss_mb() -> float:
+    """Current resident set size; falls back to the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            pages = int(handle.read().split()[1])
+    except OSError:
+        return _max_rss_mb()
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+def _window_report(window: _Window, elapsed: float, in_flight: int, behind: float) -> dict[str, Any]:
+    seconds = time.perf_counter() - window.started
+    count = len(window.latencies)
+    return {
+        "elapsed_s": round(elapsed, 1),
+        "messages": count,
+        "throughput_msg_s": round(count / seconds, 1) if seconds else 0.0,
+        "error_rate": round(window.errors / count, 4) if count else 0.0,
+        "latency": summary(window.latencies, (50, 95, 99)) if count else {},
+        "in_flight": in_flight,
+        "behind_schedule_s": round(behind, 3),
+        "rss_mb": _rss_mb(),
+    }
+
+
+async def replay(
+    config: ReplayConfig,
+    handler: Handler,
+    *,
+    emit: Callable[[dict[str, Any]], None] = lambda report: None,
+) -> dict[str, Any]:
+    """Dispatch the recording through ``handler`` and return the overall report."""
+    events = load_events(config.path)
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(config.concurrency)
+    # Kept as C doubles so an hours-long soak does not skew its own memory numbers.
+    latencies = array.array("d")
+    errors = 0
+    window = _Window()
+    windows: list[dict[str, Any]] = []
+    tasks: set[asyncio.Task[None]] = set()
+    behind = 0.0
+    started = loop.time()
+
+    async def _dispatch(index: int, event: ReplayEvent) -> None:
+        nonlocal errors
+        message = FakeChatMessage(str(index), event.channel, event.sender, event.content)
+        begun = time.perf_counter()
+        failed = False
+        try:
+            await handler(message)
+        except Exception:
+            failed = True
+        finally:
+            slots.release()
+        elapsed = time.perf_counter() - begun
+        latencies.append(elapsed)
+        window.latencies.append(elapsed)
+        if failed:
+            errors += 1
+            window.errors += 1
+
+    def _flush() -> None:
+        nonlocal window
+        report = _window_report(window, loop.time() - started, len(tasks), behind)
+        window = _Window()
+        windows.append(report)
+        emit(report)
+
+    async def _reporter() -> None:
+        while True:
+            await asyncio.sleep(config.report_interval)
+            _flush()
+
+    reporter = loop.create_task(_reporter())
+    try:
+        for index, (due, event) in enumerate(
+            schedule(events, speed=config.speed, loop=config.duration is not None)
+        ):
+            now = loop.time() - started
+            if config.duration is not None and now >= config.duration:
+                break
+            if due > now:
+                await asyncio.sleep(due - now)
+            await slots.acquire()
+            behind = max(0.0, loop.time() - started - due) if config.speed else 0.0
+            task = loop.create_task(_dispatch(index, event))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(set(tasks))
+    finally:
+        reporter.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await reporter
+    _flush()
+
+    elapsed = loop.time() - started
+    count = len(latencies)
+    rss = [report["rss_mb"] for report in windows]
+    hours = max(windows[-1]["elapsed_s"] - windows[0]["elapsed_s"], 1e-9) / 3600
+    return {
+        "git_commit": _git_commit(),
+        "config": asdict(config),
+        "messages": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_msg_s": round(count / elapsed, 1) if elapsed else 0.0,
+        "latency": summary(list(latencies), (50, 95, 99)) if count else {},
+        "rss_start_mb": rss[0],
+        "rss_end_mb": rss[-1],
+        "rss_growth_mb_per_hour": round((rss[-1] - rss[0]) / hours, 1) if len(rss) > 1 else 0.0,
+        "windows": windows,
+    }
+
+
+def _latency(spec: str, config: ReplayConfig, offset: int) -> Latency:
+    return Latency.parse(spec, error_rate=config.error_rate, seed=config.seed + offset)
+
+
+@contextlib.asynccontextmanager
+async def fake_backend(config: ReplayConfig) -> AsyncIterator[tuple[Handler, dict[str, Any]]]:
+    """The handler wired to the offline fakes, plus counters filled in as it runs."""
+    chat_client = FakeChatClient(_latency(config.chat_latency, config, 0))
+    mail_client = FakeMailClient(_latency(config.mail_latency, config, 1))
+    ai_client = FakeAIClient(_latency(config.ai_latency, config, 2))
+    main._AI_BREAKER = main.ai_client_api.CircuitBreaker()
+    main.ai_client_api.get_ai_client = lambda: ai_client
+    main._get_mail_client = lambda user_id: mail_client
+    stats: dict[str, Any] = {}
+    try:
+        yield main._make_chat_handler(chat_client), stats
+    finally:
+        stats.update(ai_calls=ai_client.calls, chat_sends=chat_client.sent, chat_edits=chat_client.edits)
+
+
+def _seed_gmail_tokens(db_path: str, user_ids: set[str]) -> None:
+    store = gmail_impl.GmailTokenStore(Path(db_path))
+    credentials = Credentials(
+        token="replay",
+        refresh_token="replay",
+        client_id="replay",
+        client_secret="replay",
+        expiry=datetime.datetime.utcnow() + datetime.timedelta(days=365),
+    )
+    for user_id in user_ids:
+        store.save_credentials(user_id, credentials)
+
+
+@contextlib.asynccontextmanager
+async def standin_backend(config: ReplayConfig) -> AsyncIterator[tuple[Handler, dict[str, Any]]]:
+    """The handler with the bot's real clients pointed at local stand-in servers."""
+    def _knobs(spec: str, offset: int) -> Knobs:
+        return Knobs(_latency(spec, config, offset), config.rate_limit_rate, seed=config.seed + offset)
+
+    servers = {
+        "discord": DiscordStandIn(_knobs(config.chat_latency, 0)),
+        "gmail": GmailStandIn(_knobs(config.mail_latency, 1)),
+        "anthropic": AnthropicStandIn(_knobs(config.ai_latency, 2)),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        token_db = os.path.join(directory, "gmail_tokens.sqlite")
+        _seed_gmail_tokens(token_db, {event.sender for event in load_events(config.path)})
+        for server in servers.values():
+            server.start()
+        environ = {
+            "ANTHROPIC_API_KEY": "replay",
+            "ANTHROPIC_BASE_URL": servers["anthropic"].base_url,
+            "GMAIL_CREDENTIALS_PATH": os.path.join(directory, "client_secret.json"),
+            "GMAIL_REDIRECT_URI": "http://127.0.0.1/auth/mail/callback",
+            "GMAIL_TOKEN_DB_PATH": token_db,
+        }
+        saved_environ = {key: os.environ.get(key) for key in environ}
+        os.environ.update(environ)
+        gmail_impl.API_BASE_URL = servers["gmail"].base_url + "/"
+        claude_impl._async_client = None
+        main._AI_BREAKER = main.ai_client_api.CircuitBreaker()
+        chat_client = DiscordClient(
+            {"bot_token": "replay", "api_base_url": servers["discord"].base_url + "/api/v10"}
+        )
+        stats: dict[str, Any] = {}
+        try:
+            yield main._make_chat_handler(chat_client), stats
+        finally:
+            for name, server in servers.items():
+                server.stop()
+                stats[f"{name}_requests"] = len(server.requests)
+                stats[f"{name}_status_counts"] = dict(server.status_counts)
+            for key, value in saved_environ.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            claude_impl._async_client = None
+
+
+async def run(config: ReplayConfig, emit: Callable[[dict[str, Any]], None]) -> dict[str, Any]:
+    backend = standin_backend if config.backend == "standins" else fake_backend
+    async with backend(config) as (handler, stats):
+        report = await replay(config, handler, emit=emit)
+    report["backend"] = stats
+    return report
+
+
+def main_cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = ReplayConfig(path="")
+    parser.add_argument("path", help="JSONL recording from SMART_CHAT_BOT_RECORD_FILE")
+    parser.add_argument("--speed", default="1", help="replay speed multiplier, or max")
+    parser.add_argument("--duration", type=float, help="loop the recording for this many seconds")
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--report-interval", type=float, default=defaults.report_interval)
+    parser.add_argument("--backend", choices=("fakes", "standins"), default=defaults.backend)
+    for name in ("ai", "mail", "chat"):
+        parser.add_argument(
+            f"--{name}-latency",
+            default=getattr(defaults, f"{name}_latency"),
+            help="seconds, uniform:low:high or lognormal:median:sigma",
+        )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 share (stand-ins only)")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--out", help="write the final JSON report here")
+    args = parser.parse_args(argv)
+
+    options = vars(args)
+    options["speed"] = None if args.speed == "max" else float(args.speed)
+    config = ReplayConfig(**{key: options[key] for key in asdict(defaults) if key in options})
+
+    def _emit(report: dict[str, Any]) -> None:
+        print(json.dumps(report), file=sys.stderr, flush=True)
+
+    report = asyncio.run(run(config, _emit))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    print(json.dumps({key: value for key, value in report.items() if key != "windows"}, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,24 @@
+"""Local HTTP stand-ins for the Gmail, Discord REST and Anthropic APIs.
+
+They let benchmarks drive the real clients (googleapiclient/httplib2,
+httpx and the anthropic SDK) end to end without leaving the machine:
+
+    uv run python -m benchmarks.standins --latency lognormal:0.05:0.5 --rate-limit-rate 0.02
+
+prints the environment variables that point the bot at the stand-ins.
+"""
+
+from benchmarks.standins.anthropic import AnthropicStandIn
+from benchmarks.standins.base import Knobs, Request, Response, StandInServer
+from benchmarks.standins.discord import DiscordStandIn
+from benchmarks.standins.gmail import GmailStandIn
+
+__all__ = [
+    "AnthropicStandIn",
+    "DiscordStandIn",
+    "GmailStandIn",
+    "Knobs",
+    "Request",
+    "Response",
+    "StandInServer",
+]
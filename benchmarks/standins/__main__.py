@@ -0,0 +1,53 @@
+"""Run all three stand-ins until interrupted and print the env to use them."""
+
+from __future__ import annotations
+
+import argparse
+import threading
+
+from benchmarks.fakes import Latency
+from benchmarks.standins import AnthropicStandIn, DiscordStandIn, GmailStandIn, Knobs
+
+
+def main_cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    for name, port in (("gmail", 8781), ("discord", 8782), ("anthropic", 8783)):
+        parser.add_argument(f"--{name}-port", type=int, default=port)
+    parser.add_argument(
+        "--latency", default="0", help="seconds, uniform:low:high or lognormal:median:sigma"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 5xx responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--retry-after", type=float, default=0.05)
+    parser.add_argument("--mailbox-size", type=int, default=200)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed words")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    def _knobs() -> Knobs:
+        latency = Latency.parse(args.latency, error_rate=args.error_rate, seed=args.seed)
+        return Knobs(latency, args.rate_limit_rate, args.retry_after, args.seed)
+
+    servers = [
+        GmailStandIn(_knobs(), mailbox_size=args.mailbox_size, host=args.host, port=args.gmail_port),
+        DiscordStandIn(_knobs(), host=args.host, port=args.discord_port),
+        AnthropicStandIn(_knobs(), token_delay=args.token_delay, host=args.host, port=args.anthropic_port),
+    ]
+    for server in servers:
+        server.start()
+    gmail, discord, anthropic = servers
+    print(f"export GMAIL_API_BASE_URL={gmail.base_url}/")
+    print(f"export DISCORD_API_BASE_URL={discord.base_url}/api/v10")
+    print(f"export ANTHROPIC_BASE_URL={anthropic.base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,160 @@
+"""Anthropic Messages API stand-in with JSON and server-sent-event responses.
+
+Structured requests (a forced tool call) get a ``tool_use`` block whose
+input comes from ``tool_input``; by default the last user message is looked
+up in the recorded command table the offline fakes use. Plain requests get
+``reply_text`` back, streamed word by word when ``stream`` is set. The SDK
+reads ``ANTHROPIC_BASE_URL``, so no client change is needed to use it.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from benchmarks.fakes import RECORDED_MESSAGES
+from benchmarks.standins.base import Knobs, Request, Response, Route, StandInServer, seconds_header
+
+_COMMANDS = dict(RECORDED_MESSAGES)
+
+
+def _error(status: int, kind: str, message: str, headers: dict[str, str] | None = None) -> Response:
+    return Response(status, {"type": "error", "error": {"type": kind, "message": message}}, headers or {})
+
+
+def _last_user_text(body: dict[str, Any]) -> str:
+    for message in reversed(body.get("messages", [])):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content", "")
+        if isinstance(content, str):
+            return content
+        texts = [block.get("text", "") for block in content if block.get("type") == "text"]
+        if texts:
+            return texts[-1]
+    return ""
+
+
+def default_tool_input(body: dict[str, Any]) -> dict[str, Any]:
+    """Answer like the offline AI fake: a recorded command, else a chat reply."""
+    text = _last_user_text(body)
+    command = _COMMANDS.get(text)
+    if command:
+        return dict(command)
+    schema = body["tools"][0].get("input_schema", {})
+    if "reply" in schema.get("properties", {}):
+        return {"action": "reply", "reply": f"reply to {text}"}
+    return {"action": "get_messages", "max_results": 5}
+
+
+def _sse(name: str, data: dict[str, Any]) -> bytes:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+class AnthropicStandIn(StandInServer):
+    name = "anthropic-stand-in"
+
+    def __init__(
+        self,
+        knobs: Knobs | None = None,
+        *,
+        reply_text: str = "hello from the anthropic stand-in",
+        token_delay: float = 0.0,
+        tool_input: Callable[[dict[str, Any]], dict[str, Any]] = default_tool_input,
+        **kwargs: Any,
+    ) -> None:
+        self.reply_text = reply_text
+        self.token_delay = token_delay
+        self.tool_input = tool_input
+        self.bodies: list[dict[str, Any]] = []
+        self._ids = itertools.count(1)
+        super().__init__(knobs, **kwargs)
+
+    def routes(self) -> list[Route]:
+        return [("POST", r"/v1/messages", self._create_message)]
+
+    def server_error(self, request: Request) -> Response:
+        return _error(529, "overloaded_error", "Overloaded")
+
+    def rate_limited(self, request: Request) -> Response:
+        retry_after = seconds_header(self.knobs.retry_after)
+        headers = {"retry-after": retry_after, "anthropic-ratelimit-requests-remaining": "0"}
+        return _error(429, "rate_limit_error", "Number of requests has exceeded your rate limit", headers)
+
+    def not_found(self, request: Request) -> Response:
+        return _error(404, "not_found_error", f"Not found: {request.path}")
+
+    def _create_message(self, request: Request) -> Response:
+        body = request.json()
+        with self._lock:
+            self.bodies.append(body)
+            message_id = f"msg_standin_{next(self._ids)}"
+        tool_choice = body.get("tool_choice") or {}
+        if tool_choice.get("type") == "tool":
+            content = [
+                {
+                    "type": "tool_use",
+                    "id": f"toolu_{message_id}",
+                    "name": tool_choice["name"],
+                    "input": self.tool_input(body),
+                }
+            ]
+            stop_reason = "tool_use"
+        else:
+            content = [{"type": "text", "text": self.reply_text}]
+            stop_reason = "end_turn"
+        prompt = json.dumps([body.get("system"), body.get("messages"), body.get("tools")])
+        message = {
+            "id": message_id,
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", ""),
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(json.dumps(content)) // 4,
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0,
+            },
+        }
+        if body.get("stream"):
+            return Response(content_type="text/event-stream", stream=self._events(message))
+        return Response(body=message)
+
+    def _events(self, message: dict[str, Any]) -> Iterator[bytes]:
+        start = {**message, "content": [], "stop_reason": None}
+        yield _sse("message_start", {"type": "message_start", "message": start})
+        for index, block in enumerate(message["content"]):
+            if block["type"] == "tool_use":
+                empty = {**block, "input": {}}
+                deltas = [{"type": "input_json_delta", "partial_json": json.dumps(block["input"])}]
+            else:
+                empty = {"type": "text", "text": ""}
+                deltas = [
+                    {"type": "text_delta", "text": word + " "} for word in block["text"].split(" ")
+                ]
+            yield _sse(
+                "content_block_start",
+                {"type": "content_block_start", "index": index, "content_block": empty},
+            )
+            for delta in deltas:
+                if self.token_delay:
+                    time.sleep(self.token_delay)
+                yield _sse(
+                    "content_block_delta", {"type": "content_block_delta", "index": index, "delta": delta}
+                )
+            yield _sse("content_block_stop", {"type": "content_block_stop", "index": index})
+        yield _sse(
+            "message_delta",
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                "usage": {"output_tokens": message["usage"]["output_tokens"]},
+            },
+        )
+        yield _sse("message_stop", {"type": "message_stop"})
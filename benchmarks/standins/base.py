@@ -0,0 +1,211 @@
+"""Threaded HTTP server shared by the provider stand-ins.
+
+A stand-in matches each request against its ``routes`` table, waits on the
+configured ``Latency`` and may answer with a server error or a 429 instead
+of the real handler. Every response carries a Content-Length and keeps the
+connection alive, so client-side pooling behaves as it would in production.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from benchmarks.fakes import Latency
+
+
+@dataclass
+class Knobs:
+    """Failure and latency settings applied before a request reaches its route.
+
+    ``latency.error_rate`` is the share of requests answered with a server
+    error and ``rate_limit_rate`` the share answered with a 429 that asks
+    the client to retry after ``retry_after`` seconds.
+    """
+
+    latency: Latency = field(default_factory=Latency)
+    rate_limit_rate: float = 0.0
+    retry_after: float = 0.05
+    seed: int | None = None
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict[str, list[str]]
+    headers: dict[str, str]
+    body: bytes
+    params: dict[str, str] = field(default_factory=dict)
+
+    def json(self) -> Any:
+        return json.loads(self.body or b"{}")
+
+    def arg(self, name: str, default: str | None = None) -> str | None:
+        values = self.query.get(name)
+        return values[0] if values else default
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: Any = None
+    headers: dict[str, str] = field(default_factory=dict)
+    content_type: str = "application/json"
+    # Chunks written and flushed one by one, e.g. server-sent events.
+    stream: Iterator[bytes] | None = None
+
+    def encoded(self) -> bytes:
+        if self.body is None:
+            return b""
+        if isinstance(self.body, bytes):
+            return self.body
+        return json.dumps(self.body).encode("utf-8")
+
+
+Route = tuple[str, str, Callable[[Request], Response]]
+
+
+class StandInServer:
+    """Serve ``routes`` on 127.0.0.1 from a background thread."""
+
+    name = "stand-in"
+
+    def __init__(self, knobs: Knobs | None = None, *, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.knobs = knobs or Knobs()
+        self.requests: list[tuple[str, str]] = []
+        self.status_counts: dict[int, int] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.knobs.seed)
+        self._routes = [
+            (method, re.compile(pattern + r"\Z"), handler) for method, pattern, handler in self.routes()
+        ]
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, name=self.name, daemon=True
+        )
+
+    def routes(self) -> list[Route]:
+        return []
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def start(self) -> StandInServer:
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> StandInServer:
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def server_error(self, request: Request) -> Response:
+        return Response(500, {"error": "injected server error"})
+
+    def rate_limited(self, request: Request) -> Response:
+        headers = {"Retry-After": seconds_header(self.knobs.retry_after)}
+        return Response(429, {"error": "rate limited"}, headers)
+
+    def not_found(self, request: Request) -> Response:
+        return Response(404, {"error": f"No route for {request.method} {request.path}"})
+
+    def dispatch(self, request: Request) -> Response:
+        """Route a request without latency or injected failures."""
+        for method, pattern, handler in self._routes:
+            match = pattern.match(request.path)
+            if method == request.method and match:
+                request.params = match.groupdict()
+                return handler(request)
+        return self.not_found(request)
+
+    def _handle(self, request: Request) -> Response:
+        seconds, fail = self.knobs.latency.sample()
+        with self._lock:
+            self.requests.append((request.method, request.path))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            throttle = self._rng.random() < self.knobs.rate_limit_rate
+        try:
+            if seconds:
+                time.sleep(seconds)
+            if fail:
+                return self.server_error(request)
+            if throttle:
+                return self.rate_limited(request)
+            return self.dispatch(request)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+            def _serve(self) -> None:
+                url = urllib.parse.urlsplit(self.path)
+                length = int(self.headers.get("Content-Length", "0"))
+                request = Request(
+                    method=self.command,
+                    path=url.path,
+                    query=urllib.parse.parse_qs(url.query),
+                    headers={key.lower(): value for key, value in self.headers.items()},
+                    body=self.rfile.read(length) if length else b"",
+                )
+                response = server._handle(request)
+                with server._lock:
+                    server.status_counts[response.status] = server.status_counts.get(response.status, 0) + 1
+                try:
+                    self._write(response)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def _write(self, response: Response) -> None:
+                self.send_response(response.status)
+                self.send_header("Content-Type", response.content_type)
+                for key, value in response.headers.items():
+                    self.send_header(key, value)
+                if response.stream is not None:
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    for chunk in response.stream:
+                        self.wfile.write(chunk)
+                        self.wfile.flush()
+                    self.close_connection = True
+                    return
+                payload = response.encoded()
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _serve
+
+        return _Handler
+
+
+def seconds_header(value: float) -> str:
+    """Format seconds the way Retry-After style headers carry them."""
+    return f"{value:.3f}".rstrip("0").rstrip(".") or "0"
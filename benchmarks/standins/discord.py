@@ -0,0 +1,202 @@
+"""Discord REST stand-in: channel messages with per-channel rate limits.
+
+Every response carries ``X-RateLimit-*`` headers for the channel's bucket.
+A bucket allows ``bucket_limit`` writes per ``bucket_window`` seconds and
+answers further writes with Discord's 429 body and ``Retry-After``. Point
+``DiscordClient`` at it with ``DISCORD_API_BASE_URL``. Multipart message
+posts keep each uploaded file's bytes in ``uploads``.
+"""
+
+from __future__ import annotations
+
+import collections
+import email.parser
+import email.policy
+import itertools
+import json
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+
+from benchmarks.standins.base import Knobs, Request, Response, Route, StandInServer, seconds_header
+
+# The client base URL may or may not include the versioned API prefix.
+_CHANNEL = r"(?:/api/v\d+)?/channels/(?P<channel>\d+)/messages"
+
+
+class DiscordStandIn(StandInServer):
+    name = "discord-stand-in"
+
+    def __init__(
+        self,
+        knobs: Knobs | None = None,
+        *,
+        bucket_limit: int = 5,
+        bucket_window: float = 5.0,
+        **kwargs: Any,
+    ) -> None:
+        self.bucket_limit = bucket_limit
+        self.bucket_window = bucket_window
+        self.messages: dict[str, dict[str, dict[str, Any]]] = collections.defaultdict(dict)
+        self._writes: dict[str, collections.deque[float]] = collections.defaultdict(collections.deque)
+        self._ids = itertools.count(1_200_000_000_000_000_000)
+        self.dm_channels: dict[str, str] = {}
+        self.uploads: dict[str, dict[str, bytes]] = {}
+        self._channel_lock = threading.Lock()
+        super().__init__(knobs, **kwargs)
+
+    def routes(self) -> list[Route]:
+        return [
+            ("GET", _CHANNEL, self._list_messages),
+            ("POST", _CHANNEL, self._create_message),
+            ("GET", _CHANNEL + r"/(?P<id>\d+)", self._get_message),
+            ("PATCH", _CHANNEL + r"/(?P<id>\d+)", self._edit_message),
+            ("DELETE", _CHANNEL + r"/(?P<id>\d+)", self._delete_message),
+            ("POST", r"(?:/api/v\d+)?/users/@me/channels", self._open_dm),
+        ]
+
+    def server_error(self, request: Request) -> Response:
+        return Response(502, {"message": "502: Bad Gateway", "code": 0})
+
+    def rate_limited(self, request: Request) -> Response:
+        return self._too_many(self.knobs.retry_after, "global", is_global=True)
+
+    def not_found(self, request: Request) -> Response:
+        return Response(404, {"message": "Unknown Message", "code": 10008})
+
+    def _too_many(self, retry_after: float, bucket: str, *, is_global: bool = False) -> Response:
+        headers = {
+            "Retry-After": seconds_header(retry_after),
+            "X-RateLimit-Limit": str(self.bucket_limit),
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset-After": seconds_header(retry_after),
+            "X-RateLimit-Bucket": bucket,
+            "X-RateLimit-Scope": "global" if is_global else "user",
+        }
+        if is_global:
+            headers["X-RateLimit-Global"] = "true"
+        body = {"message": "You are being rate limited.", "retry_after": retry_after, "global": is_global}
+        return Response(429, body, headers)
+
+    def _take(self, channel: str) -> tuple[dict[str, str], float]:
+        """Spend one write from the channel bucket; return headers and any wait."""
+        now = time.monotonic()
+        with self._channel_lock:
+            writes = self._writes[channel]
+            while writes and writes[0] <= now - self.bucket_window:
+                writes.popleft()
+            wait = writes[0] + self.bucket_window - now if len(writes) >= self.bucket_limit else 0.0
+            if not wait:
+                writes.append(now)
+            remaining = self.bucket_limit - len(writes)
+            reset_after = writes[0] + self.bucket_window - now if writes else self.bucket_window
+        headers = {
+            "X-RateLimit-Limit": str(self.bucket_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset-After": seconds_header(reset_after),
+            "X-RateLimit-Bucket": f"channel-{channel}",
+        }
+        return headers, wait
+
+    def _write(
+        self, request: Request, status: int, body: Any, change: Callable[[], dict[str, Any] | None]
+    ) -> Response:
+        channel = request.params["channel"]
+        headers, wait = self._take(channel)
+        if wait:
+            return self._too_many(round(wait, 3), f"channel-{channel}")
+        result = change()
+        if result is None:
+            return Response(404, {"message": "Unknown Message", "code": 10008}, headers)
+        return Response(status, body if body is not None else result, headers)
+
+    def _message(self, channel: str, content: str) -> dict[str, Any]:
+        return {
+            "id": str(next(self._ids)),
+            "channel_id": channel,
+            "type": 0,
+            "author": {"id": "1000", "username": "smart-chat-bot", "global_name": None, "bot": True},
+            "content": content,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "edited_timestamp": None,
+        }
+
+    def _create_message(self, request: Request) -> Response:
+        channel = request.params["channel"]
+        content_type = request.headers.get("content-type", "")
+        files: dict[str, tuple[str, bytes]] = {}
+        if content_type.startswith("multipart/form-data"):
+            fields = _form_fields(content_type, request.body)
+            content = json.loads(fields.pop("payload_json", (None, b"{}"))[1]).get("content", "")
+            files = {name: value for name, value in fields.items() if name.startswith("files[")}
+        else:
+            content = request.json().get("content", "")
+
+        def _create() -> dict[str, Any]:
+            message = self._message(channel, content)
+            message["attachments"] = [
+                {"id": str(next(self._ids)), "filename": filename, "size": len(data)}
+                for filename, data in files.values()
+            ]
+            with self._channel_lock:
+                self.messages[channel][message["id"]] = message
+                if files:
+                    self.uploads[message["id"]] = dict(files.values())
+            return message
+
+        return self._write(request, 200, None, _create)
+
+    def _edit_message(self, request: Request) -> Response:
+        channel, message_id = request.params["channel"], request.params["id"]
+        content = request.json().get("content", "")
+
+        def _edit() -> dict[str, Any] | None:
+            with self._channel_lock:
+                message = self.messages[channel].get(message_id)
+                if message is not None:
+                    message["content"] = content
+                    message["edited_timestamp"] = datetime.now(timezone.utc).isoformat()
+            return message
+
+        return self._write(request, 200, None, _edit)
+
+    def _delete_message(self, request: Request) -> Response:
+        channel, message_id = request.params["channel"], request.params["id"]
+
+        def _delete() -> dict[str, Any] | None:
+            with self._channel_lock:
+                return self.messages[channel].pop(message_id, None)
+
+        return self._write(request, 204, b"", _delete)
+
+    def _open_dm(self, request: Request) -> Response:
+        recipient = str(request.json().get("recipient_id", ""))
+        with self._channel_lock:
+            channel = self.dm_channels.setdefault(recipient, str(next(self._ids)))
+        return Response(body={"id": channel, "type": 1, "recipients": [{"id": recipient}]})
+
+    def _get_message(self, request: Request) -> Response:
+        with self._channel_lock:
+            message = self.messages[request.params["channel"]].get(request.params["id"])
+        return Response(body=message) if message is not None else self.not_found(request)
+
+    def _list_messages(self, request: Request) -> Response:
+        limit = min(int(request.arg("limit", "50") or 50), 100)
+        with self._channel_lock:
+            messages = list(self.messages[request.params["channel"]].values())
+        return Response(body=messages[::-1][:limit])
+
+
+def _form_fields(content_type: str, body: bytes) -> dict[str, tuple[str, bytes]]:
+    """Map each multipart/form-data field name to its (filename, bytes)."""
+    parsed = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    fields: dict[str, tuple[str, bytes]] = {}
+    for part in parsed.iter_parts():  # type: ignore[attr-defined]
+        name = part.get_param("name", header="content-disposition")
+        payload = part.get_payload(decode=True)
+        fields[str(name)] = (part.get_filename() or "", payload if isinstance(payload, bytes) else b"")
+    return fields
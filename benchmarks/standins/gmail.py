@@ -0,0 +1,405 @@
+"""Gmail API stand-in: messages, attachments, history, profile and the batch endpoint.
+
+Serves the ``gmail/v1`` paths ``GmailClient`` calls from an in-memory
+mailbox. Point the client at it with ``GMAIL_API_BASE_URL``; injected
+failures use Gmail's error shape, so quota errors arrive as 429
+``rateLimitExceeded`` just like the real service. A ``fields`` parameter
+trims responses the way Google partial responses do.
+"""
+
+from __future__ import annotations
+
+import base64
+import email.parser
+import email.policy
+import http
+import itertools
+import re
+import threading
+import urllib.parse
+from typing import Any
+
+from benchmarks.standins.base import Knobs, Request, Response, Route, StandInServer
+
+_PREFIX = r"/gmail/v1/users/(?P<user>[^/]+)"
+_BOUNDARY = "batch_standin"
+MAX_BATCH_SIZE = 100
+
+
+def _error(status: int, reason: str, message: str) -> Response:
+    return Response(
+        status,
+        {
+            "error": {
+                "code": status,
+                "message": message,
+                "errors": [{"message": message, "domain": "global", "reason": reason}],
+                "status": http.HTTPStatus(status).name,
+            }
+        },
+    )
+
+
+_FIELD_NAME = re.compile(r"[\w*]+(?:/[\w*]+)*")
+
+
+def parse_fields(mask: str) -> dict[str, Any]:
+    """Parse a partial-response mask such as ``id,payload(headers(name,value))`` into a tree."""
+    tree: dict[str, Any] = {}
+    end = _parse_field_list(mask.replace(" ", ""), 0, tree)
+    if end != len(mask.replace(" ", "")):
+        raise ValueError(f"Invalid fields mask: {mask!r}")
+    return tree
+
+
+def _parse_field_list(mask: str, pos: int, tree: dict[str, Any]) -> int:
+    while pos < len(mask):
+        match = _FIELD_NAME.match(mask, pos)
+        if not match:
+            raise ValueError(f"Invalid fields mask at {pos}: {mask!r}")
+        *parents, last = match.group().split("/")
+        node = tree
+        for name in parents:
+            child = node.setdefault(name, {})
+            if child is True:
+                break
+            node = child
+        else:
+            pos = match.end()
+            if mask.startswith("(", pos):
+                child = node.setdefault(last, {})
+                pos = _parse_field_list(mask, pos + 1, child if child is not True else {})
+                if not mask.startswith(")", pos):
+                    raise ValueError(f"Unbalanced fields mask: {mask!r}")
+                pos += 1
+            else:
+                node[last] = True
+        if not mask.startswith(",", pos):
+            return pos
+        pos += 1
+    return pos
+
+
+def select_fields(value: Any, tree: dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [select_fields(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "*" in tree:
+        return value
+    return {
+        key: item if tree[key] is True else select_fields(item, tree[key])
+        for key, item in value.items()
+        if key in tree
+    }
+
+
+def _matches(message: dict[str, Any], term: str) -> bool:
+    """A small subset of Gmail search: is:, label:, from:, after:/before: epoch seconds, keywords."""
+    key, _, value = term.partition(":")
+    headers = {item["name"].lower(): item["value"].lower() for item in message["headers"]}
+    labels = {label.lower() for label in message["labelIds"]}
+    if key in ("is", "label") and value:
+        return value in labels
+    if key == "from" and value:
+        return value in headers.get("from", "")
+    if key in ("after", "before") and value.isdigit():
+        received = int(message["internalDate"]) // 1000
+        return received > int(value) if key == "after" else received < int(value)
+    return term in headers.get("subject", "") or term in message["snippet"].lower()
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+class GmailStandIn(StandInServer):
+    name = "gmail-stand-in"
+
+    def __init__(
+        self,
+        knobs: Knobs | None = None,
+        *,
+        mailbox_size: int = 200,
+        body_bytes: int = 2048,
+        **kwargs: Any,
+    ) -> None:
+        self.body_bytes = body_bytes
+        self.messages: dict[str, dict[str, Any]] = {}
+        self.history: list[dict[str, Any]] = []
+        self.history_id = 1000
+        self._ids = itertools.count(0x18C2A9F0000)
+        self._mailbox_lock = threading.Lock()
+        super().__init__(knobs, **kwargs)
+        self.deliver(mailbox_size, record_history=False)
+
+    def routes(self) -> list[Route]:
+        return [
+            ("GET", _PREFIX + r"/profile", self._profile),
+            ("GET", _PREFIX + r"/messages", self._list_messages),
+            ("GET", _PREFIX + r"/messages/(?P<id>[^/]+)", self._get_message),
+            ("POST", _PREFIX + r"/messages/(?P<id>[^/]+)/modify", self._modify_message),
+            ("DELETE", _PREFIX + r"/messages/(?P<id>[^/]+)", self._delete_message),
+            ("GET", _PREFIX + r"/messages/(?P<id>[^/]+)/attachments/(?P<attachment>[^/]+)", self._get_attachment),
+            ("GET", _PREFIX + r"/history", self._list_history),
+            ("POST", r"/batch/gmail/v1", self._batch),
+        ]
+
+    def dispatch(self, request: Request) -> Response:
+        response = super().dispatch(request)
+        mask = request.arg("fields")
+        if mask and response.status == 200 and isinstance(response.body, dict):
+            response.body = select_fields(response.body, parse_fields(mask))
+        return response
+
+    def server_error(self, request: Request) -> Response:
+        return _error(500, "backendError", "Backend Error")
+
+    def rate_limited(self, request: Request) -> Response:
+        return _error(429, "rateLimitExceeded", "Quota exceeded for quota metric 'Queries'.")
+
+    def not_found(self, request: Request) -> Response:
+        return _error(404, "notFound", "Requested entity was not found.")
+
+    def deliver(self, count: int = 1, *, record_history: bool = True) -> list[str]:
+        """Add ``count`` unread messages to the top of the inbox; return their ids."""
+        added = []
+        with self._mailbox_lock:
+            for _ in range(count):
+                message_id = f"{next(self._ids):x}"
+                self.history_id += 1
+                index = len(self.messages)
+                body = f"Message {index} body. " * max(1, self.body_bytes // 20)
+                self.messages = {
+                    message_id: {
+                        "id": message_id,
+                        "threadId": message_id,
+                        "labelIds": ["INBOX", "UNREAD"],
+                        "snippet": body[:100],
+                        "historyId": str(self.history_id),
+                        "internalDate": str(1_790_000_000_000 + index * 60_000),
+                        "sizeEstimate": len(body),
+                        "headers": [
+                            {"name": "From", "value": f"Sender {index} <sender{index}@example.com>"},
+                            {"name": "To", "value": "me@example.com"},
+                            {"name": "Date", "value": "Mon, 19 Oct 2026 09:00:00 +0000"},
+                            {"name": "Subject", "value": f"Subject {index}"},
+                        ],
+                        "body": body[: self.body_bytes],
+                    },
+                    **self.messages,
+                }
+                if record_history:
+                    self._record({"messagesAdded": [{"message": self._summary(message_id)}]})
+                added.append(message_id)
+        return added
+
+    def attach(self, message_id: str, filename: str, data: bytes, mime_type: str = "application/pdf") -> str:
+        """Attach a file to a delivered message; return its attachment id."""
+        with self._mailbox_lock:
+            attachments = self.messages[message_id].setdefault("attachments", [])
+            attachment_id = f"ANGjdJ{message_id}x{len(attachments)}"
+            attachments.append(
+                {"attachmentId": attachment_id, "filename": filename, "mimeType": mime_type, "data": data}
+            )
+        return attachment_id
+
+    def _record(self, change: dict[str, Any]) -> None:
+        self.history_id += 1
+        self.history.append({"id": str(self.history_id), **change})
+
+    def _summary(self, message_id: str) -> dict[str, Any]:
+        message = self.messages[message_id]
+        return {"id": message_id, "threadId": message["threadId"], "labelIds": list(message["labelIds"])}
+
+    def _resource(self, message: dict[str, Any], fmt: str, headers: list[str]) -> dict[str, Any]:
+        resource = {
+            key: value for key, value in message.items() if key not in ("headers", "body", "attachments")
+        }
+        if fmt == "minimal":
+            return resource
+        if fmt == "raw":
+            lines = [f"{item['name']}: {item['value']}" for item in message["headers"]]
+            resource["raw"] = _b64("\r\n".join([*lines, "Content-Type: text/plain; charset=UTF-8", "", message["body"]]))
+            return resource
+        payload: dict[str, Any] = {
+            "partId": "",
+            "mimeType": "multipart/alternative",
+            "filename": "",
+            "headers": message["headers"],
+            "body": {"size": 0},
+        }
+        if fmt == "metadata":
+            if headers:
+                wanted = {name.lower() for name in headers}
+                payload["headers"] = [item for item in message["headers"] if item["name"].lower() in wanted]
+        else:
+            body = message["body"]
+            html_body = f"<p>{body}</p>"
+            payload["parts"] = [
+                {
+                    "partId": str(index),
+                    "mimeType": mime_type,
+                    "filename": "",
+                    "headers": [
+                        {"name": "Content-Type", "value": f"{mime_type}; charset=\"UTF-8\""},
+                        {"name": "Content-Transfer-Encoding", "value": "quoted-printable"},
+                    ],
+                    "body": {"size": len(text), "data": _b64(text)},
+                }
+                for index, (mime_type, text) in enumerate((("text/plain", body), ("text/html", html_body)))
+            ]
+            if message.get("attachments"):
+                text_parts = payload.pop("parts")
+                payload["mimeType"] = "multipart/mixed"
+                payload["parts"] = [
+                    {"partId": "0", "mimeType": "multipart/alternative", "filename": "", "parts": text_parts},
+                    *(
+                        {
+                            "partId": str(index),
+                            "mimeType": attachment["mimeType"],
+                            "filename": attachment["filename"],
+                            "headers": [{"name": "Content-Disposition", "value": "attachment"}],
+                            "body": {"attachmentId": attachment["attachmentId"], "size": len(attachment["data"])},
+                        }
+                        for index, attachment in enumerate(message["attachments"], start=1)
+                    ),
+                ]
+        resource["payload"] = payload
+        return resource
+
+    def _profile(self, request: Request) -> Response:
+        with self._mailbox_lock:
+            return Response(
+                body={
+                    "emailAddress": "me@example.com",
+                    "messagesTotal": len(self.messages),
+                    "threadsTotal": len(self.messages),
+                    "historyId": str(self.history_id),
+                }
+            )
+
+    def _list_messages(self, request: Request) -> Response:
+        max_results = min(int(request.arg("maxResults", "100") or 100), 500)
+        offset = int(request.arg("pageToken", "0") or 0)
+        labels = set(request.query.get("labelIds", []))
+        terms = (request.arg("q", "") or "").lower().split()
+        with self._mailbox_lock:
+            matching = [
+                self._summary(message_id)
+                for message_id, message in self.messages.items()
+                if labels <= set(message["labelIds"]) and all(_matches(message, term) for term in terms)
+            ]
+        page = matching[offset : offset + max_results]
+        body: dict[str, Any] = {"resultSizeEstimate": len(matching)}
+        if page:
+            body["messages"] = [{"id": item["id"], "threadId": item["threadId"]} for item in page]
+        if offset + max_results < len(matching):
+            body["nextPageToken"] = str(offset + max_results)
+        return Response(body=body)
+
+    def _get_message(self, request: Request) -> Response:
+        with self._mailbox_lock:
+            message = self.messages.get(request.params["id"])
+        if message is None:
+            return self.not_found(request)
+        fmt = request.arg("format", "full") or "full"
+        return Response(body=self._resource(message, fmt, request.query.get("metadataHeaders", [])))
+
+    def _get_attachment(self, request: Request) -> Response:
+        with self._mailbox_lock:
+            message = self.messages.get(request.params["id"])
+            attachments = message.get("attachments", []) if message else []
+        for attachment in attachments:
+            if attachment["attachmentId"] == request.params["attachment"]:
+                data = base64.urlsafe_b64encode(attachment["data"]).decode("ascii")
+                return Response(
+                    body={"attachmentId": attachment["attachmentId"], "size": len(attachment["data"]), "data": data}
+                )
+        return self.not_found(request)
+
+    def _modify_message(self, request: Request) -> Response:
+        changes = request.json()
+        message_id = request.params["id"]
+        with self._mailbox_lock:
+            message = self.messages.get(message_id)
+            if message is None:
+                return self.not_found(request)
+            removed = [label for label in changes.get("removeLabelIds", []) if label in message["labelIds"]]
+            added = [label for label in changes.get("addLabelIds", []) if label not in message["labelIds"]]
+            message["labelIds"] = [label for label in message["labelIds"] if label not in removed] + added
+            if removed:
+                self._record({"labelsRemoved": [{"message": self._summary(message_id), "labelIds": removed}]})
+            if added:
+                self._record({"labelsAdded": [{"message": self._summary(message_id), "labelIds": added}]})
+            return Response(body=self._summary(message_id))
+
+    def _delete_message(self, request: Request) -> Response:
+        message_id = request.params["id"]
+        with self._mailbox_lock:
+            if message_id not in self.messages:
+                return self.not_found(request)
+            summary = self._summary(message_id)
+            del self.messages[message_id]
+            self._record({"messagesDeleted": [{"message": summary}]})
+        return Response(204)
+
+    def _list_history(self, request: Request) -> Response:
+        start = request.arg("startHistoryId")
+        if start is None:
+            return _error(400, "invalidArgument", "Missing startHistoryId")
+        max_results = min(int(request.arg("maxResults", "100") or 100), 500)
+        offset = int(request.arg("pageToken", "0") or 0)
+        with self._mailbox_lock:
+            changes = [item for item in self.history if int(item["id"]) > int(start)]
+            current = str(self.history_id)
+        page = changes[offset : offset + max_results]
+        body: dict[str, Any] = {"historyId": current}
+        if page:
+            body["history"] = page
+        if offset + max_results < len(changes):
+            body["nextPageToken"] = str(offset + max_results)
+        return Response(body=body)
+
+    def _batch(self, request: Request) -> Response:
+        content_type = request.headers.get("content-type", "")
+        parsed = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + request.body
+        )
+        if not parsed.is_multipart():
+            return _error(400, "invalidArgument", "Batch body must be multipart/mixed")
+        parts = list(parsed.iter_parts())  # type: ignore[attr-defined]
+        if len(parts) > MAX_BATCH_SIZE:
+            return _error(400, "invalidArgument", f"Too many requests in batch (max {MAX_BATCH_SIZE})")
+        chunks = []
+        for part in parts:
+            content_id = str(part.get("Content-ID", "<>")).strip()[1:-1]
+            response = self._batch_part(str(part.get_payload()))
+            payload = response.encoded()
+            reason = http.HTTPStatus(response.status).phrase
+            chunks.append(
+                (
+                    f"--{_BOUNDARY}\r\nContent-Type: application/http\r\n"
+                    f"Content-ID: <response-{content_id}>\r\n\r\n"
+                    f"HTTP/1.1 {response.status} {reason}\r\n"
+                    f"Content-Type: {response.content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n"
+                ).encode()
+                + payload
+                + b"\r\n"
+            )
+        chunks.append(f"--{_BOUNDARY}--\r\n".encode())
+        return Response(body=b"".join(chunks), content_type=f"multipart/mixed; boundary={_BOUNDARY}")
+
+    def _batch_part(self, text: str) -> Response:
+        head, _, body = text.replace("\r\n", "\n").partition("\n\n")
+        method, target, *_ = head.split("\n", 1)[0].split(" ")
+        url = urllib.parse.urlsplit(target)
+        # Each part counts against quota on its own, like the real batch endpoint.
+        with self._lock:
+            throttle = self._rng.random() < self.knobs.rate_limit_rate
+        if throttle:
+            return self.rate_limited(Request(method, url.path, {}, {}, b""))
+        return self.dispatch(
+            Request(method, url.path, urllib.parse.parse_qs(url.query), {}, body.encode("utf-8"))
+        )
@@ -0,0 +1,21 @@
+"""Latency summaries shared by the benchmark scripts."""
+
+from __future__ import annotations
+
+import statistics
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summary(samples: list[float], percentiles: tuple[int, ...] = (50, 95)) -> dict[str, float]:
+    """Mean and percentiles of samples in seconds, reported in milliseconds."""
+    if not samples:
+        return {}
+    report = {"mean_ms": round(statistics.fmean(samples) * 1000, 1)}
+    for pct in percentiles:
+        report[f"p{pct}_ms"] = round(percentile(samples, pct) * 1000, 1)
+    return report
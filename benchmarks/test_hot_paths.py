@@ -0,0 +1,133 @@
+"""Microbenchmarks for Gmail parsing and reply formatting with large fixtures."""
+
+from __future__ import annotations
+
+import base64
+from typing import Any
+
+import pytest
+
+import main
+from benchmarks.conftest import ENABLED
+from benchmarks.fakes import FakeMailMessage
+from gmail_client_impl.gmail_impl import (
+    _decode_body,
+    _extract_body,
+    _extract_headers,
+    _find_part,
+    _parse_gmail_message,
+)
+
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.skipif(not ENABLED, reason="set SMART_CHAT_BOT_BENCHMARKS=1 to run"),
+]
+
+_LINE = "The quarterly numbers are attached; see the summary below for details. "
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def _body_text(megabytes: float) -> str:
+    # Mostly normal lines plus some longer than the 1900-char Discord limit.
+    lines = []
+    size = 0
+    index = 0
+    while size < megabytes * 1024 * 1024:
+        line = _LINE * (40 if index % 25 == 0 else 1)
+        lines.append(line)
+        size += len(line) + 1
+        index += 1
+    return "\n".join(lines)
+
+
+def _headers(count: int) -> list[dict[str, str]]:
+    headers = [
+        {"name": "Received", "value": f"from mx{i}.example.com by relay{i}.example.net; {_LINE}"}
+        for i in range(count)
+    ]
+    headers += [
+        {"name": "From", "value": "Alice Example <alice@example.com>"},
+        {"name": "To", "value": ", ".join(f"user{i}@example.com" for i in range(200))},
+        {"name": "Date", "value": "Mon, 19 Oct 2026 09:00:00 +0000"},
+        {"name": "Subject", "value": "Re: " * 30 + "Quarterly report"},
+    ]
+    return headers
+
+
+def _deep_multipart(depth: int, leaf: dict[str, Any]) -> dict[str, Any]:
+    # Each level carries an attachment before the nested part, like forwarded mail.
+    payload = leaf
+    for level in range(depth):
+        payload = {
+            "mimeType": "multipart/mixed",
+            "parts": [
+                {"mimeType": "application/pdf", "filename": f"a{level}.pdf", "body": {"size": 1}},
+                {"mimeType": "image/png", "filename": f"i{level}.png", "body": {"size": 1}},
+                payload,
+            ],
+        }
+    return payload
+
+
+BODY_TEXT = _body_text(4)
+BODY_DATA = _b64(BODY_TEXT)
+DEEP_PAYLOAD = {
+    "headers": _headers(300),
+    **_deep_multipart(60, {"mimeType": "text/plain", "body": {"data": BODY_DATA}}),
+}
+FULL_MESSAGE = {"id": "18c2a9f0", "snippet": _LINE, "payload": DEEP_PAYLOAD}
+HTML_ONLY = _deep_multipart(60, {"mimeType": "text/html", "body": {"data": _b64("<p>hi</p>")}})
+
+
+def test_decode_body_4mb(bench: Any) -> None:
+    result = bench(lambda: _decode_body(BODY_DATA))
+    assert result.rounds >= 3
+
+
+def test_extract_headers_300_received(bench: Any) -> None:
+    assert _extract_headers(DEEP_PAYLOAD)["subject"].endswith("Quarterly report")
+    bench(lambda: _extract_headers(DEEP_PAYLOAD))
+
+
+def test_find_part_depth_60(bench: Any) -> None:
+    assert _find_part(DEEP_PAYLOAD, "text/plain") == BODY_DATA
+    bench(lambda: _find_part(DEEP_PAYLOAD, "text/plain"))
+
+
+def test_extract_body_html_fallback_depth_60(bench: Any) -> None:
+    # Searches the whole tree for text/plain before falling back to text/html.
+    assert _extract_body(HTML_ONLY) == "<p>hi</p>"
+    bench(lambda: _extract_body(HTML_ONLY))
+
+
+def test_extract_body_deep_4mb(bench: Any) -> None:
+    bench(lambda: _extract_body(DEEP_PAYLOAD))
+
+
+def test_parse_gmail_message_full(bench: Any) -> None:
+    bench(lambda: _parse_gmail_message(FULL_MESSAGE, include_body=True))
+
+
+def test_parse_gmail_message_metadata(bench: Any) -> None:
+    bench(lambda: _parse_gmail_message(FULL_MESSAGE, include_body=False))
+
+
+def test_format_message_entry(bench: Any) -> None:
+    # Gmail escapes subjects and snippets, and cuts snippets at about 200 characters.
+    message = FakeMailMessage(
+        "18c2a9f0",
+        subject="Re: Q3 &quot;R&amp;D&quot; budget &ndash; Alice&#39;s notes &lt;draft&gt;",
+        snippet=("We&#39;re &quot;on track&quot; for Q3 &amp; the R&amp;D line is &lt;5% over. " * 3)[:200],
+    )
+    entry = main._format_message_entry(message)
+    assert 'Subject: Re: Q3 "R&D" budget – Alice\'s notes <draft>' in entry
+    bench(lambda: main._format_message_entry(message))
+
+
+def test_split_message_4mb(bench: Any) -> None:
+    chunks = main._split_message(BODY_TEXT)
+    assert "".join(chunks).replace("\n", "") == BODY_TEXT.replace("\n", "")
+    bench(lambda: main._split_message(BODY_TEXT))
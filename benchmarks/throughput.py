@@ -0,0 +1,195 @@
+"""End-to-end throughput benchmark for the chat handler, fully offline.
+
+Drives ``main._make_chat_handler`` with a synthetic stream of DMs from many
+users through fake chat, mail and AI clients with configurable latency and
+error rates, then reports throughput, latency percentiles and peak memory
+as JSON. Compare a run against an earlier one with ``--compare``.
+
+    uv run python -m benchmarks.throughput --messages 2000 --concurrency 64 \\
+        --ai-latency lognormal:0.4:0.5 --mail-latency uniform:0.05:0.2 \\
+        --out bench.json
+    uv run python -m benchmarks.throughput --compare bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import main
+from benchmarks.fakes import (
+    RECORDED_MESSAGES,
+    FakeAIClient,
+    FakeChatClient,
+    FakeChatMessage,
+    FakeMailClient,
+    Latency,
+)
+from benchmarks.stats import summary
+
+
+@dataclass
+class BenchmarkConfig:
+    messages: int = 500
+    users: int = 100
+    concurrency: int = 32
+    ai_latency: str = "lognormal:0.4:0.5"
+    mail_latency: str = "uniform:0.05:0.2"
+    chat_latency: str = "uniform:0.02:0.08"
+    ai_error_rate: float = 0.0
+    mail_error_rate: float = 0.0
+    chat_error_rate: float = 0.0
+    stream_replies: bool = True
+    combined_reply: bool = True
+    trace_memory: bool = False
+    seed: int = 0
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _workload(config: BenchmarkConfig) -> list[FakeChatMessage]:
+    rng = random.Random(config.seed)
+    messages = []
+    for index in range(config.messages):
+        user = f"user{rng.randrange(config.users)}"
+        content, _ = rng.choice(RECORDED_MESSAGES)
+        messages.append(FakeChatMessage(str(index), f"dm-{user}", user, content))
+    return messages
+
+
+async def run(config: BenchmarkConfig) -> dict[str, Any]:
+    chat_client = FakeChatClient(
+        Latency.parse(config.chat_latency, error_rate=config.chat_error_rate, seed=config.seed)
+    )
+    mail_client = FakeMailClient(
+        Latency.parse(config.mail_latency, error_rate=config.mail_error_rate, seed=config.seed + 1)
+    )
+    ai_client = FakeAIClient(
+        Latency.parse(config.ai_latency, error_rate=config.ai_error_rate, seed=config.seed + 2)
+    )
+    main._STREAM_REPLIES = config.stream_replies
+    main._COMBINED_REPLY = config.combined_reply
+    main._AI_BREAKER = main.ai_client_api.CircuitBreaker()
+    main.ai_client_api.get_ai_client = lambda: ai_client
+    main._get_mail_client = lambda user_id: mail_client
+    handler = main._make_chat_handler(chat_client)
+
+    queue: asyncio.Queue[FakeChatMessage] = asyncio.Queue()
+    for message in _workload(config):
+        queue.put_nowait(message)
+    latencies: list[float] = []
+    errors = 0
+
+    async def _worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            message = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await handler(message)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    if config.trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(config.concurrency)))
+    elapsed = time.perf_counter() - started
+    peak_traced = tracemalloc.get_traced_memory()[1] if config.trace_memory else None
+    if config.trace_memory:
+        tracemalloc.stop()
+
+    report: dict[str, Any] = {
+        "git_commit": _git_commit(),
+        "config": asdict(config),
+        "messages": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_msg_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency": {**summary(latencies, (50, 95, 99)), "max_ms": round(max(latencies) * 1000, 1)},
+        "ai_calls": ai_client.calls,
+        "chat_sends": chat_client.sent,
+        "chat_edits": chat_client.edits,
+        "max_rss_mb": _max_rss_mb(),
+    }
+    if peak_traced is not None:
+        report["peak_traced_mb"] = round(peak_traced / (1024 * 1024), 2)
+    return report
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> dict[str, Any]:
+    """Relative change of the headline numbers; positive latency deltas are regressions."""
+
+    def _delta(new: float, old: float) -> float | None:
+        return round((new - old) / old * 100, 1) if old else None
+
+    deltas: dict[str, Any] = {
+        "baseline_commit": baseline.get("git_commit"),
+        "throughput_pct": _delta(current["throughput_msg_s"], baseline["throughput_msg_s"]),
+    }
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        deltas[f"{key}_pct"] = _delta(current["latency"][key], baseline["latency"][key])
+    return deltas
+
+
+def main_cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = BenchmarkConfig()
+    parser.add_argument("--messages", type=int, default=defaults.messages)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    for name in ("ai", "mail", "chat"):
+        parser.add_argument(
+            f"--{name}-latency",
+            default=getattr(defaults, f"{name}_latency"),
+            help="seconds, uniform:low:high or lognormal:median:sigma",
+        )
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0)
+    parser.add_argument("--no-stream", dest="stream_replies", action="store_false")
+    parser.add_argument("--no-combined", dest="combined_reply", action="store_false")
+    parser.add_argument("--trace-memory", action="store_true", help="report tracemalloc peak (slower)")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to diff against")
+    args = parser.parse_args(argv)
+
+    options = vars(args)
+    config = BenchmarkConfig(
+        **{key: options[key] for key in asdict(defaults) if key in options}
+    )
+    report = asyncio.run(run(config))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            report["compare"] = compare(report, json.load(handle))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
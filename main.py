@@ -1,37 +1,233 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import contextvars
+import dataclasses
+import datetime
+import functools
+import hmac
 import html
 import logging
 import os
 import re
-from typing import Any
-from fastapi import FastAPI
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from typing import TYPE_CHECKING, Any
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
-import uvicorn
 
 import ai_client_api
 import mail_client_api
 import chat_client_api
 
-import claude_client_impl
-import gmail_client_impl
-import discord_client_impl
+from smart_chat_bot import deadline, memory, notifier, summarize
+from telemetry import metrics, profiling, tracing
+from telemetry.deadline import call_deadline
+from telemetry.loop_monitor import LoopLagMonitor
 
+if TYPE_CHECKING:
+    from smart_chat_bot import intent_model
+
+# Provider packages (Claude, Gmail, Discord) are found through entry points and
+# imported on first use, so the SDKs behind them stay out of startup.
+load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+_MESSAGE_LIMIT = 1900
+_STREAM_REPLIES = os.environ.get("SMART_CHAT_BOT_STREAM_REPLIES", "1") != "0"
+# Let the parser answer chit-chat in the same call instead of a second reply call.
+_COMBINED_REPLY = os.environ.get("SMART_CHAT_BOT_COMBINED_REPLY", "1") != "0"
+_INTENT_MODEL_PATH = os.environ.get("SMART_CHAT_BOT_INTENT_MODEL")
+# Unset keeps the model's own default; numpy is only imported once a model is used.
+_INTENT_THRESHOLD = (
+    float(os.environ["SMART_CHAT_BOT_INTENT_THRESHOLD"])
+    if os.environ.get("SMART_CHAT_BOT_INTENT_THRESHOLD")
+    else None
+)
+# When set, successful AI parses are appended here as training data.
+_INTENT_CORPUS_PATH = os.environ.get("SMART_CHAT_BOT_INTENT_CORPUS")
+_INTENT_MODEL: intent_model.IntentModel | None = None
+_AI_UNAVAILABLE_REPLY = (
+    "My AI helper is unavailable right now. You can still use commands like "
+    "'get 5 mail', 'get mail <id>', 'get attachments <id>', 'read mail <id>', "
+    "'delete mail <id>', 'login' or 'logout'."
+)
+
+_TIMEOUT_REPLY = "Sorry, that took too long. Please try again in a moment."
+# Every DM gets an answer within this many seconds; slower steps are cut short.
+_MESSAGE_BUDGET_SECONDS = float(os.environ.get("SMART_CHAT_BOT_MESSAGE_BUDGET_SECONDS", "20"))
+# Held back from AI and mail calls so there is always time left to reply.
+_REPLY_RESERVE_SECONDS = float(os.environ.get("SMART_CHAT_BOT_REPLY_RESERVE_SECONDS", "3"))
+
+# Shared by every AI call so a provider incident trips it once for all users.
+_AI_BREAKER = ai_client_api.CircuitBreaker(
+    failure_rate=float(os.environ.get("SMART_CHAT_BOT_AI_FAILURE_RATE", "0.5")),
+    slow_call_seconds=float(os.environ.get("SMART_CHAT_BOT_AI_SLOW_SECONDS", "10")),
+    open_seconds=float(os.environ.get("SMART_CHAT_BOT_AI_OPEN_SECONDS", "30")),
+)
+# Discord allows roughly five edits per five seconds per channel.
+_STREAM_EDIT_INTERVAL_SECONDS = 1.0
+
+_PARSE_SECONDS = metrics.histogram(
+    "smart_chat_bot_parse_seconds", "Command parse latency per stage.", ["stage"]
+)
+# Share of messages each stage answers; rule + local is the AI-free hit rate.
+_PARSED_BY = metrics.counter(
+    "smart_chat_bot_parsed_total", "Messages by the parse stage that resolved them.", ["stage"]
+)
+_MESSAGE_SECONDS = metrics.histogram(
+    "smart_chat_bot_message_seconds", "End-to-end DM handling latency."
+)
+# Debug routes are only served when this token is set and sent as X-Debug-Token.
+_DEBUG_TOKEN = os.environ.get("SMART_CHAT_BOT_DEBUG_TOKEN")
+_MEMORY_TRACKER = profiling.MemoryTracker()
+# Stalls longer than this are logged with the blocking stack; 0 disables the monitor.
+_LOOP_LAG_THRESHOLD_SECONDS = (
+    float(os.environ.get("SMART_CHAT_BOT_LOOP_LAG_THRESHOLD_MS", "250")) / 1000
+)
+_LOOP_MONITOR = LoopLagMonitor(threshold=_LOOP_LAG_THRESHOLD_SECONDS)
+# Per-message summaries survive between digests, so repeats only pay for new mail.
+_SUMMARY_CACHE = summarize.SummaryCache()
+_SUMMARIZE_MAX_RESULTS = int(os.environ.get("SMART_CHAT_BOT_SUMMARIZE_MAX_RESULTS", "50"))
+_NOTIFY_NEW_MAIL = os.environ.get("SMART_CHAT_BOT_NOTIFY_NEW_MAIL", "0") != "0"
+_NOTIFIER_CONFIG = notifier.NotifierConfig(
+    min_interval=float(os.environ.get("SMART_CHAT_BOT_NOTIFY_MIN_INTERVAL_SECONDS", "60")),
+    max_interval=float(os.environ.get("SMART_CHAT_BOT_NOTIFY_MAX_INTERVAL_SECONDS", "1800")),
+    concurrency=int(os.environ.get("SMART_CHAT_BOT_NOTIFY_CONCURRENCY", "32")),
+    polls_per_second=float(os.environ.get("SMART_CHAT_BOT_NOTIFY_POLLS_PER_SECOND", "20")),
+)
+# Discord rejects larger uploads on servers without boosts.
+_ATTACHMENT_MAX_BYTES = int(os.environ.get("SMART_CHAT_BOT_ATTACHMENT_MAX_BYTES", str(10 * 1024 * 1024)))
+# Total each user may forward per window, so repeated "send all attachments" stays bounded.
+_ATTACHMENT_USER_BYTES = int(os.environ.get("SMART_CHAT_BOT_ATTACHMENT_USER_BYTES", str(25 * 1024 * 1024)))
+_ATTACHMENT_USER_WINDOW_SECONDS = float(
+    os.environ.get("SMART_CHAT_BOT_ATTACHMENT_USER_WINDOW_SECONDS", "3600")
+)
+# (monotonic time, bytes) forwarded per user, oldest first; only touched on the event loop.
+_ATTACHMENT_USAGE: dict[str, deque[tuple[float, int]]] = {}
+# Recent turns per user, so follow-ups such as "delete the second one" take one AI call.
+_CONVERSATION_MEMORY = os.environ.get("SMART_CHAT_BOT_MEMORY", "1") != "0"
+_CONVERSATIONS = memory.ConversationStore(
+    memory.MemoryConfig(
+        budget_tokens=int(os.environ.get("SMART_CHAT_BOT_MEMORY_BUDGET_TOKENS", "1500")),
+        idle_seconds=float(os.environ.get("SMART_CHAT_BOT_MEMORY_IDLE_SECONDS", "1800")),
+        max_bytes=int(os.environ.get("SMART_CHAT_BOT_MEMORY_MAX_BYTES", str(32 * 1024 * 1024))),
+    ),
+    db_path=os.environ.get("SMART_CHAT_BOT_MEMORY_DB") or None,
+)
+# Caps concurrent OAuth starts and token exchanges so a re-link storm after an
+# outage cannot take every worker thread from DM handling.
+_AUTH_SLOTS = asyncio.Semaphore(int(os.environ.get("SMART_CHAT_BOT_AUTH_CONCURRENCY", "8")))
+
 app = FastAPI()
 
-claude_client_impl.register()
-gmail_client_impl.register()
-discord_client_impl.register()
+
+@dataclasses.dataclass
+class _Exchange:
+    """One DM being handled: the memory it started with and what the bot said back."""
+
+    history: list[ai_client_api.Turn]
+    listed_ids: list[str]
+    replies: list[str] = dataclasses.field(default_factory=list)
+    new_listed_ids: list[str] | None = None
+    forget: bool = False
+
+
+# Set per DM like the deadline, so _send and the AI helpers reach it without new arguments.
+_EXCHANGE: contextvars.ContextVar[_Exchange | None] = contextvars.ContextVar(
+    "smart_chat_bot_exchange", default=None
+)
 
 
 def _get_mail_client(user_id: str) -> mail_client_api.MailClient:
     return mail_client_api.get_mail_client(user_id=user_id)
 
 
+def _get_ai_client() -> ai_client_api.AIClient:
+    return ai_client_api.CircuitBreakerAIClient(ai_client_api.get_ai_client(), _AI_BREAKER)
+
+
+def _ai_safety_timeout() -> float | None:
+    # Outlasts the timeout the provider is given by half the reply reserve, so the
+    # provider's own timeout fires first and counts against the breaker. This only
+    # catches a provider that ignores it, which the breaker also records as a failure.
+    return deadline.remaining_timeout(_REPLY_RESERVE_SECONDS / 2)
+
+
+def _budget_spent() -> bool:
+    timeout = deadline.remaining_timeout(_REPLY_RESERVE_SECONDS)
+    return timeout is not None and timeout <= 0
+
+
+async def _run_blocking(func: Any, *args: Any, reserve: float = 0.0, **kwargs: Any) -> Any:
+    # Hands the same budget to the mail and chat transports, so a request still
+    # running in its worker thread gives up too instead of finishing unseen.
+    timeout = deadline.remaining_timeout(reserve)
+    with call_deadline(timeout):
+        return await deadline.run_blocking(func, *args, reserve=reserve, **kwargs)
+
+
+async def _send(chat_client: chat_client_api.ChatClient, channel_id: str, content: str) -> None:
+    with tracing.span("chat.send", chars=len(content)):
+        await _run_blocking(chat_client.send_message, channel_id, content)
+    exchange = _EXCHANGE.get()
+    if exchange is not None:
+        exchange.replies.append(content)
+
+
+def _history() -> list[ai_client_api.Turn]:
+    exchange = _EXCHANGE.get()
+    return exchange.history if exchange is not None else []
+
+
+async def _memory_call(func: Any, *args: Any, **kwargs: Any) -> Any:
+    # Only SQLite persistence touches disk; the in-memory store is cheap enough to call inline.
+    if _CONVERSATIONS.persistent:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+
+async def _load_exchange(user_id: str) -> _Exchange | None:
+    if not _CONVERSATION_MEMORY:
+        return None
+    try:
+        history = await _memory_call(_CONVERSATIONS.history, user_id)
+        listed_ids = await _memory_call(_CONVERSATIONS.message_ids, user_id)
+    except Exception:
+        logger.exception("Failed to load conversation memory")
+        return _Exchange([], [])
+    return _Exchange(history, listed_ids)
+
+
+async def _remember(user_id: str, content: str, exchange: _Exchange) -> None:
+    try:
+        if exchange.forget:
+            await _memory_call(_CONVERSATIONS.forget, user_id)
+            return
+        reply = "\n".join(exchange.replies)
+        if exchange.new_listed_ids:
+            # Ids go first so they survive truncation of a long listing.
+            numbered = ", ".join(
+                f"{index}={message_id}" for index, message_id in enumerate(exchange.new_listed_ids, 1)
+            )
+            reply = f"Listed message ids: {numbered}\n{reply}"
+        await _memory_call(
+            _CONVERSATIONS.record, user_id, content, reply, message_ids=exchange.new_listed_ids
+        )
+    except Exception:
+        logger.exception("Failed to record conversation memory")
+
+
+@contextlib.contextmanager
+def _parse_stage(stage: str) -> Iterator[None]:
+    with tracing.span(f"parse.{stage}"), _PARSE_SECONDS.labels(stage=stage).time():
+        yield
+
+
 def _parse_command_fallback(content: str) -> dict[str, Any] | None:
     text = content.strip().lower()
     if text in {"login", "login gmail", "link gmail"}:
@@ -39,14 +235,23 @@ def _parse_command_fallback(content: str) -> dict[str, Any] | None:
     if text in {"logout", "logout gmail", "unlink gmail"}:
         return {"action": "logout"}
 
-    match = re.match(r"get\s+(\d+)\s+mail", text)
+    # Anchored, so "get 5 mail from alice" goes on to a parser that reads the filter.
+    match = re.fullmatch(r"get\s+(\d+)\s+(?:e-?)?mails?", text)
     if match:
         return {"action": "get_messages", "max_results": int(match.group(1))}
 
+    match = re.fullmatch(r"summari[sz]e(?:\s+(\d+))?\s+(?:e-?)?mails?", text)
+    if match:
+        return {"action": "summarize", "max_results": int(match.group(1) or 10)}
+
     match = re.match(r"get\s+mail\s+(\S+)", text)
     if match:
         return {"action": "get_message", "message_id": match.group(1)}
 
+    match = re.match(r"get\s+attachments?\s+(\S+)", text)
+    if match:
+        return {"action": "get_attachments", "message_id": match.group(1)}
+
     match = re.match(r"delete\s+mail\s+(\S+)", text)
     if match:
         return {"action": "delete_message", "message_id": match.group(1)}
@@ -58,61 +263,149 @@ def _parse_command_fallback(content: str) -> dict[str, Any] | None:
     return None
 
 
-def _parse_command_with_ai(content: str) -> tuple[dict[str, Any] | None, str | None]:
+def _load_intent_model() -> None:
+    # Runs once at startup in a worker thread; reading the .npz would stall the loop.
+    global _INTENT_MODEL
+    if not _INTENT_MODEL_PATH:
+        return
+    from smart_chat_bot import intent_model
+
     try:
-        ai_client = ai_client_api.get_ai_client()
-    except Exception as exc:
-        return None, f"AI client unavailable: {exc}"
+        _INTENT_MODEL = intent_model.IntentModel.load(_INTENT_MODEL_PATH)
+    except Exception:
+        logger.exception("Failed to load intent model from %s", _INTENT_MODEL_PATH)
 
-    schema = {
-        "type": "object",
-        "properties": {
-            "action": {
-                "type": "string",
-                "enum": [
-                    "login",
-                    "logout",
-                    "get_messages",
-                    "get_message",
-                    "delete_message",
-                    "mark_as_read",
-                ],
-            },
-            "max_results": {"type": "integer"},
-            "message_id": {"type": "string"},
+
+def _parse_command_local(content: str) -> dict[str, Any] | None:
+    # Until the model has loaded, messages go straight to the AI.
+    model = _INTENT_MODEL
+    if model is None:
+        return None
+    if _INTENT_THRESHOLD is None:
+        return model.predict_command(content)
+    return model.predict_command(content, _INTENT_THRESHOLD)
+
+
+def _record_intent_example(content: str, command: dict[str, Any]) -> None:
+    if not _INTENT_CORPUS_PATH:
+        return
+    from smart_chat_bot import intent_model
+
+    try:
+        intent_model.record_example(_INTENT_CORPUS_PATH, content, command)
+    except OSError:
+        logger.exception("Failed to record intent example")
+
+
+_COMMAND_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "action": {
+            "type": "string",
+            "enum": [
+                "login",
+                "logout",
+                "get_messages",
+                "get_message",
+                "delete_message",
+                "mark_as_read",
+                "summarize",
+                "get_attachments",
+            ],
         },
-        "required": ["action"],
-    }
+        "max_results": {"type": "integer"},
+        "message_id": {"type": "string"},
+        "filename": {"type": "string"},
+        "query": {"type": "string"},
+        "labels": {"type": "array", "items": {"type": "string"}},
+        "after": {"type": "string"},
+        "before": {"type": "string"},
+    },
+    "required": ["action"],
+}
+
+_COMMAND_SYSTEM_PROMPT = (
+    "You are a Gmail assistant command parser. "
+    "Answer only by calling the provided tool. "
+    "Map user intent to one of: login, logout, get_messages, get_message, "
+    "delete_message, mark_as_read, summarize, get_attachments. "
+    "If user asks for latest/recent/last emails, use get_messages. "
+    "If user asks what is important in their emails or for a summary or digest, use summarize. "
+    "If user asks for a file or attachment from an email, use get_attachments and put "
+    "any file name or type they mention, such as pdf, in filename. "
+    "If user mentions a number, map to max_results (default 10 if omitted). "
+    "If user provides an id, map to message_id. "
+    "For get_messages and summarize, put sender, subject and keyword filters in query "
+    "using Gmail search syntax, e.g. 'unread from Alice' -> query 'is:unread from:alice'. "
+    "Put label ids such as INBOX, STARRED or IMPORTANT in labels, and date bounds in "
+    "after/before as YYYY-MM-DD. "
+    "Earlier turns may list message ids by number; map references such as "
+    "'the second one' or 'that email' to the matching message_id."
+)
+
+_COMBINED_SCHEMA: dict[str, Any] = {
+    **_COMMAND_SCHEMA,
+    "properties": {
+        **_COMMAND_SCHEMA["properties"],
+        "action": {
+            "type": "string",
+            "enum": [*_COMMAND_SCHEMA["properties"]["action"]["enum"], "reply"],
+        },
+        "reply": {"type": "string"},
+    },
+}
 
-    system_prompt = (
-        "You are a Gmail assistant command parser. "
-        "Return JSON only that matches the schema. No extra text. "
-        "Map user intent to one of: login, logout, get_messages, get_message, "
-        "delete_message, mark_as_read. "
-        "If user asks for latest/recent/last emails, use get_messages. "
-        "If user mentions a number, map to max_results (default 10 if omitted). "
-        "If user provides an id, map to message_id."
-    )
+_COMBINED_SYSTEM_PROMPT = (
+    _COMMAND_SYSTEM_PROMPT
+    + " If the message is not a mail command, use action reply and put a brief, "
+    "natural reply for a Discord DM in the reply field. "
+    "If the request is unclear, ask a short follow-up question there. "
+    "Do not mention internal schemas or tools."
+)
+
+
+async def _parse_command_with_ai(content: str) -> tuple[dict[str, Any] | None, str | None]:
+    try:
+        ai_client = _get_ai_client()
+    except Exception as exc:
+        return None, f"AI client unavailable: {exc}"
+
+    if _budget_spent():
+        return None, "No time left to ask the AI"
+    if _COMBINED_REPLY:
+        system_prompt, schema = _COMBINED_SYSTEM_PROMPT, _COMBINED_SCHEMA
+        profile = ai_client_api.COMBINED
+    else:
+        system_prompt, schema = _COMMAND_SYSTEM_PROMPT, _COMMAND_SCHEMA
+        profile = ai_client_api.INTENT
+    timeout = deadline.remaining_timeout(_REPLY_RESERVE_SECONDS)
     try:
-        result = ai_client.generate_response(
-            content,
-            system_prompt=system_prompt,
-            response_schema=schema,
+        result = await asyncio.wait_for(
+            ai_client.generate_response_async(
+                content,
+                system_prompt=system_prompt,
+                response_schema=schema,
+                timeout=timeout,
+                cache_prompt=True,
+                profile=profile,
+                history=_history(),
+            ),
+            _ai_safety_timeout(),
         )
+    except TimeoutError:
+        return None, "AI parsing timed out"
     except Exception as exc:
         return None, f"AI parsing error: {exc}"
     if not isinstance(result, dict):
         return None, "AI response did not match expected JSON object"
     if "action" not in result:
         return None, "Parsed result missing required field: action"
+    if result["action"] == "reply" and not str(result.get("reply") or "").strip():
+        return None, "Reply action missing reply text"
     return result, None
 
 
-def _fallback_ai_reply(content: str, reason: str | None) -> str | None:
-    try:
-        ai_client = ai_client_api.get_ai_client()
-    except Exception:
-        return None
+def _fallback_system_prompt(reason: str | None) -> str:
     system_prompt = (
         "You are a helpful Gmail assistant in Discord DMs. "
         "Reply naturally and briefly. "
@@ -121,17 +414,147 @@ def _fallback_ai_reply(content: str, reason: str | None) -> str | None:
     )
     if reason:
         system_prompt += f" Parsing failed because: {reason}"
-    response = ai_client.generate_response(content, system_prompt=system_prompt)
+    return system_prompt
+
+
+async def _fallback_ai_reply(content: str, reason: str | None) -> str | None:
+    try:
+        ai_client = _get_ai_client()
+    except Exception:
+        return None
+    timeout = deadline.remaining_timeout(_REPLY_RESERVE_SECONDS)
+    try:
+        response = await asyncio.wait_for(
+            ai_client.generate_response_async(
+                content,
+                system_prompt=_fallback_system_prompt(reason),
+                timeout=timeout,
+                profile=ai_client_api.REPLY,
+                history=_history(),
+            ),
+            _ai_safety_timeout(),
+        )
+    except ai_client_api.CircuitOpenError:
+        return _AI_UNAVAILABLE_REPLY
+    except TimeoutError:
+        return _TIMEOUT_REPLY
     return response if isinstance(response, str) else None
 
 
-def _parse_command(content: str) -> tuple[dict[str, Any] | None, str | None]:
-    ai_result, reason = _parse_command_with_ai(content)
-    if ai_result:
-        return ai_result, None
-    fallback = _parse_command_fallback(content)
+async def _stream_ai_reply(
+    chat_client: chat_client_api.ChatClient,
+    channel_id: str,
+    content: str,
+    reason: str | None,
+) -> None:
+    try:
+        ai_client = _get_ai_client()
+    except Exception:
+        return
+    timeout = deadline.remaining_timeout(_REPLY_RESERVE_SECONDS)
+    deltas = ai_client.stream_response(
+        content,
+        system_prompt=_fallback_system_prompt(reason),
+        timeout=timeout,
+        profile=ai_client_api.REPLY,
+        history=_history(),
+    )
+    streamed: list[str] = []
+
+    async def _collect() -> AsyncIterator[str]:
+        async for delta in deltas:
+            streamed.append(delta)
+            yield delta
+
+    try:
+        async with asyncio.timeout(_ai_safety_timeout()):
+            await _stream_to_chat(chat_client, channel_id, _collect())
+    except ai_client_api.CircuitOpenError:
+        await _send(chat_client, channel_id, _AI_UNAVAILABLE_REPLY)
+    except TimeoutError:
+        await _send(chat_client, channel_id, _TIMEOUT_REPLY)
+    finally:
+        exchange = _EXCHANGE.get()
+        if exchange is not None and streamed:
+            exchange.replies.append("".join(streamed))
+
+
+async def _stream_to_chat(
+    chat_client: chat_client_api.ChatClient,
+    channel_id: str,
+    deltas: AsyncIterator[str],
+    *,
+    edit_interval: float = _STREAM_EDIT_INTERVAL_SECONDS,
+    limit: int = _MESSAGE_LIMIT,
+) -> None:
+    """Post the first text as soon as it arrives, then edit it in coalesced updates.
+
+    Text beyond the message limit continues in a new message. Clients that
+    cannot edit get the whole reply in one send once the stream ends.
+    """
+    if not chat_client.supports_edits:
+        reply = "".join([delta async for delta in deltas])
+        if reply.strip():
+            for chunk in _split_message(reply, limit):
+                await _run_blocking(chat_client.send_message, channel_id, chunk)
+        return
+    loop = asyncio.get_running_loop()
+    message_id: str | None = None
+    text = ""
+    shown = ""
+    last_edit = 0.0
+
+    async def _show(current: str) -> None:
+        nonlocal message_id, shown, last_edit
+        if message_id is None:
+            posted = await _run_blocking(chat_client.create_message, channel_id, current)
+            if posted is None:
+                raise RuntimeError("create_message returned no message to edit")
+            message_id = posted.id
+        else:
+            await _run_blocking(
+                chat_client.edit_message, channel_id, message_id, current
+            )
+        shown = current
+        last_edit = loop.time()
+
+    async for delta in deltas:
+        text += delta
+        while len(text) > limit:
+            cut = text.rfind("\n", 0, limit)
+            cut = cut if cut > 0 else limit
+            await _show(text[:cut])
+            text = text[cut:].lstrip("\n")
+            message_id = None
+            shown = ""
+        if not text.strip() or text == shown:
+            continue
+        if message_id is None or loop.time() - last_edit >= edit_interval:
+            await _show(text)
+    if text.strip() and text != shown:
+        await _show(text)
+
+
+async def _parse_command(content: str) -> tuple[dict[str, Any] | None, str | None]:
+    # Cheapest first: exact rules, then the local model, then Claude.
+    with _parse_stage("rule"):
+        fallback = _parse_command_fallback(content)
     if fallback:
+        _PARSED_BY.labels(stage="rule").inc()
         return fallback, None
+    with _parse_stage("local"):
+        local = _parse_command_local(content)
+    if local:
+        _PARSED_BY.labels(stage="local").inc()
+        return local, None
+    with _parse_stage("ai"):
+        ai_result, reason = await _parse_command_with_ai(content)
+    if ai_result:
+        _PARSED_BY.labels(stage="ai").inc()
+        if _INTENT_CORPUS_PATH:
+            await asyncio.to_thread(_record_intent_example, content, ai_result)
+        return ai_result, None
+    _PARSED_BY.labels(stage="none").inc()
     return None, reason
 
 
@@ -164,7 +587,20 @@ def _format_message_entry(msg: mail_client_api.Message) -> str:
     )
 
 
-def _split_message(text: str, limit: int = 1900) -> list[str]:
+def _message_filters(command: dict[str, Any]) -> dict[str, Any]:
+    """Map the command's query/labels/after/before fields onto MailClient filter arguments."""
+    filters: dict[str, Any] = {}
+    if command.get("query"):
+        filters["query"] = str(command["query"])
+    if command.get("labels"):
+        filters["labels"] = [str(label) for label in command["labels"]]
+    for bound in ("after", "before"):
+        if command.get(bound):
+            filters[bound] = datetime.date.fromisoformat(str(command[bound]))
+    return filters
+
+
+def _split_message(text: str, limit: int = _MESSAGE_LIMIT) -> list[str]:
     chunks: list[str] = []
     current: list[str] = []
     current_len = 0
@@ -186,94 +622,338 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics_endpoint() -> Response:
+    rendered = metrics.render()
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    body, content_type = rendered
+    return Response(content=body, media_type=content_type)
+
+
+def _require_debug_token(x_debug_token: str | None = Header(default=None)) -> None:
+    # 404 rather than 401 so the routes are invisible without the token.
+    if not _DEBUG_TOKEN or not hmac.compare_digest(x_debug_token or "", _DEBUG_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+debug_router = APIRouter(prefix="/debug", dependencies=[Depends(_require_debug_token)])
+
+
+@debug_router.get("/traces")
+def debug_traces(limit: int = 20, min_ms: float = 0.0) -> dict[str, Any]:
+    return {"traces": tracing.recent_traces(limit=limit, min_ms=min_ms)}
+
+
+@debug_router.get("/profile")
+async def debug_profile(seconds: float = 10.0, mode: str = "cprofile") -> Response:
+    """Profile live traffic; cprofile covers the event loop, sample every thread."""
+    try:
+        if mode == "cprofile":
+            data = await profiling.profile_cpu(seconds)
+            return Response(
+                content=data,
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": 'attachment; filename="profile.pstats"'},
+            )
+        if mode == "sample":
+            stacks = await asyncio.to_thread(profiling.sample_stacks, seconds)
+            return Response(
+                content=stacks,
+                media_type="text/plain",
+                headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'},
+            )
+    except profiling.ProfilerBusyError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    raise HTTPException(status_code=400, detail="mode must be cprofile or sample")
+
+
+@debug_router.get("/memory")
+def debug_memory(top: int = 25, diff: bool = False) -> dict[str, Any]:
+    return _MEMORY_TRACKER.snapshot(top=top, diff=diff)
+
+
+@debug_router.delete("/memory")
+def debug_memory_stop() -> dict[str, bool]:
+    _MEMORY_TRACKER.stop()
+    return {"tracing": False}
+
+
+@debug_router.get("/stalls")
+def debug_stalls() -> dict[str, Any]:
+    return {"max_lag_seconds": _LOOP_MONITOR.max_lag, "stalls": _LOOP_MONITOR.stalls()}
+
+
+@debug_router.get("/tasks")
+async def debug_tasks() -> Response:
+    return Response(content=profiling.task_stacks(), media_type="text/plain")
+
+
+app.include_router(debug_router)
+
+
 @app.get("/auth/mail/start")
-def gmail_auth_start(discord_user_id: str) -> RedirectResponse:
-    client = _get_mail_client(discord_user_id)
-    data = client.login()
+async def gmail_auth_start(discord_user_id: str) -> RedirectResponse:
+    async with _AUTH_SLOTS:
+        # Token store and OAuth flow setup touch SQLite and disk.
+        client = await asyncio.to_thread(_get_mail_client, discord_user_id)
+        data = await asyncio.to_thread(client.login)
     return RedirectResponse(url=data["authorization_url"])
 
 
 @app.get("/auth/mail/callback")
-def gmail_auth_callback(code: str, state: str) -> HTMLResponse:
-    client = _get_mail_client(user_id="")
-    client.callback(code=code, state=state)
+async def gmail_auth_callback(code: str, state: str) -> HTMLResponse:
+    async with _AUTH_SLOTS:
+        client = await asyncio.to_thread(_get_mail_client, "")
+        # The code-for-token exchange is a blocking HTTPS call to the provider.
+        await asyncio.to_thread(client.callback, code=code, state=state)
     return HTMLResponse("Mail authorized. You can return to Chat.")
 
 
 def _make_chat_handler(chat_client: chat_client_api.ChatClient):
     async def _handle_chat_message(message: chat_client_api.Message) -> None:
-        command, reason = _parse_command(message.content)
-        if not command:
-            reply = _fallback_ai_reply(message.content, reason)
-            if reply:
-                chat_client.send_message(message.channel_id, reply)
+        with (
+            tracing.span("chat.handle") as handle_span,
+            deadline.deadline_scope(_MESSAGE_BUDGET_SECONDS),
+            _MESSAGE_SECONDS.time(),
+        ):
+            if handle_span is not None:
+                handle_span.set("sender_id", message.sender_id)
+            exchange = await _load_exchange(message.sender_id)
+            token = _EXCHANGE.set(exchange)
+            try:
+                await _handle_within_budget(chat_client, message)
+            except TimeoutError:
+                logger.warning("Reply to %s ran out of time budget", message.channel_id)
+            finally:
+                _EXCHANGE.reset(token)
+                if exchange is not None:
+                    await _remember(message.sender_id, message.content, exchange)
+
+    return _handle_chat_message
+
+
+async def _handle_within_budget(
+    chat_client: chat_client_api.ChatClient, message: chat_client_api.Message
+) -> None:
+    channel_id = message.channel_id
+    command, reason = await _parse_command(message.content)
+    if command and command["action"] == "reply":
+        for chunk in _split_message(str(command["reply"])):
+            await _send(chat_client, channel_id, chunk)
+        return
+    if not command:
+        # The free-form reply is the first thing dropped when time runs short.
+        if _budget_spent():
+            await _send(chat_client, channel_id, _TIMEOUT_REPLY)
+            return
+        if _STREAM_REPLIES:
+            with tracing.span("ai.stream_reply"):
+                await _stream_ai_reply(chat_client, channel_id, message.content, reason)
             return
+        with tracing.span("ai.reply"):
+            reply = await _fallback_ai_reply(message.content, reason)
+        if reply:
+            await _send(chat_client, channel_id, reply)
+        return
+
+    exchange = _EXCHANGE.get()
+    if exchange is not None and command.get("message_id"):
+        # "delete mail 2" means the second message listed earlier, without asking the AI.
+        command["message_id"] = memory.resolve_reference(
+            str(command["message_id"]), exchange.listed_ids
+        )
+    user_id = message.sender_id
+    # Building a Gmail client opens its SQLite token store.
+    mail_client = await asyncio.to_thread(_get_mail_client, user_id)
 
-        user_id = message.sender_id
-        mail_client = _get_mail_client(user_id)
+    async def _mail(operation: str, func: Any, *args: Any, **kwargs: Any) -> Any:
+        with tracing.span(f"mail.{operation}"):
+            return await _run_blocking(
+                func, *args, reserve=_REPLY_RESERVE_SECONDS, **kwargs
+            )
 
-        try:
-            action = command["action"]
-            if action == "login":
-                login_data = mail_client.login()
-                chat_client.send_message(
-                    message.channel_id,
-                    f"Open this link to authorize Gmail:\n{login_data['authorization_url']}",
-                )
-                return
-            if action == "logout":
-                mail_client.logout()
-                chat_client.send_message(message.channel_id, "Logged out from Gmail.")
-                return
-            if action == "get_messages":
-                max_results = int(command.get("max_results") or 10)
-                for msg in mail_client.get_messages(max_results=max_results):
-                    entry = _format_message_entry(msg)
-                    for chunk in _split_message(entry):
-                        chat_client.send_message(message.channel_id, chunk)
+    try:
+        action = command["action"]
+        if action == "login":
+            login_data = await _mail("login", mail_client.login)
+            await _send(
+                chat_client,
+                channel_id,
+                f"Open this link to authorize Gmail:\n{login_data['authorization_url']}",
+            )
+            return
+        if action == "logout":
+            await _mail("logout", mail_client.logout)
+            if exchange is not None:
+                exchange.forget = True
+            await _send(chat_client, channel_id, "Logged out from Gmail.")
+            return
+        if action == "get_messages":
+            max_results = int(command.get("max_results") or 10)
+            filters = _message_filters(command)
+            # Gmail yields lazily, so drain it inside the worker thread.
+            messages = await _mail(
+                "get_messages",
+                lambda: list(mail_client.get_messages(max_results=max_results, **filters)),
+            )
+            if exchange is not None:
+                exchange.new_listed_ids = [msg.id for msg in messages]
+            if not messages:
+                await _send(chat_client, channel_id, "No messages found.")
+            for msg in messages:
+                entry = _format_message_entry(msg)
+                for chunk in _split_message(entry):
+                    await _send(chat_client, channel_id, chunk)
+            return
+        if action == "summarize":
+            max_results = min(int(command.get("max_results") or 10), _SUMMARIZE_MAX_RESULTS)
+            message_ids = await _mail(
+                "list_message_ids",
+                mail_client.list_message_ids,
+                max_results,
+                **_message_filters(command),
+            )
+
+            async def _fetch(missing: list[str]) -> list[mail_client_api.Message]:
+                return await _mail("get_messages_by_id", mail_client.get_messages_by_id, missing)
+
+            summarizer = summarize.Summarizer(
+                _get_ai_client(), _SUMMARY_CACHE, user_id, reserve=_REPLY_RESERVE_SECONDS
+            )
+            with tracing.span("ai.summarize", messages=len(message_ids)):
+                digest = await summarizer.summarize(message_ids, _fetch)
+            for chunk in _split_message(digest):
+                await _send(chat_client, channel_id, chunk)
+            return
+        if action == "get_message":
+            msg_id = command.get("message_id")
+            if not msg_id:
+                await _send(chat_client, channel_id, "Missing message id.")
                 return
-            if action == "get_message":
-                msg_id = command.get("message_id")
-                if not msg_id:
-                    chat_client.send_message(message.channel_id, "Missing message id.")
-                    return
-                msg = mail_client.get_message(msg_id)
-                body_text = f"{msg.subject}\nFrom: {msg.from_}\nTo: {msg.to}\n\n{msg.body}"
-                for chunk in _split_message(body_text):
-                    chat_client.send_message(message.channel_id, chunk)
+            msg = await _mail("get_message", mail_client.get_message, msg_id)
+            body_text = f"{msg.subject}\nFrom: {msg.from_}\nTo: {msg.to}\n\n{msg.body}"
+            for chunk in _split_message(body_text):
+                await _send(chat_client, channel_id, chunk)
+            return
+        if action == "get_attachments":
+            msg_id = command.get("message_id")
+            if not msg_id:
+                await _send(chat_client, channel_id, "Missing message id.")
                 return
-            if action == "delete_message":
-                msg_id = command.get("message_id")
-                if not msg_id:
-                    chat_client.send_message(message.channel_id, "Missing message id.")
-                    return
-                mail_client.delete_message(msg_id)
-                chat_client.send_message(message.channel_id, "Message deleted.")
+            attachments = await _mail("list_attachments", mail_client.list_attachments, msg_id)
+            wanted = str(command.get("filename") or "").strip().lower()
+            if wanted:
+                attachments = [item for item in attachments if wanted in item.filename.lower()]
+            if not attachments:
+                await _send(chat_client, channel_id, "No attachments found.")
                 return
-            if action == "mark_as_read":
-                msg_id = command.get("message_id")
-                if not msg_id:
-                    chat_client.send_message(message.channel_id, "Missing message id.")
-                    return
-                mail_client.mark_as_read(msg_id)
-                chat_client.send_message(message.channel_id, "Message marked as read.")
+            for attachment in attachments:
+                if attachment.size > _ATTACHMENT_MAX_BYTES:
+                    await _send(
+                        chat_client,
+                        channel_id,
+                        f"Skipped {attachment.filename}: larger than {_ATTACHMENT_MAX_BYTES // 1024} KB.",
+                    )
+                    continue
+                allowance = _attachment_allowance(user_id)
+                if attachment.size > allowance:
+                    await _send(
+                        chat_client,
+                        channel_id,
+                        f"Skipped {attachment.filename}: attachment limit reached, try again later.",
+                    )
+                    continue
+                # Charged before the upload, so concurrent requests cannot overspend.
+                charge = (time.monotonic(), attachment.size)
+                _ATTACHMENT_USAGE.setdefault(user_id, deque()).append(charge)
+                limit = min(_ATTACHMENT_MAX_BYTES, allowance)
+                try:
+                    with tracing.span("mail.forward_attachment", size=attachment.size):
+                        await _run_blocking(
+                            _forward_attachment, mail_client, chat_client, channel_id, attachment, limit
+                        )
+                except BaseException:
+                    _refund_attachment(user_id, charge)
+                    raise
+            return
+        if action == "delete_message":
+            msg_id = command.get("message_id")
+            if not msg_id:
+                await _send(chat_client, channel_id, "Missing message id.")
                 return
-        except Exception as exc:
-            logger.exception("Command failed")
-            if "No stored credentials for user" in str(exc):
-                login_data = mail_client.login()
-                chat_client.send_message(
-                    message.channel_id,
-                    "Please login to Gmail first:\n"
-                    f"{login_data['authorization_url']}",
-                )
+            await _mail("delete_message", mail_client.delete_message, msg_id)
+            await _send(chat_client, channel_id, "Message deleted.")
+            return
+        if action == "mark_as_read":
+            msg_id = command.get("message_id")
+            if not msg_id:
+                await _send(chat_client, channel_id, "Missing message id.")
                 return
-            chat_client.send_message(message.channel_id, f"Error: {exc}")
-
-    return _handle_chat_message
+            await _mail("mark_as_read", mail_client.mark_as_read, msg_id)
+            await _send(chat_client, channel_id, "Message marked as read.")
+            return
+    except TimeoutError:
+        logger.warning("Mail command %s timed out", command.get("action"))
+        await _send(chat_client, channel_id, _TIMEOUT_REPLY)
+    except Exception as exc:
+        logger.exception("Command failed")
+        if "No stored credentials for user" in str(exc):
+            login_data = await _mail("login", mail_client.login)
+            await _send(
+                chat_client,
+                channel_id,
+                "Please login to Gmail first:\n"
+                f"{login_data['authorization_url']}",
+            )
+            return
+        await _send(chat_client, channel_id, f"Error: {exc}")
+
+
+def _attachment_allowance(user_id: str) -> int:
+    """Bytes ``user_id`` may still forward in the current window."""
+    usage = _ATTACHMENT_USAGE.get(user_id)
+    if usage is None:
+        return _ATTACHMENT_USER_BYTES
+    cutoff = time.monotonic() - _ATTACHMENT_USER_WINDOW_SECONDS
+    while usage and usage[0][0] < cutoff:
+        usage.popleft()
+    if not usage:
+        del _ATTACHMENT_USAGE[user_id]
+        return _ATTACHMENT_USER_BYTES
+    return max(0, _ATTACHMENT_USER_BYTES - sum(size for _, size in usage))
+
+
+def _refund_attachment(user_id: str, charge: tuple[float, int]) -> None:
+    """Take back a charge whose forward failed, unless the window already dropped it."""
+    usage = _ATTACHMENT_USAGE.get(user_id)
+    if usage is None:
+        return
+    try:
+        usage.remove(charge)
+    except ValueError:
+        return
+    if not usage:
+        del _ATTACHMENT_USAGE[user_id]
+
+
+def _forward_attachment(
+    mail_client: mail_client_api.MailClient,
+    chat_client: chat_client_api.ChatClient,
+    channel_id: str,
+    attachment: mail_client_api.Attachment,
+    max_bytes: int,
+) -> None:
+    # Download and upload in one worker so the spooled file is closed there even on timeout.
+    with mail_client.download_attachment(
+        attachment.message_id, attachment.id, max_bytes=max_bytes
+    ) as file:
+        chat_client.send_file(channel_id, file, attachment.filename)
 
 
 async def _run_web() -> None:
+    import uvicorn
+
     config = uvicorn.Config(
         app,
         host=os.environ.get("SMART_CHAT_BOT_HOST", "0.0.0.0"),
@@ -287,11 +967,51 @@ async def _run_web() -> None:
 async def _run_bot() -> None:
     client = chat_client_api.get_client({})
     handler = _make_chat_handler(client)
-    await client.listen(handler)
+    if _NOTIFY_NEW_MAIL:
+        await asyncio.gather(client.listen(handler), _run_notifier(client))
+    else:
+        await client.listen(handler)
+
+
+def _make_notifier(chat_client: chat_client_api.ChatClient) -> notifier.NotificationScheduler:
+    # Discord returns the same DM channel every time, so open each one once.
+    open_dm = functools.lru_cache(maxsize=65536)(chat_client.open_direct_channel)
+
+    async def _notify(user_id: str, text: str) -> None:
+        channel_id = await asyncio.to_thread(open_dm, user_id)
+        for chunk in _split_message(text):
+            await _send(chat_client, channel_id, chunk)
+
+    return notifier.NotificationScheduler(
+        list_user_ids=mail_client_api.get_linked_user_ids,
+        get_mail_client=_get_mail_client,
+        notify=_notify,
+        config=_NOTIFIER_CONFIG,
+    )
+
+
+async def _run_notifier(chat_client: chat_client_api.ChatClient) -> None:
+    await _make_notifier(chat_client).run()
+
+
+def _preload_providers() -> None:
+    # Import the AI and mail SDKs off the event loop so the first DM does not pay for them.
+    for api in (ai_client_api, mail_client_api):
+        try:
+            api.providers.provider()
+        except Exception:
+            logger.exception("Failed to preload %s provider", api.__name__)
 
 
 async def _main() -> None:
-    await asyncio.gather(_run_web(), _run_bot())
+    if _LOOP_LAG_THRESHOLD_SECONDS > 0:
+        _LOOP_MONITOR.start()
+    await asyncio.gather(
+        _run_web(),
+        _run_bot(),
+        asyncio.to_thread(_preload_providers),
+        asyncio.to_thread(_load_intent_model),
+    )
 
 
 def main() -> None:
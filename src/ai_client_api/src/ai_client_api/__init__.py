@@ -1,3 +1,24 @@
+from . import providers
+from .breaker import CircuitBreaker, CircuitBreakerAIClient, CircuitOpenError
 from .client import AIClient, get_ai_client
+from .profile import COMBINED, INTENT, REPLY, SUMMARIZE, CallProfile, load_profiles
+from .schema import SchemaValidationError, validate_schema
+from .turn import Turn
 
-__all__ = ["AIClient", "get_ai_client"]
\ No newline at end of file
+__all__ = [
+    "AIClient",
+    "get_ai_client",
+    "CircuitBreaker",
+    "CircuitBreakerAIClient",
+    "CircuitOpenError",
+    "CallProfile",
+    "COMBINED",
+    "INTENT",
+    "REPLY",
+    "SUMMARIZE",
+    "load_profiles",
+    "SchemaValidationError",
+    "validate_schema",
+    "Turn",
+    "providers",
+]
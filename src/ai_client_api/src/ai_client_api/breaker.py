@@ -0,0 +1,218 @@
+"""Circuit breaker that fails fast while an AI provider is erroring or slow."""
+
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Sequence
+from typing import Any
+
+from .client import AIClient
+from .schema import SchemaValidationError
+from .turn import Turn
+
+__all__ = ["CircuitBreaker", "CircuitBreakerAIClient", "CircuitOpenError"]
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the provider while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Track recent call outcomes and open once errors or slow calls dominate.
+
+    The circuit opens when, over the last ``window`` calls (and at least
+    ``min_calls``), the share of failures reaches ``failure_rate`` or the
+    share of calls slower than ``slow_call_seconds`` reaches
+    ``slow_call_rate``. After ``open_seconds`` it lets ``half_open_probes``
+    calls through; one success closes it, one failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_call_rate: float = 0.5,
+        window: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: deque[tuple[bool, bool]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+
+    def acquire(self) -> None:
+        """Reserve permission for one call or raise CircuitOpenError."""
+        with self._lock:
+            self._refresh()
+            if self._state == OPEN:
+                raise CircuitOpenError("AI provider circuit is open")
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    raise CircuitOpenError("AI provider circuit is half-open; probe in flight")
+                self._probes_in_flight += 1
+
+    def release(self) -> None:
+        """Give back a reservation whose outcome says nothing about the provider."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def record(self, *, ok: bool, duration: float) -> None:
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if ok and not slow:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            if self._state == OPEN:
+                return
+            self._outcomes.append((ok, slow))
+            calls = len(self._outcomes)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for call_ok, _ in self._outcomes if not call_ok)
+            slow_calls = sum(1 for _, call_slow in self._outcomes if call_slow)
+            if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+                self._open()
+
+
+class CircuitBreakerAIClient(AIClient):
+    """Wrap an AIClient so calls fail fast with CircuitOpenError when tripped.
+
+    Schema violations and cancellations are not held against the provider,
+    unless the call was cancelled after its own ``timeout`` had passed: that
+    is a caller's safety net catching a provider that ignored the timeout.
+    """
+
+    def __init__(self, client: AIClient, breaker: CircuitBreaker) -> None:
+        self._client = client
+        self._breaker = breaker
+
+    def _finish(
+        self, started: float, error: BaseException | None, timeout: float | None = None
+    ) -> None:
+        duration = time.monotonic() - started
+        if error is None:
+            self._breaker.record(ok=True, duration=duration)
+        elif isinstance(error, SchemaValidationError):
+            self._breaker.record(ok=True, duration=duration)
+        elif isinstance(error, Exception):
+            self._breaker.record(ok=False, duration=duration)
+        elif timeout is not None and duration >= timeout:
+            self._breaker.record(ok=False, duration=duration)
+        else:
+            self._breaker.release()
+
+    def generate_response(
+        self,
+        user_input: str,
+        system_prompt: str | None = None,
+        response_schema: dict[str, Any] | None = None,
+        cache_prompt: bool = False,
+        profile: str | None = None,
+        history: Sequence[Turn] = (),
+    ) -> str | dict[str, Any]:
+        self._breaker.acquire()
+        started = time.monotonic()
+        try:
+            result = self._client.generate_response(
+                user_input,
+                system_prompt=system_prompt,
+                response_schema=response_schema,
+                cache_prompt=cache_prompt,
+                profile=profile,
+                history=history,
+            )
+        except BaseException as exc:
+            self._finish(started, exc)
+            raise
+        self._finish(started, None)
+        return result
+
+    async def generate_response_async(
+        self,
+        user_input: str,
+        system_prompt: str | None = None,
+        response_schema: dict[str, Any] | None = None,
+        timeout: float | None = None,
+        cache_prompt: bool = False,
+        profile: str | None = None,
+        history: Sequence[Turn] = (),
+    ) -> str | dict[str, Any]:
+        self._breaker.acquire()
+        started = time.monotonic()
+        try:
+            result = await self._client.generate_response_async(
+                user_input,
+                system_prompt=system_prompt,
+                response_schema=response_schema,
+                timeout=timeout,
+                cache_prompt=cache_prompt,
+                profile=profile,
+                history=history,
+            )
+        except BaseException as exc:
+            self._finish(started, exc, timeout)
+            raise
+        self._finish(started, None)
+        return result
+
+    async def stream_response(
+        self,
+        user_input: str,
+        system_prompt: str | None = None,
+        timeout: float | None = None,
+        profile: str | None = None,
+        history: Sequence[Turn] = (),
+    ) -> AsyncIterator[str]:
+        self._breaker.acquire()
+        started = time.monotonic()
+        try:
+            async for delta in self._client.stream_response(
+                user_input,
+                system_prompt=system_prompt,
+                timeout=timeout,
+                profile=profile,
+                history=history,
+            ):
+                yield delta
+        except BaseException as exc:
+            self._finish(started, exc, timeout)
+            raise
+        self._finish(started, None)
@@ -1,18 +1,82 @@
+import asyncio
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Sequence
 from typing import Any
 
+from . import providers
+from .turn import Turn
+
 class AIClient(ABC):
-    
+
     @abstractmethod
     def generate_response(
         self,
         user_input: str,
         system_prompt: str | None = None,
         response_schema: dict[str, Any] | None = None,
+        cache_prompt: bool = False,
+        profile: str | None = None,
+        history: Sequence[Turn] = (),
     ) -> str | dict[str, Any]:
+        """Generate a reply, or a dict matching response_schema when given.
 
+        cache_prompt hints that system_prompt and response_schema are stable
+        across calls, so providers with prompt caching may reuse them.
+        profile names the kind of call (see ai_client_api.profile) so the
+        provider can pick a matching model and token budget.
+        history holds earlier turns of the conversation, oldest first.
+        """
         raise NotImplementedError
-    
+
+    async def generate_response_async(
+        self,
+        user_input: str,
+        system_prompt: str | None = None,
+        response_schema: dict[str, Any] | None = None,
+        timeout: float | None = None,
+        cache_prompt: bool = False,
+        profile: str | None = None,
+        history: Sequence[Turn] = (),
+    ) -> str | dict[str, Any]:
+        """Async variant of generate_response.
+
+        Implementations with a native async transport should override this.
+        The default runs generate_response in a worker thread so the event
+        loop is never blocked. Raises TimeoutError when timeout (seconds)
+        elapses first.
+        """
+        return await asyncio.wait_for(
+            asyncio.to_thread(
+                self.generate_response,
+                user_input,
+                system_prompt=system_prompt,
+                response_schema=response_schema,
+                cache_prompt=cache_prompt,
+                profile=profile,
+                history=history,
+            ),
+            timeout,
+        )
+
+    async def stream_response(
+        self,
+        user_input: str,
+        system_prompt: str | None = None,
+        timeout: float | None = None,
+        profile: str | None = None,
+        history: Sequence[Turn] = (),
+    ) -> AsyncIterator[str]:
+        """Yield the free-form reply as text deltas while it is generated.
+
+        The default yields the complete generate_response_async result as a
+        single delta; streaming-capable implementations should override it.
+        """
+        response = await self.generate_response_async(
+            user_input, system_prompt=system_prompt, timeout=timeout, profile=profile, history=history
+        )
+        yield str(response)
+
 def get_ai_client() -> AIClient:
-    raise NotImplementedError
+    """Build a client from the provider registered under ``providers.PROVIDER_GROUP``."""
+    return providers.provider().get_ai_client_impl()
 
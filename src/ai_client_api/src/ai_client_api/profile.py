@@ -0,0 +1,63 @@
+"""Named call profiles so each kind of AI call can use its own model and budget.
+
+Callers name the profile (``INTENT``, ``COMBINED``, ``REPLY``,
+``SUMMARIZE``); providers
+map the name to a ``CallProfile`` and fall back to their defaults for names
+they do not know. Profiles can be overridden from the environment:
+
+    CLAUDE_INTENT_MODEL=claude-haiku-4-5-20251001
+    CLAUDE_INTENT_MAX_TOKENS=64
+    CLAUDE_SUMMARIZE_TEMPERATURE=0.2
+    CLAUDE_REPLY_STOP_SEQUENCES='["\\n\\nUser:"]'
+"""
+
+import json
+import os
+from collections.abc import Mapping
+from dataclasses import dataclass, replace
+
+__all__ = ["COMBINED", "INTENT", "REPLY", "SUMMARIZE", "CallProfile", "load_profiles"]
+
+INTENT = "intent"
+# Parses a command or, failing that, writes a short reply in the same call.
+COMBINED = "combined"
+REPLY = "reply"
+SUMMARIZE = "summarize"
+
+
+@dataclass(frozen=True)
+class CallProfile:
+    """Model and sampling settings for one kind of call; None keeps the provider default."""
+
+    model: str | None = None
+    max_tokens: int | None = None
+    temperature: float | None = None
+    stop_sequences: tuple[str, ...] = ()
+
+
+def load_profiles(
+    defaults: Mapping[str, CallProfile],
+    prefix: str,
+    environ: Mapping[str, str] | None = None,
+) -> dict[str, CallProfile]:
+    """Apply ``<PREFIX>_<NAME>_<FIELD>`` environment overrides to ``defaults``.
+
+    Stop sequences are given as a JSON array of strings.
+    """
+    environ = os.environ if environ is None else environ
+    profiles: dict[str, CallProfile] = {}
+    for name, profile in defaults.items():
+        key = f"{prefix}_{name.upper()}_"
+        if model := environ.get(key + "MODEL"):
+            profile = replace(profile, model=model)
+        if max_tokens := environ.get(key + "MAX_TOKENS"):
+            profile = replace(profile, max_tokens=int(max_tokens))
+        if temperature := environ.get(key + "TEMPERATURE"):
+            profile = replace(profile, temperature=float(temperature))
+        if stop_sequences := environ.get(key + "STOP_SEQUENCES"):
+            values = json.loads(stop_sequences)
+            if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"{key}STOP_SEQUENCES must be a JSON array of strings")
+            profile = replace(profile, stop_sequences=tuple(values))
+        profiles[name] = profile
+    return profiles
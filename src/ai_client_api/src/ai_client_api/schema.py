@@ -0,0 +1,63 @@
+"""Minimal JSON Schema validation for structured AI responses.
+
+Covers the subset of the spec that response schemas in this project use:
+type, enum, properties, required, additionalProperties, items, minimum and
+maximum.
+"""
+
+from typing import Any
+
+__all__ = ["SchemaValidationError", "validate_schema"]
+
+_TYPE_CHECKS: dict[str, Any] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+
+class SchemaValidationError(ValueError):
+    """Raised when a structured response does not match its schema."""
+
+    def __init__(self, errors: list[str]) -> None:
+        super().__init__("; ".join(errors) or "Response does not match schema")
+        self.errors = errors
+
+
+def validate_schema(value: Any, schema: dict[str, Any], path: str = "$") -> list[str]:
+    """Return a list of human-readable violations; empty when value is valid."""
+    expected = schema.get("type")
+    if expected is not None:
+        types = expected if isinstance(expected, list) else [expected]
+        if not any(_TYPE_CHECKS.get(name, lambda _v: True)(value) for name in types):
+            return [f"{path}: expected {' or '.join(types)}, got {type(value).__name__}"]
+
+    errors: list[str] = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} is not one of {schema['enum']}")
+
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if "minimum" in schema and value < schema["minimum"]:
+            errors.append(f"{path}: {value} is less than {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            errors.append(f"{path}: {value} is greater than {schema['maximum']}")
+
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        for name in schema.get("required", []):
+            if name not in value:
+                errors.append(f"{path}: missing required field {name!r}")
+        for name, item in value.items():
+            if name in properties:
+                errors.extend(validate_schema(item, properties[name], f"{path}.{name}"))
+            elif schema.get("additionalProperties") is False:
+                errors.append(f"{path}: unexpected field {name!r}")
+
+    if isinstance(value, list) and isinstance(schema.get("items"), dict):
+        for index, item in enumerate(value):
+            errors.extend(validate_schema(item, schema["items"], f"{path}[{index}]"))
+    return errors
@@ -0,0 +1,17 @@
+"""Earlier conversation turns sent along with a call as context.
+
+Callers pass them oldest first as ``history``; providers place them before
+the new user input, so follow-ups such as "delete the second one" can be
+resolved in the same call.
+"""
+
+from dataclasses import dataclass
+from typing import Literal
+
+__all__ = ["Turn"]
+
+
+@dataclass(frozen=True)
+class Turn:
+    role: Literal["user", "assistant"]
+    content: str
@@ -0,0 +1,121 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+import ai_client_api
+from ai_client_api import CircuitBreaker, CircuitBreakerAIClient, CircuitOpenError
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _FlakyAI(ai_client_api.AIClient):
+    def __init__(self) -> None:
+        self.fail = True
+        self.calls = 0
+
+    def generate_response(self, user_input: str, **kwargs: Any) -> str:  # type: ignore[override]
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("provider down")
+        return "ok"
+
+
+def test_breaker_opens_on_error_rate_and_recovers() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker(min_calls=3, window=4, open_seconds=5.0, clock=clock)
+    provider = _FlakyAI()
+    client = CircuitBreakerAIClient(provider, breaker)
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            client.generate_response("hi")
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        client.generate_response("hi")
+    assert provider.calls == 3
+
+    clock.now = 6.0
+    assert breaker.state == "half_open"
+    provider.fail = False
+    assert client.generate_response("hi") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_breaker_opens_on_slow_calls() -> None:
+    breaker = CircuitBreaker(min_calls=2, slow_call_seconds=1.0, slow_call_rate=0.5)
+    breaker.acquire()
+    breaker.record(ok=True, duration=2.0)
+    breaker.acquire()
+    breaker.record(ok=True, duration=0.1)
+    assert breaker.state == "open"
+
+
+def test_half_open_allows_one_probe_and_reopens_on_failure() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker(min_calls=1, open_seconds=1.0, clock=clock)
+    breaker.acquire()
+    breaker.record(ok=False, duration=0.1)
+    clock.now = 2.0
+
+    breaker.acquire()
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    breaker.record(ok=False, duration=0.1)
+    assert breaker.state == "open"
+
+
+def test_schema_errors_do_not_trip_breaker() -> None:
+    class _BadSchemaAI(_FlakyAI):
+        def generate_response(self, user_input: str, **kwargs: Any) -> str:  # type: ignore[override]
+            raise ai_client_api.SchemaValidationError(["$: bad"])
+
+    breaker = CircuitBreaker(min_calls=1)
+    client = CircuitBreakerAIClient(_BadSchemaAI(), breaker)
+    with pytest.raises(ai_client_api.SchemaValidationError):
+        client.generate_response("hi", response_schema={"type": "object"})
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_is_released() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker(min_calls=1, open_seconds=1.0, clock=clock)
+    breaker.acquire()
+    breaker.record(ok=False, duration=0.1)
+    clock.now = 2.0
+
+    class _SlowAI(_FlakyAI):
+        async def generate_response_async(self, user_input: str, **kwargs: Any) -> str:  # type: ignore[override]
+            await asyncio.sleep(10)
+            return "late"
+
+    client = CircuitBreakerAIClient(_SlowAI(), breaker)
+    task = asyncio.create_task(client.generate_response_async("hi"))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    breaker.acquire()
+
+
+@pytest.mark.asyncio
+async def test_cancellation_past_the_timeout_counts_as_failure() -> None:
+    breaker = CircuitBreaker(min_calls=1)
+
+    class _StalledAI(_FlakyAI):
+        async def generate_response_async(self, user_input: str, **kwargs: Any) -> str:  # type: ignore[override]
+            await asyncio.sleep(10)
+            return "late"
+
+    client = CircuitBreakerAIClient(_StalledAI(), breaker)
+    with pytest.raises(TimeoutError):
+        await asyncio.wait_for(client.generate_response_async("hi", timeout=0.01), 0.05)
+    assert breaker.state == "open"
@@ -0,0 +1,31 @@
+import pytest
+
+import ai_client_api
+from ai_client_api import CallProfile
+
+
+def test_load_profiles_applies_env_overrides() -> None:
+    defaults = {
+        ai_client_api.INTENT: CallProfile(model="fast", max_tokens=64, temperature=0.0),
+        ai_client_api.SUMMARIZE: CallProfile(model="large", max_tokens=1024),
+    }
+    profiles = ai_client_api.load_profiles(
+        defaults,
+        "CLAUDE",
+        {
+            "CLAUDE_INTENT_MAX_TOKENS": "32",
+            "CLAUDE_SUMMARIZE_MODEL": "larger",
+            "CLAUDE_SUMMARIZE_STOP_SEQUENCES": '["\\n\\nUser:"]',
+        },
+    )
+    assert profiles[ai_client_api.INTENT] == CallProfile(model="fast", max_tokens=32, temperature=0.0)
+    assert profiles[ai_client_api.SUMMARIZE] == CallProfile(
+        model="larger", max_tokens=1024, stop_sequences=("\n\nUser:",)
+    )
+
+
+def test_load_profiles_rejects_malformed_stop_sequences() -> None:
+    with pytest.raises(ValueError):
+        ai_client_api.load_profiles(
+            {ai_client_api.REPLY: CallProfile()}, "CLAUDE", {"CLAUDE_REPLY_STOP_SEQUENCES": '"END"'}
+        )
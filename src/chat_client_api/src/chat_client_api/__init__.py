@@ -1,5 +1,17 @@
+from chat_client_api import providers
 from chat_client_api.client import ChatClient, get_client
+from telemetry.deadline import call_deadline, call_timeout
 from chat_client_api.message import Message, get_message, Channel, get_channel
 
-__all__ = ["ChatClient", "get_client", "Message", "get_message", "Channel", "get_channel"]
+__all__ = [
+    "ChatClient",
+    "call_deadline",
+    "call_timeout",
+    "get_client",
+    "Message",
+    "get_message",
+    "Channel",
+    "get_channel",
+    "providers",
+]
 
@@ -1,13 +1,18 @@
 from abc import ABC, abstractmethod
 from collections.abc import Iterator
 
-from typing import Awaitable, Callable
+from typing import IO, Awaitable, Callable
 
+from chat_client_api import providers
 from chat_client_api.message import Message, Channel
 
 __all__ = ["ChatClient", "get_client"]
 
 class ChatClient(ABC):
+    # True when edit_message can update a posted message; streamed replies
+    # fall back to a single send otherwise.
+    supports_edits: bool = False
+
     @abstractmethod
     def get_message(self, channel_id: str, message_id: str) -> Message:
         raise NotImplementedError
@@ -20,10 +25,37 @@ class ChatClient(ABC):
     def send_message(self, channel_id: str, content: str) -> bool:
         raise NotImplementedError
     
+    def create_message(self, channel_id: str, content: str) -> Message | None:
+        """Post a message and return it, so callers can edit it later.
+
+        The default only sends the message and returns None.
+        """
+        self.send_message(channel_id, content)
+        return None
+
+    def edit_message(self, channel_id: str, message_id: str, content: str) -> bool:
+        """Replace the content of a message previously posted by the bot.
+
+        The default cannot edit and returns False.
+        """
+        return False
+
     @abstractmethod
     def delete_message(self, channel_id: str, message_id: str) -> bool:
         raise NotImplementedError
     
+    def send_file(self, channel_id: str, file: IO[bytes], filename: str, content: str = "") -> Message:
+        """Upload a file, with optional text, and return the posted message.
+
+        Implementations read the file in chunks as they send it, so large
+        files are not held in memory.
+        """
+        raise NotImplementedError
+
+    def open_direct_channel(self, user_id: str) -> str:
+        """Return the id of the direct-message channel with a user, opening it if needed."""
+        raise NotImplementedError
+
     @abstractmethod
     def get_channels(self) -> Iterator[Channel]:
         raise NotImplementedError
@@ -34,4 +66,5 @@ class ChatClient(ABC):
         raise NotImplementedError
     
 def get_client(client_data: dict[str, str]) -> ChatClient:
-    raise NotImplementedError
+    """Build a client from the provider registered under ``providers.PROVIDER_GROUP``."""
+    return providers.provider().get_client_impl(client_data)
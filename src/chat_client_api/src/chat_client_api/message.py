@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import Any
 
+from chat_client_api import providers
+
 class Message(ABC):
 
     @property
@@ -65,10 +67,10 @@ def get_message(raw_data: dict[str, Any]) -> Message:
         Message: An instance conforming to the Message contract.
 
     Raises:
-        NotImplementedError: If the function is not overridden by an implementation.
+        NotImplementedError: If no chat provider is installed.
 
     '''
-    raise NotImplementedError
+    return providers.provider().get_message_impl(raw_data)
 
 def get_channel(raw_data: dict[str, Any]) -> Channel:
     """Return an instance of a Channel.
@@ -80,7 +82,7 @@ def get_channel(raw_data: dict[str, Any]) -> Channel:
         Channel: An instance conforming to the Channel contract.
 
     Raises:
-        NotImplementedError: If the function is not overridden by an implementation.
+        NotImplementedError: If no chat provider is installed.
 
     """
-    raise NotImplementedError
+    return providers.provider().get_channel_impl(raw_data)
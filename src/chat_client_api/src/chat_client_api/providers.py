@@ -0,0 +1,14 @@
+"""The installed chat provider, found through the ``smart_chat_bot.chat_providers`` entry points.
+
+See ``telemetry.providers``; ``SMART_CHAT_BOT_CHAT_PROVIDER`` picks one when several are installed.
+"""
+
+from __future__ import annotations
+
+from telemetry.providers import ProviderRegistry
+
+__all__ = ["PROVIDER_GROUP", "provider"]
+
+PROVIDER_GROUP = "smart_chat_bot.chat_providers"
+
+provider = ProviderRegistry(PROVIDER_GROUP, "SMART_CHAT_BOT_CHAT_PROVIDER").provider
@@ -7,3 +7,34 @@ def test_get_client_callable() -> None:
     except NotImplementedError:
         return
     assert client is not None
+
+
+def test_client_without_edits_falls_back_to_send() -> None:
+    class _SendOnly(chat_client_api.ChatClient):
+        def __init__(self) -> None:
+            self.sent: list[str] = []
+
+        def get_message(self, channel_id, message_id):  # type: ignore[no-untyped-def]
+            raise NotImplementedError
+
+        def get_messages(self, channel_id, limit=10):  # type: ignore[no-untyped-def]
+            return []
+
+        def send_message(self, channel_id: str, content: str) -> bool:
+            self.sent.append(content)
+            return True
+
+        def delete_message(self, channel_id: str, message_id: str) -> bool:
+            return False
+
+        def get_channels(self):  # type: ignore[no-untyped-def]
+            return iter(())
+
+        async def listen(self, on_message):  # type: ignore[no-untyped-def]
+            return None
+
+    client = _SendOnly()
+    assert not client.supports_edits
+    assert client.create_message("chan1", "hi") is None
+    assert client.edit_message("chan1", "1", "hello") is False
+    assert client.sent == ["hi"]
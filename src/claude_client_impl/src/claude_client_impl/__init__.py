@@ -1,5 +1,7 @@
 import ai_client_api
-from .claude_impl import ClaudeClient
+from .claude_impl import ClaudeClient, get_usage_stats
+
+__all__ = ["ClaudeClient", "get_ai_client_impl", "get_usage_stats", "register"]
 
 def get_ai_client_impl() -> ai_client_api.AIClient:
     """Return a ClaudeAIInterface instance."""
@@ -7,7 +9,5 @@ def get_ai_client_impl() -> ai_client_api.AIClient:
 
 
 def register() -> None:
-    """Register the Claude AI interface factory with ai_chat_api."""
+    """Pin the AI factory to Claude; normally found through entry points."""
     ai_client_api.get_ai_client = get_ai_client_impl
-
-register()
\ No newline at end of file
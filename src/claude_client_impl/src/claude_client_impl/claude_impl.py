@@ -1,59 +1,433 @@
+from collections.abc import AsyncIterator, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
 from typing import Any
+import asyncio
 import json
+import logging
+import threading
+import weakref
 import anthropic
-from dotenv import load_dotenv
+import httpx
 import os
 
 import ai_client_api
+from telemetry import metrics, tracing
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Models this client is tested against. Anthropic retires snapshots on a schedule,
+# and a retired id fails every call, so defaults must come from this list.
+SUPPORTED_MODELS = frozenset(
+    {
+        "claude-haiku-4-5-20251001",
+        "claude-sonnet-4-5-20250929",
+        "claude-opus-4-1-20250805",
+        "claude-sonnet-4-20250514",
+        "claude-opus-4-20250514",
+    }
+)
+DEFAULT_MODEL = "claude-haiku-4-5-20251001"
+DEFAULT_MAX_TOKENS = 1024
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("CLAUDE_TIMEOUT_SECONDS", "30"))
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("CLAUDE_MAX_IN_FLIGHT", "16"))
+DEFAULT_MAX_RETRIES = int(os.getenv("CLAUDE_MAX_RETRIES", "2"))
+CACHE_CONTROL = {"type": "ephemeral"}
+# Shorter prefixes are never cached, so a breakpoint on them only adds noise.
+# Sizes are estimated at about four characters per token.
+MIN_CACHE_TOKENS = 1024
+MIN_CACHE_TOKENS_HAIKU = 2048
+CHARS_PER_TOKEN = 4
+RESPONSE_TOOL_NAME = "respond"
+# Intent JSON is a few dozen tokens on the fastest model; summaries get more room.
+DEFAULT_PROFILES = {
+    ai_client_api.INTENT: ai_client_api.CallProfile(
+        model=DEFAULT_MODEL, max_tokens=64, temperature=0.0
+    ),
+    # Deterministic like intent parsing, with room for the reply it may write.
+    ai_client_api.COMBINED: ai_client_api.CallProfile(
+        model=DEFAULT_MODEL, max_tokens=512, temperature=0.0
+    ),
+    ai_client_api.REPLY: ai_client_api.CallProfile(
+        model=DEFAULT_MODEL, max_tokens=512, temperature=0.7
+    ),
+    ai_client_api.SUMMARIZE: ai_client_api.CallProfile(
+        model="claude-sonnet-4-5-20250929", max_tokens=1024, temperature=0.2
+    ),
+}
+
+_sync_client: anthropic.Anthropic | None = None
+_async_client: anthropic.AsyncAnthropic | None = None
+_in_flight_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[int, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+@dataclass
+class UsageStats:
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+
+
+_REQUEST_SECONDS = metrics.histogram(
+    "claude_request_seconds", "Claude API request latency.", ["model", "mode"]
+)
+# Prompt-cache hit rate is cache_read / (input + cache_read + cache_write).
+_TOKENS = metrics.counter("claude_tokens_total", "Claude tokens by kind.", ["model", "kind"])
+
+_usage_stats = UsageStats()
+_usage_lock = threading.Lock()
+_schema_tools: dict[int, tuple[dict[str, Any], dict[str, Any]]] = {}
+
+
+def get_usage_stats() -> dict[str, int]:
+    """Return cumulative token usage, including prompt-cache reads and writes."""
+    with _usage_lock:
+        return asdict(_usage_stats)
+
+
+def _record_usage(api_response: Any) -> None:
+    usage = getattr(api_response, "usage", None)
+    if usage is None:
+        return
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    with _usage_lock:
+        _usage_stats.requests += 1
+        _usage_stats.input_tokens += usage.input_tokens or 0
+        _usage_stats.output_tokens += usage.output_tokens or 0
+        _usage_stats.cache_creation_input_tokens += cache_write
+        _usage_stats.cache_read_input_tokens += cache_read
+    model = getattr(api_response, "model", None) or "unknown"
+    _TOKENS.labels(model=model, kind="input").inc(usage.input_tokens or 0)
+    _TOKENS.labels(model=model, kind="output").inc(usage.output_tokens or 0)
+    _TOKENS.labels(model=model, kind="cache_write").inc(cache_write)
+    _TOKENS.labels(model=model, kind="cache_read").inc(cache_read)
+    logger.debug(
+        "Claude usage: input=%s output=%s cache_write=%s cache_read=%s",
+        usage.input_tokens,
+        usage.output_tokens,
+        cache_write,
+        cache_read,
+    )
+
+
+@contextmanager
+def _timed_request(model: str, mode: str) -> Iterator[None]:
+    with tracing.span("claude.create", model=model, mode=mode):
+        with _REQUEST_SECONDS.labels(model=model, mode=mode).time():
+            yield
+
+
+def _schema_tool(response_schema: dict[str, Any]) -> dict[str, Any]:
+    # Callers pass long-lived schema objects, so build each tool definition once.
+    # The stored schema keeps the id from being reused while cached.
+    cached = _schema_tools.get(id(response_schema))
+    if cached is not None and cached[0] is response_schema:
+        return cached[1]
+    tool = {
+        "name": RESPONSE_TOOL_NAME,
+        "description": "Return the structured response. Always call this tool.",
+        "input_schema": response_schema,
+    }
+    _schema_tools[id(response_schema)] = (response_schema, tool)
+    return tool
+
+
+def create_async_client(
+    *,
+    base_url: str | None = None,
+    max_connections: int | None = None,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+) -> anthropic.AsyncAnthropic:
+    """Build an AsyncAnthropic client with a pooled, keep-alive HTTP transport."""
+    max_connections = max_connections or DEFAULT_MAX_IN_FLIGHT
+    http_client = anthropic.DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60.0,
+        ),
+        timeout=httpx.Timeout(timeout, connect=5.0),
+    )
+    return anthropic.AsyncAnthropic(
+        api_key=os.getenv("ANTHROPIC_API_KEY"),
+        base_url=base_url,
+        max_retries=DEFAULT_MAX_RETRIES,
+        http_client=http_client,
+    )
+
+
+def _get_sync_client() -> anthropic.Anthropic:
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    return _sync_client
+
+
+def _get_async_client() -> anthropic.AsyncAnthropic:
+    global _async_client
+    if _async_client is None:
+        _async_client = create_async_client()
+    return _async_client
+
+
+def _in_flight_limit(max_in_flight: int) -> asyncio.Semaphore:
+    # Semaphores belong to one event loop, so keep one per running loop and limit.
+    # Clients built with the same limit share it; a different limit gets its own.
+    limits = _in_flight_limits.setdefault(asyncio.get_running_loop(), {})
+    semaphore = limits.get(max_in_flight)
+    if semaphore is None:
+        semaphore = limits[max_in_flight] = asyncio.Semaphore(max_in_flight)
+    return semaphore
 
-claude_client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
 class ClaudeClient(ai_client_api.AIClient):
 
+    def __init__(
+        self,
+        *,
+        async_client: anthropic.AsyncAnthropic | None = None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        profiles: Mapping[str, ai_client_api.CallProfile] | None = None,
+    ) -> None:
+        self._async_client = async_client
+        self._max_in_flight = max_in_flight
+        if profiles is None:
+            profiles = ai_client_api.load_profiles(DEFAULT_PROFILES, "CLAUDE")
+        self._profiles = dict(profiles)
+        for name, call_profile in self._profiles.items():
+            if call_profile.model and call_profile.model not in SUPPORTED_MODELS:
+                logger.warning("Claude %s profile uses unsupported model %s", name, call_profile.model)
+
+    def _call_profile(self, name: str | None) -> ai_client_api.CallProfile | None:
+        # Unknown names keep the client defaults rather than failing the call.
+        return self._profiles.get(name) if name else None
+
     def generate_response(
         self,
         user_input: str,
         system_prompt: str | None = None,
-        response_schema: dict[str, Any] | None = None,        
+        response_schema: dict[str, Any] | None = None,
+        cache_prompt: bool = False,
+        profile: str | None = None,
+        history: Sequence[ai_client_api.Turn] = (),
     )  -> str | dict[str, Any] :
-        directives: list[str] = []
-        if system_prompt:
-            directives.append(system_prompt.strip())
-
-        if response_schema is not None:
-            directives.append(
-                "You must return JSON that strictly conforms to the following schema:\n"
-                f"{json.dumps(response_schema)}\n"
-                "Do not include any extra text—only valid JSON."
-            )
+        request_kwargs = _build_request(
+            user_input,
+            system_prompt,
+            response_schema,
+            cache_prompt=cache_prompt,
+            call_profile=self._call_profile(profile),
+            history=history,
+        )
+        with _timed_request(request_kwargs["model"], "sync"):
+            api_response = _get_sync_client().messages.create(**request_kwargs)
+        _record_usage(api_response)
+        try:
+            return _parse_response(api_response, response_schema)
+        except ai_client_api.SchemaValidationError as exc:
+            if api_response.stop_reason == "max_tokens":
+                raise
+            logger.info("Repairing structured response: %s", exc)
+            with _timed_request(request_kwargs["model"], "sync"):
+                api_response = _get_sync_client().messages.create(
+                    **_repair_request(request_kwargs, api_response, exc)
+                )
+            _record_usage(api_response)
+            return _parse_response(api_response, response_schema)
+
+    async def generate_response_async(
+        self,
+        user_input: str,
+        system_prompt: str | None = None,
+        response_schema: dict[str, Any] | None = None,
+        timeout: float | None = None,
+        cache_prompt: bool = False,
+        profile: str | None = None,
+        history: Sequence[ai_client_api.Turn] = (),
+    ) -> str | dict[str, Any]:
+        request_kwargs = _build_request(
+            user_input,
+            system_prompt,
+            response_schema,
+            cache_prompt=cache_prompt,
+            call_profile=self._call_profile(profile),
+            history=history,
+        )
+        if timeout is not None:
+            request_kwargs["timeout"] = timeout
+        client = self._async_client or _get_async_client()
+        # The deadline covers both waiting for a slot and the request itself.
+        # Cancelling the awaiting task aborts the HTTP request and frees the slot.
+        async with asyncio.timeout(timeout):
+            async with _in_flight_limit(self._max_in_flight):
+                with _timed_request(request_kwargs["model"], "async"):
+                    api_response = await client.messages.create(**request_kwargs)
+                _record_usage(api_response)
+                try:
+                    return _parse_response(api_response, response_schema)
+                except ai_client_api.SchemaValidationError as exc:
+                    if api_response.stop_reason == "max_tokens":
+                        raise
+                    logger.info("Repairing structured response: %s", exc)
+                    with _timed_request(request_kwargs["model"], "async"):
+                        api_response = await client.messages.create(
+                            **_repair_request(request_kwargs, api_response, exc)
+                        )
+                    _record_usage(api_response)
+                    return _parse_response(api_response, response_schema)
 
-        system_text = "\n\n".join(directives) if directives else None
+    async def stream_response(
+        self,
+        user_input: str,
+        system_prompt: str | None = None,
+        timeout: float | None = None,
+        profile: str | None = None,
+        history: Sequence[ai_client_api.Turn] = (),
+    ) -> AsyncIterator[str]:
+        request_kwargs = _build_request(
+            user_input, system_prompt, None, call_profile=self._call_profile(profile), history=history
+        )
+        if timeout is not None:
+            # Bounds each read, so a stalled stream fails instead of hanging.
+            request_kwargs["timeout"] = timeout
+        client = self._async_client or _get_async_client()
+        async with _in_flight_limit(self._max_in_flight):
+            # Measures the whole stream, including time the caller spends per delta.
+            with _REQUEST_SECONDS.labels(model=request_kwargs["model"], mode="stream").time():
+                async with client.messages.stream(**request_kwargs) as stream:
+                    async for text in stream.text_stream:
+                        yield text
+                    _record_usage(await stream.get_final_message())
 
-        messages = [{"role": "user", "content": user_input}]
 
-        request_kwargs: dict[str, Any] = {
-            "model": "claude-3-haiku-20240307",
-            "max_tokens": 1024,
-            "messages": messages,
-        }
-        if system_text is not None:
-            request_kwargs["system"] = system_text
+def _build_request(
+    user_input: str,
+    system_prompt: str | None,
+    response_schema: dict[str, Any] | None,
+    *,
+    cache_prompt: bool = False,
+    call_profile: ai_client_api.CallProfile | None = None,
+    history: Sequence[ai_client_api.Turn] = (),
+) -> dict[str, Any]:
+    call_profile = call_profile or ai_client_api.CallProfile()
+    model = call_profile.model or DEFAULT_MODEL
+    system_prompt = system_prompt.strip() if system_prompt else None
+    tool = _schema_tool(response_schema) if response_schema is not None else None
+    # The cache prefix runs tools, then system, then messages.
+    prefix_chars = len(system_prompt or "") + (len(json.dumps(tool)) if tool else 0)
+    cache_system = cache_prompt and _cacheable(prefix_chars, model)
 
-        api_response = claude_client.messages.create(**request_kwargs)
+    messages: list[dict[str, Any]] = [{"role": turn.role, "content": turn.content} for turn in history]
+    prefix_chars += sum(len(turn.content) for turn in history)
+    if messages and cache_prompt and _cacheable(prefix_chars, model):
+        # Each call repeats the previous exchange, so cache up to the newest earlier turn.
+        messages[-1]["content"] = [
+            {"type": "text", "text": messages[-1]["content"], "cache_control": CACHE_CONTROL}
+        ]
+    messages.append({"role": "user", "content": user_input})
 
-        content = api_response.content[0].text.strip()
-        if response_schema is None:
-            return content
+    request_kwargs: dict[str, Any] = {
+        "model": model,
+        "max_tokens": call_profile.max_tokens or DEFAULT_MAX_TOKENS,
+        "messages": messages,
+    }
+    if call_profile.temperature is not None:
+        request_kwargs["temperature"] = call_profile.temperature
+    if call_profile.stop_sequences:
+        request_kwargs["stop_sequences"] = list(call_profile.stop_sequences)
+    if tool is not None:
+        # Forcing the tool call makes the API hand back parsed JSON input
+        # instead of free text that may carry stray prose.
+        if cache_system and not system_prompt:
+            tool = {**tool, "cache_control": CACHE_CONTROL}
+        request_kwargs["tools"] = [tool]
+        request_kwargs["tool_choice"] = {"type": "tool", "name": RESPONSE_TOOL_NAME}
 
+    if system_prompt and cache_system:
+        # Tools precede the system prompt in the cache prefix, so one
+        # breakpoint here caches both.
+        request_kwargs["system"] = [
+            {"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}
+        ]
+    elif system_prompt:
+        request_kwargs["system"] = system_prompt
+    return request_kwargs
+
+
+def _cacheable(prefix_chars: int, model: str) -> bool:
+    minimum = MIN_CACHE_TOKENS_HAIKU if "haiku" in model else MIN_CACHE_TOKENS
+    return prefix_chars // CHARS_PER_TOKEN >= minimum
+
+
+def _parse_response(
+    api_response: Any,
+    response_schema: dict[str, Any] | None,
+) -> str | dict[str, Any]:
+    if response_schema is None:
+        return "".join(
+            block.text for block in api_response.content if block.type == "text"
+        ).strip()
+
+    parsed: Any = None
+    for block in api_response.content:
+        if block.type == "tool_use" and block.name == RESPONSE_TOOL_NAME:
+            parsed = block.input
+            break
+    else:
+        text = "".join(
+            block.text for block in api_response.content if block.type == "text"
+        ).strip()
         try:
-            parsed = json.loads(content)
+            parsed = json.loads(text)
         except json.JSONDecodeError as exc:
-            invalid_json_message = "Claude returned invalid JSON for the provided schema"
-            raise ValueError(invalid_json_message) from exc
-        if not isinstance(parsed, dict):
-            invalid_json_message = "Claude returned data that does not match the expected schema"
-            raise TypeError(invalid_json_message)
-        return parsed
-    
+            raise ai_client_api.SchemaValidationError(
+                [f"Claude did not call the {RESPONSE_TOOL_NAME} tool"]
+            ) from exc
+
+    errors = ai_client_api.validate_schema(parsed, response_schema)
+    if errors:
+        raise ai_client_api.SchemaValidationError(errors)
+    return parsed
+
+
+def _repair_request(
+    request_kwargs: dict[str, Any],
+    api_response: Any,
+    error: ai_client_api.SchemaValidationError,
+) -> dict[str, Any]:
+    """Build a single follow-up that feeds the validation errors back.
+
+    It keeps the original max_tokens: the corrected input is as long as the
+    first one. Truncated responses are not repaired at all, since the same
+    cap would cut the retry off again.
+    """
+    assistant_content: list[dict[str, Any]] = []
+    tool_use_id: str | None = None
+    for block in api_response.content:
+        if block.type == "text" and block.text:
+            assistant_content.append({"type": "text", "text": block.text})
+        elif block.type == "tool_use":
+            tool_use_id = block.id
+            assistant_content.append(
+                {"type": "tool_use", "id": block.id, "name": block.name, "input": block.input}
+            )
+    feedback = f"Invalid response: {error}. Call the {RESPONSE_TOOL_NAME} tool again with corrected input."
+    if tool_use_id is not None:
+        user_content: Any = [
+            {"type": "tool_result", "tool_use_id": tool_use_id, "is_error": True, "content": feedback}
+        ]
+    else:
+        user_content = feedback
+
+    messages = list(request_kwargs["messages"])
+    if assistant_content:
+        messages.append({"role": "assistant", "content": assistant_content})
+    messages.append({"role": "user", "content": user_content})
+    repair_kwargs = dict(request_kwargs)
+    repair_kwargs["messages"] = messages
+    return repair_kwargs
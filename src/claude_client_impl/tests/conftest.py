@@ -0,0 +1,146 @@
+"""Local fake Anthropic Messages endpoint for exercising the real HTTP path."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import pytest
+
+
+class FakeAnthropicServer:
+    def __init__(self) -> None:
+        self.delay_seconds = 0.0
+        self.stream_delay_seconds = 0.0
+        self.reply_text = "hello from fake claude"
+        self.stop_reason = "end_turn"
+        self.usage: dict[str, int] = {"input_tokens": 10, "output_tokens": 5}
+        # Queued content-block lists; each request pops one, else reply_text.
+        self.responses: list[list[dict[str, Any]]] = []
+        self.requests: list[dict[str, Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", "0"))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests.append(body)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    time.sleep(server.delay_seconds)
+                    with server._lock:
+                        content = (
+                            server.responses.pop(0)
+                            if server.responses
+                            else [{"type": "text", "text": server.reply_text}]
+                        )
+                    message = {
+                        "id": "msg_fake",
+                        "type": "message",
+                        "role": "assistant",
+                        "model": body.get("model", ""),
+                        "content": content,
+                        "stop_reason": server.stop_reason,
+                        "stop_sequence": None,
+                        "usage": server.usage,
+                    }
+                    if body.get("stream"):
+                        self._stream(message)
+                        return
+                    payload = json.dumps(message).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _stream(self, message: dict[str, Any]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                text = "".join(block.get("text", "") for block in message["content"])
+                start = {**message, "content": [], "stop_reason": None}
+                self._event("message_start", {"type": "message_start", "message": start})
+                self._event(
+                    "content_block_start",
+                    {
+                        "type": "content_block_start",
+                        "index": 0,
+                        "content_block": {"type": "text", "text": ""},
+                    },
+                )
+                for word in text.split(" "):
+                    time.sleep(server.stream_delay_seconds)
+                    self._event(
+                        "content_block_delta",
+                        {
+                            "type": "content_block_delta",
+                            "index": 0,
+                            "delta": {"type": "text_delta", "text": word + " "},
+                        },
+                    )
+                self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+                self._event(
+                    "message_delta",
+                    {
+                        "type": "message_delta",
+                        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                        "usage": {"output_tokens": server.usage["output_tokens"]},
+                    },
+                )
+                self._event("message_stop", {"type": "message_stop"})
+                self.close_connection = True
+
+            def _event(self, name: str, data: dict[str, Any]) -> None:
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+        return _Handler
+
+
+@pytest.fixture
+def fake_anthropic(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakeAnthropicServer]:
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    server = FakeAnthropicServer()
+    server.start()
+    try:
+        yield server
+    finally:
+        server.stop()
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from claude_client_impl.claude_impl import ClaudeClient, create_async_client
+
+
+@pytest.mark.asyncio
+async def test_generate_response_async_returns_text(fake_anthropic) -> None:
+    client = ClaudeClient(async_client=create_async_client(base_url=fake_anthropic.base_url))
+    result = await client.generate_response_async("hi", system_prompt="be brief")
+    assert result == "hello from fake claude"
+    assert fake_anthropic.requests[0]["system"] == "be brief"
+
+
+@pytest.mark.asyncio
+async def test_generate_response_async_limits_in_flight(fake_anthropic) -> None:
+    fake_anthropic.delay_seconds = 0.1
+    client = ClaudeClient(
+        async_client=create_async_client(base_url=fake_anthropic.base_url),
+        max_in_flight=2,
+    )
+    results = await asyncio.gather(
+        *(client.generate_response_async(f"msg {i}") for i in range(6))
+    )
+    assert len(results) == 6
+    assert fake_anthropic.max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_in_flight_limit_follows_each_client(fake_anthropic) -> None:
+    fake_anthropic.delay_seconds = 0.1
+    async_client = create_async_client(base_url=fake_anthropic.base_url)
+    narrow = ClaudeClient(async_client=async_client, max_in_flight=1)
+    await narrow.generate_response_async("first")
+
+    wide = ClaudeClient(async_client=async_client, max_in_flight=3)
+    await asyncio.gather(*(wide.generate_response_async(f"msg {i}") for i in range(6)))
+    assert fake_anthropic.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_generate_response_async_timeout(fake_anthropic) -> None:
+    fake_anthropic.delay_seconds = 1.0
+    client = ClaudeClient(async_client=create_async_client(base_url=fake_anthropic.base_url))
+    with pytest.raises(TimeoutError):
+        await client.generate_response_async("hi", timeout=0.1)
+
+
+@pytest.mark.asyncio
+async def test_generate_response_async_cancel_releases_slot(fake_anthropic) -> None:
+    fake_anthropic.delay_seconds = 0.5
+    client = ClaudeClient(
+        async_client=create_async_client(base_url=fake_anthropic.base_url),
+        max_in_flight=1,
+    )
+    task = asyncio.create_task(client.generate_response_async("slow"))
+    await asyncio.sleep(0.1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    fake_anthropic.delay_seconds = 0.0
+    result = await client.generate_response_async("fast", timeout=2.0)
+    assert result == "hello from fake claude"
@@ -0,0 +1,59 @@
+import pytest
+
+import ai_client_api
+from claude_client_impl import claude_impl
+from claude_client_impl.claude_impl import ClaudeClient, create_async_client
+
+_SCHEMA = {"type": "object", "properties": {"action": {"type": "string"}}}
+
+
+def test_default_profiles_name_supported_models(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert claude_impl.DEFAULT_MODEL in claude_impl.SUPPORTED_MODELS
+    assert {profile.model for profile in claude_impl.DEFAULT_PROFILES.values()} <= claude_impl.SUPPORTED_MODELS
+
+    combined = claude_impl.DEFAULT_PROFILES[ai_client_api.COMBINED]
+    assert combined.temperature == 0.0
+    assert combined.max_tokens == claude_impl.DEFAULT_PROFILES[ai_client_api.REPLY].max_tokens
+
+    monkeypatch.setenv("CLAUDE_SUMMARIZE_MODEL", "claude-sonnet-4-20250514")
+    profiles = ai_client_api.load_profiles(claude_impl.DEFAULT_PROFILES, "CLAUDE")
+    assert profiles[ai_client_api.SUMMARIZE].model == "claude-sonnet-4-20250514"
+
+
+def test_build_request_applies_call_profile() -> None:
+    profile = ai_client_api.CallProfile(
+        model="claude-fast", max_tokens=48, temperature=0.0, stop_sequences=("END",)
+    )
+    request = claude_impl._build_request("hi", None, _SCHEMA, call_profile=profile)
+    assert request["model"] == "claude-fast"
+    assert request["max_tokens"] == 48
+    assert request["temperature"] == 0.0
+    assert request["stop_sequences"] == ["END"]
+
+
+def test_build_request_without_profile_keeps_defaults() -> None:
+    request = claude_impl._build_request("hi", None, None)
+    assert request["model"] == claude_impl.DEFAULT_MODEL
+    assert request["max_tokens"] == claude_impl.DEFAULT_MAX_TOKENS
+    assert "temperature" not in request
+
+
+@pytest.mark.asyncio
+async def test_profile_selects_model_and_budget(fake_anthropic) -> None:
+    fake_anthropic.responses.append(
+        [{"type": "tool_use", "id": "tu_1", "name": "respond", "input": {"action": "login"}}]
+    )
+    client = ClaudeClient(
+        async_client=create_async_client(base_url=fake_anthropic.base_url),
+        profiles={ai_client_api.INTENT: ai_client_api.CallProfile(model="claude-fast", max_tokens=40)},
+    )
+    await client.generate_response_async(
+        "log me in", response_schema=_SCHEMA, profile=ai_client_api.INTENT
+    )
+    await client.generate_response_async("hello", profile="unknown")
+
+    intent_request, other_request = fake_anthropic.requests
+    assert intent_request["model"] == "claude-fast"
+    assert intent_request["max_tokens"] == 40
+    assert other_request["model"] == claude_impl.DEFAULT_MODEL
+    assert other_request["max_tokens"] == claude_impl.DEFAULT_MAX_TOKENS
@@ -0,0 +1,94 @@
+import pytest
+
+import ai_client_api
+
+from claude_client_impl import claude_impl
+from claude_client_impl.claude_impl import ClaudeClient, create_async_client
+
+_SCHEMA = {"type": "object", "properties": {"action": {"type": "string"}}}
+# Long enough to pass the minimum cacheable prefix on every model.
+_LONG_PROMPT = "parser prompt " + "rule " * 2000
+
+
+def test_schema_tool_built_once_per_schema() -> None:
+    first = claude_impl._schema_tool(_SCHEMA)
+    assert claude_impl._schema_tool(_SCHEMA) is first
+    assert claude_impl._schema_tool(dict(_SCHEMA)) is not first
+
+
+def test_build_request_marks_system_prompt_cacheable() -> None:
+    request = claude_impl._build_request("hi", _LONG_PROMPT, _SCHEMA, cache_prompt=True)
+    blocks = request["system"]
+    assert blocks[0]["text"] == _LONG_PROMPT.strip()
+    assert blocks[-1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in request["tools"][0]
+
+
+def test_build_request_caches_tool_without_system_prompt() -> None:
+    schema = {"type": "object", "description": "rule " * 2000}
+    request = claude_impl._build_request("hi", None, schema, cache_prompt=True)
+    assert "system" not in request
+    assert request["tools"][0]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_build_request_skips_breakpoints_below_the_cache_minimum() -> None:
+    request = claude_impl._build_request("hi", "parser prompt", _SCHEMA, cache_prompt=True)
+    assert request["system"] == "parser prompt"
+    assert "cache_control" not in request["tools"][0]
+
+    # About 1500 tokens is enough for Sonnet but not for Haiku.
+    prompt = "rule " * 1200
+    sonnet = ai_client_api.CallProfile(model="claude-sonnet-4-5-20250929")
+    assert claude_impl._build_request("hi", prompt, None, cache_prompt=True, call_profile=sonnet)["system"][-1][
+        "cache_control"
+    ] == {"type": "ephemeral"}
+    assert claude_impl._build_request("hi", prompt, None, cache_prompt=True)["system"] == prompt.strip()
+
+
+def test_build_request_without_cache_uses_plain_text() -> None:
+    request = claude_impl._build_request("hi", "parser prompt", None)
+    assert request["system"] == "parser prompt"
+
+
+def test_build_request_puts_history_before_input_and_caches_it() -> None:
+    history = [
+        ai_client_api.Turn("user", "get 2 mail"),
+        ai_client_api.Turn("assistant", "1. m1 Budget\n2. m2 Lunch"),
+    ]
+    request = claude_impl._build_request("delete the second one", "parser", _SCHEMA, history=history)
+    assert request["messages"] == [
+        {"role": "user", "content": "get 2 mail"},
+        {"role": "assistant", "content": "1. m1 Budget\n2. m2 Lunch"},
+        {"role": "user", "content": "delete the second one"},
+    ]
+
+    cached = claude_impl._build_request(
+        "delete the second one", _LONG_PROMPT, _SCHEMA, cache_prompt=True, history=history
+    )
+    assert cached["messages"][1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert cached["messages"][2] == {"role": "user", "content": "delete the second one"}
+
+
+@pytest.mark.asyncio
+async def test_usage_stats_track_cache_tokens(fake_anthropic) -> None:
+    fake_anthropic.responses.append(
+        [{"type": "tool_use", "id": "tu_1", "name": "respond", "input": {"action": "login"}}]
+    )
+    fake_anthropic.usage = {
+        "input_tokens": 4,
+        "output_tokens": 6,
+        "cache_creation_input_tokens": 0,
+        "cache_read_input_tokens": 900,
+    }
+    before = claude_impl.get_usage_stats()
+    client = ClaudeClient(async_client=create_async_client(base_url=fake_anthropic.base_url))
+    result = await client.generate_response_async(
+        "log me in", system_prompt=_LONG_PROMPT, response_schema=_SCHEMA, cache_prompt=True
+    )
+    after = claude_impl.get_usage_stats()
+
+    assert result == {"action": "login"}
+    assert fake_anthropic.requests[0]["system"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert fake_anthropic.requests[0]["tool_choice"] == {"type": "tool", "name": "respond"}
+    assert after["cache_read_input_tokens"] - before["cache_read_input_tokens"] == 900
+    assert after["requests"] - before["requests"] == 1
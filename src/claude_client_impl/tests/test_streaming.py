@@ -0,0 +1,18 @@
+import pytest
+
+from claude_client_impl import claude_impl
+from claude_client_impl.claude_impl import ClaudeClient, create_async_client
+
+
+@pytest.mark.asyncio
+async def test_stream_response_yields_deltas(fake_anthropic) -> None:
+    fake_anthropic.reply_text = "one two three"
+    client = ClaudeClient(async_client=create_async_client(base_url=fake_anthropic.base_url))
+    before = claude_impl.get_usage_stats()
+
+    deltas = [delta async for delta in client.stream_response("hi", system_prompt="brief")]
+
+    assert len(deltas) == 3
+    assert "".join(deltas).strip() == "one two three"
+    assert fake_anthropic.requests[0]["stream"] is True
+    assert claude_impl.get_usage_stats()["requests"] == before["requests"] + 1
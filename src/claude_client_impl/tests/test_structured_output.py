@@ -0,0 +1,70 @@
+import pytest
+
+import ai_client_api
+from claude_client_impl.claude_impl import ClaudeClient, create_async_client
+
+_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "action": {"type": "string", "enum": ["login", "logout"]},
+        "max_results": {"type": "integer"},
+    },
+    "required": ["action"],
+}
+
+
+def _tool_use(tool_input: dict[str, object], tool_id: str = "tu_1") -> list[dict[str, object]]:
+    return [{"type": "tool_use", "id": tool_id, "name": "respond", "input": tool_input}]
+
+
+def _client(server) -> ClaudeClient:
+    return ClaudeClient(async_client=create_async_client(base_url=server.base_url))
+
+
+@pytest.mark.asyncio
+async def test_forced_tool_output_is_returned(fake_anthropic) -> None:
+    fake_anthropic.responses.append(_tool_use({"action": "logout"}))
+    result = await _client(fake_anthropic).generate_response_async("bye", response_schema=_SCHEMA)
+    assert result == {"action": "logout"}
+    assert fake_anthropic.requests[0]["tools"][0]["input_schema"] == _SCHEMA
+    assert len(fake_anthropic.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_invalid_output_gets_one_repair(fake_anthropic) -> None:
+    fake_anthropic.responses.append(_tool_use({"action": "dance"}))
+    fake_anthropic.responses.append(_tool_use({"action": "login"}, tool_id="tu_2"))
+    result = await _client(fake_anthropic).generate_response_async("hi", response_schema=_SCHEMA)
+
+    assert result == {"action": "login"}
+    repair = fake_anthropic.requests[1]
+    assert repair["max_tokens"] == fake_anthropic.requests[0]["max_tokens"]
+    tool_result = repair["messages"][-1]["content"][0]
+    assert tool_result["type"] == "tool_result"
+    assert tool_result["tool_use_id"] == "tu_1"
+    assert "dance" in tool_result["content"]
+
+
+@pytest.mark.asyncio
+async def test_second_invalid_output_raises(fake_anthropic) -> None:
+    fake_anthropic.responses.append([{"type": "text", "text": "Sure! Here you go"}])
+    fake_anthropic.responses.append(_tool_use({"max_results": "ten"}))
+    with pytest.raises(ai_client_api.SchemaValidationError) as exc_info:
+        await _client(fake_anthropic).generate_response_async("hi", response_schema=_SCHEMA)
+    assert len(fake_anthropic.requests) == 2
+    assert any("action" in error for error in exc_info.value.errors)
+
+
+@pytest.mark.asyncio
+async def test_truncated_output_is_not_repaired(fake_anthropic) -> None:
+    fake_anthropic.stop_reason = "max_tokens"
+    fake_anthropic.responses.append(_tool_use({"max_results": 3}))
+    with pytest.raises(ai_client_api.SchemaValidationError):
+        await _client(fake_anthropic).generate_response_async("hi", response_schema=_SCHEMA)
+    assert len(fake_anthropic.requests) == 1
+
+
+def test_validate_schema_reports_violations() -> None:
+    assert ai_client_api.validate_schema({"action": "login", "max_results": 3}, _SCHEMA) == []
+    errors = ai_client_api.validate_schema({"action": "nope", "max_results": True}, _SCHEMA)
+    assert len(errors) == 2
@@ -12,8 +12,8 @@ def get_channel_impl(raw_data: dict[str, str]) -> chat_client_api.Channel:
     return DiscordChannel(raw_data)
 
 def register() -> None:
+    """Pin the chat factories to Discord; normally found through entry points."""
     chat_client_api.get_client = get_client_impl
     chat_client_api.get_message = get_message_impl
     chat_client_api.get_channel = get_channel_impl
 
-register()
@@ -1,29 +1,45 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
+import mimetypes
 import os
+import time
 from collections.abc import Iterator
 from enum import IntEnum
-from typing import Any, Awaitable, Callable
+from typing import IO, Any, Awaitable, Callable
 
 import discord
 import httpx
 
 import chat_client_api
 from chat_client_api import ChatClient, Message, Channel
+from telemetry import metrics, recording, tracing
 
 logger = logging.getLogger(__name__)
 
+_REQUEST_SECONDS = metrics.histogram(
+    "discord_request_seconds",
+    "Discord REST latency, including rate-limit waits.",
+    ["method"],
+)
+_RATE_LIMITED = metrics.counter("discord_rate_limited_total", "Discord 429 responses.")
+_SEND_QUEUE_DEPTH = metrics.gauge("discord_send_queue_depth", "Sends queued or in flight.")
+
 
 class HTTPStatus(IntEnum):
     """HTTP status codes used in Discord API responses."""
 
     NOT_FOUND = 404
+    TOO_MANY_REQUESTS = 429
 
 
 class DiscordClient(ChatClient):
     DISCORD_API_BASE = "https://discord.com/api/v10"
+    MAX_RATE_LIMIT_RETRIES = 3
+    HTTP_TIMEOUT_SECONDS = 30.0
+    supports_edits = True
 
     def __init__(self, client_data: dict[str, str] | None = None) -> None:
         self._client_data = client_data or {}
@@ -31,10 +47,15 @@ class DiscordClient(ChatClient):
         if not self._token:
             raise ValueError("DISCORD_BOT_TOKEN is required")
 
+        api_base = (
+            self._client_data.get("api_base_url")
+            or os.environ.get("DISCORD_API_BASE_URL")
+            or self.DISCORD_API_BASE
+        )
         self._http_client = httpx.Client(
-            base_url=self.DISCORD_API_BASE,
+            base_url=api_base,
             headers={"Authorization": f"Bot {self._token}"},
-            timeout=30.0,
+            timeout=self.HTTP_TIMEOUT_SECONDS,
         )
 
         intents = discord.Intents.default()
@@ -78,17 +99,23 @@ class DiscordClient(ChatClient):
     def send_message(self, channel_id: str, content: str) -> bool:
         if not content.strip():
             raise ValueError("Message content cannot be empty")
+        _SEND_QUEUE_DEPTH.inc()
         try:
             loop = asyncio.get_running_loop()
         except RuntimeError:
-            return self._send_message_sync(channel_id, content)
+            try:
+                return self._send_message_sync(channel_id, content)
+            finally:
+                _SEND_QUEUE_DEPTH.dec()
 
-        loop.create_task(asyncio.to_thread(self._send_message_sync, channel_id, content))
+        task = loop.create_task(asyncio.to_thread(self._send_message_sync, channel_id, content))
+        task.add_done_callback(lambda _task: _SEND_QUEUE_DEPTH.dec())
         return True
 
     def _send_message_sync(self, channel_id: str, content: str) -> bool:
         try:
-            response = self._http_client.post(
+            response = self._with_rate_limit(
+                self._http_client.post,
                 f"/channels/{channel_id}/messages",
                 json={"content": content},
             )
@@ -97,6 +124,78 @@ class DiscordClient(ChatClient):
         except httpx.HTTPStatusError as exc:
             raise ValueError(f"Failed to send message: {exc}") from exc
 
+    def create_message(self, channel_id: str, content: str) -> Message:
+        if not content.strip():
+            raise ValueError("Message content cannot be empty")
+        try:
+            response = self._with_rate_limit(
+                self._http_client.post,
+                f"/channels/{channel_id}/messages",
+                json={"content": content},
+            )
+            response.raise_for_status()
+            return chat_client_api.get_message(response.json())
+        except httpx.HTTPStatusError as exc:
+            raise ValueError(f"Failed to send message: {exc}") from exc
+
+    def send_file(self, channel_id: str, file: IO[bytes], filename: str, content: str = "") -> Message:
+        payload = {"content": content, "attachments": [{"id": 0, "filename": filename}]}
+        mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        try:
+            # httpx streams file parts in chunks and rewinds them on a retry.
+            response = self._with_rate_limit(
+                self._http_client.post,
+                f"/channels/{channel_id}/messages",
+                data={"payload_json": json.dumps(payload)},
+                files={"files[0]": (filename, file, mime_type)},
+            )
+            response.raise_for_status()
+            return chat_client_api.get_message(response.json())
+        except httpx.HTTPStatusError as exc:
+            raise ValueError(f"Failed to upload {filename}: {exc}") from exc
+
+    def edit_message(self, channel_id: str, message_id: str, content: str) -> bool:
+        if not content.strip():
+            raise ValueError("Message content cannot be empty")
+        try:
+            response = self._with_rate_limit(
+                self._http_client.patch,
+                f"/channels/{channel_id}/messages/{message_id}",
+                json={"content": content},
+            )
+            response.raise_for_status()
+            return True
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code == HTTPStatus.NOT_FOUND:
+                raise ValueError(
+                    f"Message {message_id} not found in channel {channel_id}"
+                ) from exc
+            raise ValueError(f"Failed to edit message: {exc}") from exc
+
+    def _with_rate_limit(
+        self, send: Callable[..., httpx.Response], url: str, **kwargs: Any
+    ) -> httpx.Response:
+        """Issue a request, sleeping out Discord 429 responses a few times.
+
+        Each attempt is bounded by the caller's deadline, and a 429 whose
+        wait would outlast it is returned instead of slept out.
+        """
+        method = send.__name__.upper()
+        with tracing.span(f"discord.{method}"), _REQUEST_SECONDS.labels(method=method).time():
+            for _ in range(self.MAX_RATE_LIMIT_RETRIES):
+                timeout = chat_client_api.call_timeout(self.HTTP_TIMEOUT_SECONDS)
+                response = send(url, timeout=timeout, **kwargs)
+                if response.status_code != HTTPStatus.TOO_MANY_REQUESTS:
+                    return response
+                _RATE_LIMITED.inc()
+                retry_after = _retry_after_seconds(response)
+                remaining = chat_client_api.call_timeout(None)
+                if remaining is not None and retry_after >= remaining:
+                    return response
+                logger.warning("Discord rate limited %s; retrying in %.2fs", url, retry_after)
+                time.sleep(retry_after)
+            return send(url, timeout=chat_client_api.call_timeout(self.HTTP_TIMEOUT_SECONDS), **kwargs)
+
     def delete_message(self, channel_id: str, message_id: str) -> bool:
         try:
             response = self._http_client.delete(
@@ -111,6 +210,17 @@ class DiscordClient(ChatClient):
                 ) from exc
             raise ValueError(f"Failed to delete message: {exc}") from exc
 
+    def open_direct_channel(self, user_id: str) -> str:
+        # Discord returns the existing DM channel when there already is one.
+        try:
+            response = self._with_rate_limit(
+                self._http_client.post, "/users/@me/channels", json={"recipient_id": user_id}
+            )
+            response.raise_for_status()
+            return str(response.json()["id"])
+        except httpx.HTTPStatusError as exc:
+            raise ValueError(f"Failed to open DM channel with {user_id}: {exc}") from exc
+
     def get_channels(self) -> Iterator[Channel]:
         for channel in self._discord_client.get_all_channels():
             yield chat_client_api.get_channel(
@@ -122,6 +232,13 @@ class DiscordClient(ChatClient):
             )
 
 
+def _retry_after_seconds(response: httpx.Response) -> float:
+    try:
+        return float(response.json().get("retry_after", 1.0))
+    except (ValueError, AttributeError):
+        return float(response.headers.get("Retry-After", "1.0"))
+
+
 class _DiscordGatewayClient(discord.Client):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
@@ -138,6 +255,13 @@ class _DiscordGatewayClient(discord.Client):
             return
         if not self._on_message:
             return
+        recorder = recording.get_recorder()
+        if recorder is not None:
+            recorder.record(
+                sender_id=str(message.author.id),
+                channel_id=str(message.channel.id),
+                content=message.content,
+            )
         wrapped = chat_client_api.get_message(
             {
                 "id": str(message.id),
@@ -154,4 +278,6 @@ class _DiscordGatewayClient(discord.Client):
                 ),
             }
         )
-        await self._on_message(wrapped)
+        # Root of the trace for everything the bot does to answer this DM.
+        with tracing.span("discord.receive", channel_id=str(message.channel.id)):
+            await self._on_message(wrapped)
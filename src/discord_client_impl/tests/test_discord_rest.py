@@ -1,10 +1,12 @@
-from typing import Any
+from typing import Any, cast
 
 import pytest
 
 from discord_client_impl.discord_impl import DiscordClient
 import httpx
 
+import chat_client_api
+
 
 class _DummyResponse:
     def __init__(self, status_code: int = 200, payload: dict[str, Any] | None = None) -> None:
@@ -23,7 +25,7 @@ class _DummyHttpClient:
     def __init__(self) -> None:
         self.last_request: tuple[str, str, dict[str, Any]] | None = None
 
-    def post(self, url: str, json: dict[str, Any]) -> _DummyResponse:
+    def post(self, url: str, json: dict[str, Any], timeout: float | None = None) -> _DummyResponse:
         self.last_request = ("post", url, json)
         return _DummyResponse()
 
@@ -74,3 +76,47 @@ def test_delete_message_not_found(monkeypatch: pytest.MonkeyPatch) -> None:
     client._http_client = _ErrorHttpClient(404)  # type: ignore[assignment]
     with pytest.raises(ValueError):
         client.delete_message("123", "456")
+
+
+class _RateLimitedHttpClient:
+    def __init__(self, retry_after: float = 0.01) -> None:
+        self.calls: list[tuple[str, str, dict[str, Any]]] = []
+        self.timeouts: list[float | None] = []
+        self.retry_after = retry_after
+
+    def patch(self, url: str, json: dict[str, Any], timeout: float | None = None) -> httpx.Response:
+        self.calls.append(("patch", url, json))
+        self.timeouts.append(timeout)
+        request = httpx.Request("PATCH", f"https://discord.com{url}")
+        if len(self.calls) == 1:
+            return httpx.Response(429, json={"retry_after": self.retry_after}, request=request)
+        return httpx.Response(200, json={"id": "456"}, request=request)
+
+
+def test_edit_message_retries_after_rate_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "token")
+    client = DiscordClient({})
+    dummy = _RateLimitedHttpClient()
+    client._http_client = dummy  # type: ignore[assignment]
+
+    assert client.edit_message("123", "456", "updated") is True
+    assert len(dummy.calls) == 2
+    assert dummy.calls[-1] == ("patch", "/channels/123/messages/456", {"content": "updated"})
+
+
+def test_requests_are_bounded_by_the_caller_deadline(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "token")
+    client = DiscordClient({})
+    dummy = _RateLimitedHttpClient(retry_after=5.0)
+    client._http_client = dummy  # type: ignore[assignment]
+
+    with chat_client_api.call_deadline(1.0):
+        # The 429 wait outlasts the deadline, so it is not slept out.
+        with pytest.raises(ValueError):
+            client.edit_message("123", "456", "updated")
+    assert len(dummy.calls) == 1
+    assert 0 < cast(float, dummy.timeouts[0]) <= 1.0
+
+    with chat_client_api.call_deadline(0.0), pytest.raises(TimeoutError):
+        client.edit_message("123", "456", "updated")
+    assert len(dummy.calls) == 1
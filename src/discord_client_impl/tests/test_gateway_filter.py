@@ -20,6 +20,7 @@ class _DummyChannel:
 
 class _DummyMessage:
     def __init__(self, *, guild: Any) -> None:
+        self.id = 99
         self.author = _DummyAuthor()
         self.channel = _DummyChannel()
         self.guild = guild
@@ -45,3 +46,22 @@ async def test_gateway_ignores_guild_messages() -> None:
     client.set_message_handler(handler)
     await client.on_message(cast(discord.Message, _DummyMessage(guild="guild")))
     assert called is False
+
+
+@pytest.mark.asyncio
+async def test_gateway_records_dms_when_enabled(monkeypatch: pytest.MonkeyPatch, tmp_path: Any) -> None:
+    from telemetry import recording
+
+    path = tmp_path / "traffic.jsonl"
+    recorder = recording.TrafficRecorder(str(path), salt=b"salt")
+    monkeypatch.setattr(recording, "get_recorder", lambda: recorder)
+    client = _DiscordGatewayClient(intents=discord.Intents.default())
+
+    async def handler(_msg: Any) -> None:
+        return None
+
+    client.set_message_handler(handler)
+    await client.on_message(cast(discord.Message, _DummyMessage(guild=None)))
+    recorder.close()
+
+    assert '"content": "hello"' in path.read_text()
@@ -1,6 +1,12 @@
-from .gmail_impl import GmailClient, get_client_impl, register
+from .attachment_impl import GmailAttachment
+from .gmail_impl import GmailClient, get_client_impl, get_linked_user_ids_impl, register
 from .message_impl import GmailMessage
 
-__all__ = ["GmailClient", "get_client_impl", "GmailMessage", "register"]
-
-register()
+__all__ = [
+    "GmailAttachment",
+    "GmailClient",
+    "get_client_impl",
+    "get_linked_user_ids_impl",
+    "GmailMessage",
+    "register",
+]
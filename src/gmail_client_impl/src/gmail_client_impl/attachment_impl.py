@@ -0,0 +1,38 @@
+import mail_client_api
+
+class GmailAttachment(mail_client_api.Attachment):
+
+    def __init__(
+            self,
+            *,
+            attachment_id: str,
+            message_id: str,
+            filename: str,
+            mime_type: str,
+            size: int,
+    ) -> None:
+        self._attachment_id = attachment_id
+        self._message_id = message_id
+        self._filename = filename
+        self._mime_type = mime_type
+        self._size = size
+
+    @property
+    def id(self) -> str:
+        return self._attachment_id
+
+    @property
+    def message_id(self) -> str:
+        return self._message_id
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def mime_type(self) -> str:
+        return self._mime_type
+
+    @property
+    def size(self) -> int:
+        return self._size
@@ -1,21 +1,34 @@
 from __future__ import annotations
 
 import base64
+import contextlib
+import datetime
+import email
+import email.policy
+import functools
 import json
 import logging
 import os
+import re
 import sqlite3
+import tempfile
 import time
-from collections.abc import Iterator
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, ParamSpec, TypeVar
 
-from google.auth.transport.requests import Request
+import google_auth_httplib2  # type: ignore[import-untyped]
+import httplib2  # type: ignore[import-untyped]
+from google.auth.transport.requests import AuthorizedSession, Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow  # type: ignore[import-untyped]
 from googleapiclient.discovery import build  # type: ignore[import-untyped]
+from googleapiclient.errors import HttpError  # type: ignore[import-untyped]
+from googleapiclient.http import BatchHttpRequest  # type: ignore[import-untyped]
 
 import mail_client_api
+from telemetry import metrics, tracing
+from .attachment_impl import GmailAttachment
 from .message_impl import GmailMessage
 
 logger = logging.getLogger(__name__)
@@ -23,6 +36,101 @@ logger = logging.getLogger(__name__)
 DEFAULT_SCOPES = ["https://www.googleapis.com/auth/gmail.modify"]
 DEFAULT_STATE_TTL_SECONDS = 10 * 60
 DEFAULT_TOKEN_DB = Path.home() / ".smart_chat_bot" / "gmail_tokens.sqlite"
+# httplib2 waits forever by default; bound every Gmail API request.
+DEFAULT_HTTP_TIMEOUT_SECONDS = float(os.environ.get("GMAIL_HTTP_TIMEOUT_SECONDS", "15"))
+# Overrides https://gmail.googleapis.com/, e.g. to load-test against a local stand-in.
+API_BASE_URL = os.environ.get("GMAIL_API_BASE_URL")
+LIST_PAGE_SIZE = 500
+HISTORY_PAGE_SIZE = 500
+# Gmail rejects batches over 100 calls and throttles large ones; it suggests 50.
+BATCH_SIZE = 50
+METADATA_HEADERS = ["From", "To", "Date", "Subject"]
+# Partial-response masks: Gmail sends only the fields each caller reads,
+# instead of label lists, size estimates and full part trees.
+LIST_FIELDS = "messages/id,nextPageToken"
+HISTORY_FIELDS = "history/messagesAdded/message(id,labelIds),historyId,nextPageToken"
+PROFILE_FIELDS = "historyId"
+MODIFY_FIELDS = "id"
+# Masks cannot recurse, so body parts are requested this many levels deep.
+PARTS_MASK_DEPTH = 6
+# Gmail caps attachments at 25 MB; a lower per-user cap bounds disk use per download.
+MAX_ATTACHMENT_BYTES = int(os.environ.get("GMAIL_MAX_ATTACHMENT_BYTES", str(25 * 1024 * 1024)))
+# Downloads stay in memory up to this size, then spill to a temporary file.
+ATTACHMENT_SPOOL_BYTES = int(os.environ.get("GMAIL_ATTACHMENT_SPOOL_BYTES", str(1024 * 1024)))
+ATTACHMENT_CHUNK_BYTES = 64 * 1024
+
+_REQUEST_SECONDS = metrics.histogram(
+    "gmail_request_seconds", "Gmail API request latency.", ["operation"]
+)
+_TOKEN_STORE_SECONDS = metrics.histogram(
+    "gmail_token_store_seconds", "Token store query latency.", ["query"]
+)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+def _timed_query(func: Callable[P, R]) -> Callable[P, R]:
+    histogram = _TOKEN_STORE_SECONDS.labels(query=func.__name__)
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        with histogram.time():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@functools.lru_cache(maxsize=8)
+def _load_client_config(credentials_path: str) -> dict[str, Any]:
+    """Parse the OAuth client secrets file once per process."""
+    with open(credentials_path, encoding="utf-8") as handle:
+        config: dict[str, Any] = json.load(handle)
+    return config
+
+
+def _parts_mask(depth: int, fields: str) -> str:
+    mask = f"parts({fields})"
+    for _ in range(depth - 1):
+        mask = f"parts({fields},{mask})"
+    return mask
+
+
+MESSAGE_FIELDS: dict[str, str] = {
+    "minimal": "id,snippet",
+    "metadata": "id,snippet,payload/headers(name,value)",
+    "full": (
+        "id,snippet,payload(headers(name,value),body/data,"
+        f"{_parts_mask(PARTS_MASK_DEPTH, 'mimeType,body/data')})"
+    ),
+    "raw": "id,snippet,raw",
+}
+_ATTACHMENT_PART_FIELDS = "filename,mimeType,body(attachmentId,size)"
+ATTACHMENT_LIST_FIELDS = (
+    f"payload({_ATTACHMENT_PART_FIELDS},{_parts_mask(PARTS_MASK_DEPTH, _ATTACHMENT_PART_FIELDS)})"
+)
+
+
+def _get_kwargs(format: mail_client_api.MessageFormat) -> dict[str, Any]:
+    """messages.get arguments for ``format``, masked to what _parse_gmail_message reads."""
+    kwargs: dict[str, Any] = {"format": format, "fields": MESSAGE_FIELDS[format]}
+    if format == "metadata":
+        kwargs["metadataHeaders"] = METADATA_HEADERS
+    return kwargs
+
+
+def _execute(request: Any, operation: str) -> Any:
+    with tracing.span(f"gmail.{operation}"), _REQUEST_SECONDS.labels(operation=operation).time():
+        return request.execute()
+
+
+def _set_timeout(http: httplib2.Http, timeout: float | None) -> None:
+    """Bound the next request, including reads on kept-alive connections."""
+    http.timeout = timeout
+    for conn in http.connections.values():
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
 
 
 class GmailTokenStore:
@@ -44,6 +152,14 @@ class GmailTokenStore:
                 )
                 """
             )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS gmail_history (
+                    user_id TEXT PRIMARY KEY,
+                    history_id TEXT NOT NULL
+                )
+                """
+            )
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS gmail_oauth_state (
@@ -56,6 +172,7 @@ class GmailTokenStore:
             )
             conn.commit()
 
+    @_timed_query
     def save_credentials(self, user_id: str, credentials: Credentials) -> None:
         payload = credentials.to_json()
         with self._connect() as conn:
@@ -69,6 +186,7 @@ class GmailTokenStore:
             )
             conn.commit()
 
+    @_timed_query
     def load_credentials(self, user_id: str, scopes: list[str]) -> Credentials | None:
         with self._connect() as conn:
             row = conn.execute(
@@ -80,15 +198,46 @@ class GmailTokenStore:
         info = json.loads(row[0])
         return Credentials.from_authorized_user_info(info, scopes=scopes)
 
+    @_timed_query
     def delete_credentials(self, user_id: str) -> bool:
         with self._connect() as conn:
             cursor = conn.execute(
                 "DELETE FROM gmail_tokens WHERE user_id = ?",
                 (user_id,),
             )
+            conn.execute("DELETE FROM gmail_history WHERE user_id = ?", (user_id,))
             conn.commit()
         return cursor.rowcount > 0
 
+    @_timed_query
+    def list_user_ids(self) -> list[str]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT user_id FROM gmail_tokens ORDER BY user_id").fetchall()
+        return [row[0] for row in rows]
+
+    @_timed_query
+    def load_history_id(self, user_id: str) -> str | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT history_id FROM gmail_history WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    @_timed_query
+    def save_history_id(self, user_id: str, history_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO gmail_history (user_id, history_id)
+                VALUES (?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET history_id = excluded.history_id
+                """,
+                (user_id, history_id),
+            )
+            conn.commit()
+
+    @_timed_query
     def save_state(self, user_id: str, state: str, ttl_seconds: int = DEFAULT_STATE_TTL_SECONDS) -> None:
         expires_at = int(time.time()) + ttl_seconds
         with self._connect() as conn:
@@ -102,6 +251,7 @@ class GmailTokenStore:
             )
             conn.commit()
 
+    @_timed_query
     def consume_state(self, state: str) -> str | None:
         now = int(time.time())
         with self._connect() as conn:
@@ -120,6 +270,12 @@ class GmailTokenStore:
     
 
 
+@functools.lru_cache(maxsize=8)
+def _open_token_store(db_path: Path) -> GmailTokenStore:
+    """Share one store per database, so building a client skips the schema setup."""
+    return GmailTokenStore(db_path)
+
+
 class GmailClient(mail_client_api.MailClient):
     def __init__(
         self,
@@ -135,18 +291,26 @@ class GmailClient(mail_client_api.MailClient):
         self.redirect_uri = redirect_uri
         self.scopes = scopes or list(DEFAULT_SCOPES)
         token_db = Path(db_path) if db_path else DEFAULT_TOKEN_DB
-        self._token_store = GmailTokenStore(token_db)
+        self._token_store = _open_token_store(token_db)
         self._service = None
+        self._http: httplib2.Http | None = None
+        self._session: AuthorizedSession | None = None
+        self.max_attachment_bytes = MAX_ATTACHMENT_BYTES
+
+    def _new_flow(self, state: str | None = None) -> Flow:
+        # Flows hold per-login session state, so build a fresh one from the cached config.
+        return Flow.from_client_config(
+            _load_client_config(self.credentials_path),
+            scopes=self.scopes,
+            redirect_uri=self.redirect_uri,
+            state=state,
+        )
 
     def login(self) -> dict[str, str]:
         if not self.user_id:
             raise ValueError("user_id is required for login")
 
-        flow = Flow.from_client_secrets_file(
-            self.credentials_path,
-            scopes=self.scopes,
-            redirect_uri=self.redirect_uri,
-        )
+        flow = self._new_flow()
         authorization_url, state = flow.authorization_url(
             access_type="offline",
             include_granted_scopes="true",
@@ -164,12 +328,7 @@ class GmailClient(mail_client_api.MailClient):
             raise ValueError("Invalid or expired OAuth state")
         self.user_id = user_id
 
-        flow = Flow.from_client_secrets_file(
-            self.credentials_path,
-            scopes=self.scopes,
-            redirect_uri=self.redirect_uri,
-            state=state,
-        )
+        flow = self._new_flow(state)
         flow.fetch_token(code=code)
         credentials = flow.credentials
         self._token_store.save_credentials(self.user_id, credentials)
@@ -177,6 +336,8 @@ class GmailClient(mail_client_api.MailClient):
 
     def logout(self) -> bool:
         self._service = None
+        self._http = None
+        self._session = None
         return self._token_store.delete_credentials(self.user_id)
 
     def _load_credentials(self) -> Credentials:
@@ -192,60 +353,297 @@ class GmailClient(mail_client_api.MailClient):
     def _get_service(self) -> Any:
         if not self._service:
             credentials = self._load_credentials()
-            self._service = build("gmail", "v1", credentials=credentials)
+            self._http = httplib2.Http(timeout=DEFAULT_HTTP_TIMEOUT_SECONDS)
+            http = google_auth_httplib2.AuthorizedHttp(credentials, http=self._http)
+            client_options = {"api_endpoint": API_BASE_URL} if API_BASE_URL else None
+            self._service = build("gmail", "v1", http=http, client_options=client_options)
         return self._service
 
-    def get_message(self, message_id: str) -> mail_client_api.Message:
+    def _execute(self, request: Any, operation: str) -> Any:
+        if self._http is not None:
+            _set_timeout(self._http, mail_client_api.call_timeout(DEFAULT_HTTP_TIMEOUT_SECONDS))
+        return _execute(request, operation)
+
+    def _get_session(self) -> AuthorizedSession:
+        # httplib2 reads whole responses into memory; requests can stream them.
+        if self._session is None:
+            self._session = AuthorizedSession(self._load_credentials())
+        return self._session
+
+    def get_message(
+        self, message_id: str, *, format: mail_client_api.MessageFormat = "full"
+    ) -> mail_client_api.Message:
         service = self._get_service()
-        msg_data = (
-            service.users()
-            .messages()
-            .get(userId="me", id=message_id, format="full")
-            .execute()
+        msg_data = self._execute(
+            service.users().messages().get(userId="me", id=message_id, **_get_kwargs(format)),
+            "get_message",
         )
-        return _parse_gmail_message(msg_data, include_body=True)
+        return _parse_gmail_message(msg_data, include_body=format in ("full", "raw"))
 
     def delete_message(self, message_id: str) -> bool:
         service = self._get_service()
-        service.users().messages().delete(userId="me", id=message_id).execute()
+        self._execute(service.users().messages().delete(userId="me", id=message_id), "delete_message")
         return True
 
     def mark_as_read(self, message_id: str) -> bool:
         service = self._get_service()
-        service.users().messages().modify(
-            userId="me",
-            id=message_id,
-            body={"removeLabelIds": ["UNREAD"]},
-        ).execute()
+        self._execute(
+            service.users().messages().modify(
+                userId="me",
+                id=message_id,
+                body={"removeLabelIds": ["UNREAD"]},
+                fields=MODIFY_FIELDS,
+            ),
+            "mark_as_read",
+        )
         return True
 
-    def get_messages(self, max_results: int = 10) -> Iterator[mail_client_api.Message]:
+    def list_message_ids(
+        self,
+        max_results: int = 10,
+        *,
+        query: str | None = None,
+        labels: Sequence[str] | None = None,
+        after: datetime.date | None = None,
+        before: datetime.date | None = None,
+    ) -> list[str]:
+        pages = self._list_pages(max_results, query=query, labels=labels, after=after, before=before)
+        return [message_id for page in pages for message_id in page]
+
+    def get_messages_by_id(
+        self, message_ids: list[str], *, format: mail_client_api.MessageFormat = "full"
+    ) -> list[mail_client_api.Message]:
+        return list(self._batch_get(message_ids, "batch_get_messages", format))
+
+    def _list_pages(
+        self,
+        max_results: int,
+        *,
+        query: str | None,
+        labels: Sequence[str] | None,
+        after: datetime.date | None,
+        before: datetime.date | None,
+    ) -> Iterator[list[str]]:
+        """Yield message ids a page at a time, following pageToken up to max_results."""
         service = self._get_service()
-        response = (
-            service.users()
-            .messages()
-            .list(userId="me", maxResults=max_results)
-            .execute()
-        )
-        for item in response.get("messages", []):
-            msg_id = item.get("id")
-            if not msg_id:
-                continue
-            msg_data = (
+        search = _search_query(query, after, before)
+        remaining = max_results
+        page_token = None
+        while remaining > 0:
+            response = self._execute(
                 service.users()
                 .messages()
-                .get(
+                .list(
                     userId="me",
-                    id=msg_id,
-                    format="metadata",
-                    metadataHeaders=["From", "To", "Date", "Subject"],
+                    maxResults=min(remaining, LIST_PAGE_SIZE),
+                    q=search,
+                    labelIds=list(labels) if labels else None,
+                    pageToken=page_token,
+                    fields=LIST_FIELDS,
+                ),
+                "list_messages",
+            )
+            page = [item["id"] for item in response.get("messages", []) if item.get("id")][:remaining]
+            if page:
+                yield page
+            remaining -= len(page)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return
+
+    def _batch_get(
+        self, message_ids: list[str], operation: str, format: mail_client_api.MessageFormat
+    ) -> Iterator[GmailMessage]:
+        """Fetch messages BATCH_SIZE to a request, yielding each chunk in id order.
+
+        Messages deleted since they were listed are skipped. Any other failed
+        item is retried once on its own, and raises if that fails too, so a
+        caller never silently gets fewer messages than still exist.
+        """
+        service = self._get_service()
+        get_kwargs = _get_kwargs(format)
+        include_body = format in ("full", "raw")
+        batch_uri = f"{API_BASE_URL or 'https://gmail.googleapis.com/'}batch/gmail/v1"
+        for start in range(0, len(message_ids), BATCH_SIZE):
+            chunk = message_ids[start : start + BATCH_SIZE]
+            found: dict[str, GmailMessage] = {}
+            failed: list[str] = []
+
+            def _collect(request_id: str, response: Any, exception: Exception | None) -> None:
+                if exception is None:
+                    found[request_id] = _parse_gmail_message(response, include_body=include_body)
+                elif getattr(exception, "status_code", None) != 404:
+                    logger.warning("Batch get of message %s failed: %s", request_id, exception)
+                    failed.append(request_id)
+
+            batch = BatchHttpRequest(callback=_collect, batch_uri=batch_uri)
+            for message_id in dict.fromkeys(chunk):
+                batch.add(
+                    service.users().messages().get(userId="me", id=message_id, **get_kwargs),
+                    request_id=message_id,
                 )
-                .execute()
+            self._execute(batch, operation)
+            for message_id in failed:
+                try:
+                    response = self._execute(
+                        service.users().messages().get(userId="me", id=message_id, **get_kwargs),
+                        "get_message",
+                    )
+                except HttpError as exc:
+                    if exc.status_code != 404:
+                        raise
+                    continue
+                found[message_id] = _parse_gmail_message(response, include_body=include_body)
+            yield from (found[message_id] for message_id in chunk if message_id in found)
+
+    def list_attachments(self, message_id: str) -> list[mail_client_api.Attachment]:
+        service = self._get_service()
+        msg_data = self._execute(
+            service.users()
+            .messages()
+            .get(userId="me", id=message_id, format="full", fields=ATTACHMENT_LIST_FIELDS),
+            "list_attachments",
+        )
+        return [
+            GmailAttachment(
+                attachment_id=part["body"]["attachmentId"],
+                message_id=message_id,
+                filename=part["filename"],
+                mime_type=part.get("mimeType", "application/octet-stream"),
+                size=int(part["body"].get("size", 0)),
             )
-            yield _parse_gmail_message(msg_data, include_body=False)
+            for part in _walk_parts(msg_data.get("payload", {}))
+            if part.get("filename") and part.get("body", {}).get("attachmentId")
+        ]
+
+    def download_attachment(
+        self, message_id: str, attachment_id: str, *, max_bytes: int | None = None
+    ) -> IO[bytes]:
+        limit = self.max_attachment_bytes if max_bytes is None else max_bytes
+        url = (
+            f"{API_BASE_URL or 'https://gmail.googleapis.com/'}"
+            f"gmail/v1/users/me/messages/{message_id}/attachments/{attachment_id}"
+        )
+        spool = tempfile.SpooledTemporaryFile(max_size=ATTACHMENT_SPOOL_BYTES)
+        try:
+            with (
+                tracing.span("gmail.get_attachment"),
+                _REQUEST_SECONDS.labels(operation="get_attachment").time(),
+                contextlib.closing(
+                    self._get_session().get(
+                        url,
+                        params={"fields": "data"},
+                        stream=True,
+                        timeout=mail_client_api.call_timeout(DEFAULT_HTTP_TIMEOUT_SECONDS),
+                    )
+                ) as response,
+            ):
+                if response.status_code >= 400:
+                    raise HttpError(httplib2.Response({"status": response.status_code}), response.content, uri=url)
+                decoder = _Base64Decoder()
+                chunks = response.iter_content(chunk_size=ATTACHMENT_CHUNK_BYTES)
+                for encoded in _json_string_value(chunks, b"data"):
+                    spool.write(decoder.decode(encoded))
+                    if spool.tell() > limit:
+                        raise mail_client_api.AttachmentTooLargeError(attachment_id, limit)
+                spool.write(decoder.flush())
+                if spool.tell() > limit:
+                    raise mail_client_api.AttachmentTooLargeError(attachment_id, limit)
+        except BaseException:
+            spool.close()
+            raise
+        spool.seek(0)
+        return spool  # type: ignore[return-value]
+
+    def fetch_new_message_ids(self) -> tuple[list[str], str]:
+        service = self._get_service()
+        start = self._token_store.load_history_id(self.user_id)
+        if start is None:
+            return [], self._reset_history_id(service)
+        added: dict[str, None] = {}
+        latest = start
+        page_token = None
+        while True:
+            try:
+                response = self._execute(
+                    service.users()
+                    .history()
+                    .list(
+                        userId="me",
+                        startHistoryId=start,
+                        historyTypes=["messageAdded"],
+                        labelId="INBOX",
+                        maxResults=HISTORY_PAGE_SIZE,
+                        pageToken=page_token,
+                        fields=HISTORY_FIELDS,
+                    ),
+                    "list_history",
+                )
+            except HttpError as exc:
+                # Gmail keeps about a week of history; past that the cursor is gone.
+                if exc.status_code != 404:
+                    raise
+                logger.info("History %s expired for %s; starting over", start, self.user_id)
+                return [], self._reset_history_id(service)
+            for record in response.get("history", []):
+                for change in record.get("messagesAdded", []):
+                    message = change.get("message", {})
+                    if message.get("id") and "INBOX" in message.get("labelIds", ["INBOX"]):
+                        added[message["id"]] = None
+            latest = response.get("historyId", latest)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        return list(added), str(latest)
+
+    def commit_poll_cursor(self, cursor: str) -> None:
+        self._token_store.save_history_id(self.user_id, cursor)
+
+    def _reset_history_id(self, service: Any) -> str:
+        profile = self._execute(service.users().getProfile(userId="me", fields=PROFILE_FIELDS), "get_profile")
+        history_id = str(profile["historyId"])
+        self._token_store.save_history_id(self.user_id, history_id)
+        return history_id
+
+    def get_messages(
+        self,
+        max_results: int = 10,
+        *,
+        query: str | None = None,
+        labels: Sequence[str] | None = None,
+        after: datetime.date | None = None,
+        before: datetime.date | None = None,
+        format: mail_client_api.MessageFormat = "metadata",
+    ) -> Iterator[mail_client_api.Message]:
+        # Fetch each page as it arrives so callers see results before the last page is listed.
+        pages = self._list_pages(max_results, query=query, labels=labels, after=after, before=before)
+        for page in pages:
+            yield from self._batch_get(page, f"batch_get_{format}", format)
+
+
+def _search_query(
+    query: str | None, after: datetime.date | None, before: datetime.date | None
+) -> str | None:
+    """Gmail search string; dates become epoch seconds so they are not read as Pacific time."""
+    terms = [query] if query else []
+    if after is not None:
+        terms.append(f"after:{_epoch_seconds(after)}")
+    if before is not None:
+        terms.append(f"before:{_epoch_seconds(before)}")
+    return " ".join(terms) or None
+
+
+def _epoch_seconds(value: datetime.date) -> int:
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time(), tzinfo=datetime.timezone.utc)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int(value.timestamp())
 
 
 def _parse_gmail_message(data: dict[str, Any], *, include_body: bool) -> GmailMessage:
+    if "raw" in data:
+        return _parse_raw_message(data, include_body=include_body)
     payload = data.get("payload", {})
     headers = _extract_headers(payload)
     body = _extract_body(payload) if include_body else ""
@@ -260,6 +658,32 @@ def _parse_gmail_message(data: dict[str, Any], *, include_body: bool) -> GmailMe
     )
 
 
+def _parse_raw_message(data: dict[str, Any], *, include_body: bool) -> GmailMessage:
+    """Parse a format="raw" resource, whose ``raw`` is the base64url RFC 2822 source."""
+    try:
+        source = base64.urlsafe_b64decode(data["raw"].encode("utf-8"))
+    except Exception:
+        logger.exception("Failed to decode raw message")
+        source = b""
+    parsed = email.message_from_bytes(source, policy=email.policy.default)
+    body = ""
+    if include_body:
+        part = parsed.get_body(preferencelist=("plain", "html"))  # type: ignore[attr-defined]
+        try:
+            body = part.get_content() if part is not None else ""
+        except Exception:
+            logger.exception("Failed to decode message body")
+    return GmailMessage(
+        msg_id=data.get("id", ""),
+        from_=str(parsed.get("From", "")),
+        to=str(parsed.get("To", "")),
+        date=str(parsed.get("Date", "")),
+        subject=str(parsed.get("Subject", "")),
+        snippet=data.get("snippet", ""),
+        body=body,
+    )
+
+
 def _extract_headers(payload: dict[str, Any]) -> dict[str, str]:
     headers: dict[str, str] = {}
     for header in payload.get("headers", []):
@@ -292,6 +716,65 @@ def _find_part(payload: dict[str, Any], mime_type: str) -> str | None:
     return None
 
 
+def _walk_parts(payload: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield payload
+    for part in payload.get("parts", []):
+        yield from _walk_parts(part)
+
+
+class _Base64Decoder:
+    """Decode base64url text that arrives in arbitrary chunks."""
+
+    def __init__(self) -> None:
+        self._pending = b""
+
+    def decode(self, data: bytes) -> bytes:
+        data = self._pending + data
+        usable = len(data) - len(data) % 4
+        self._pending = data[usable:]
+        return base64.urlsafe_b64decode(data[:usable])
+
+    def flush(self) -> bytes:
+        data, self._pending = self._pending, b""
+        return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4)) if data else b""
+
+
+_JSON_STRING_START = re.compile(rb"\s*:\s*\"")
+_JSON_STRING_START_PARTIAL = re.compile(rb"\s*(?::\s*)?\Z")
+
+
+def _json_string_value(chunks: Iterable[bytes], key: bytes) -> Iterator[bytes]:
+    """Yield a top-level JSON string field as it streams, without loading the document.
+
+    Only for values with no escape sequences, such as base64url data.
+    """
+    marker = b'"' + key + b'"'
+    pending = b""
+    in_value = False
+    for chunk in chunks:
+        pending += chunk
+        if not in_value:
+            start = pending.find(marker)
+            if start < 0:
+                pending = pending[-len(marker) :]
+                continue
+            match = _JSON_STRING_START.match(pending, start + len(marker))
+            if match is None:
+                if not _JSON_STRING_START_PARTIAL.match(pending, start + len(marker)):
+                    raise ValueError(f"Field {key.decode()!r} is not a JSON string")
+                pending = pending[start:]
+                continue
+            pending = pending[match.end() :]
+            in_value = True
+        end = pending.find(b'"')
+        if end >= 0:
+            yield pending[:end]
+            return
+        yield pending
+        pending = b""
+    raise ValueError(f"Response ended before field {key.decode()!r} was complete")
+
+
 def _decode_body(data: str) -> str:
     try:
         decoded = base64.urlsafe_b64decode(data.encode("utf-8"))
@@ -315,5 +798,11 @@ def get_client_impl(*, user_id: str) -> mail_client_api.MailClient:
     )
 
 
+def get_linked_user_ids_impl() -> list[str]:
+    db_path = os.environ.get("GMAIL_TOKEN_DB_PATH")
+    return _open_token_store(Path(db_path) if db_path else DEFAULT_TOKEN_DB).list_user_ids()
+
+
 def register() -> None:
+    """Pin the mail factory to Gmail; normally found through entry points."""
     mail_client_api.get_mail_client = get_client_impl
@@ -0,0 +1,43 @@
+import json
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from gmail_client_impl import gmail_impl
+from gmail_client_impl.gmail_impl import GmailClient
+
+
+@pytest.fixture
+def client_secrets(tmp_path: Path) -> Path:
+    path = tmp_path / "client_secret.json"
+    config = {
+        "web": {
+            "client_id": "client-id",
+            "client_secret": "client-secret",
+            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+            "token_uri": "https://oauth2.googleapis.com/token",
+        }
+    }
+    path.write_text(json.dumps(config), encoding="utf-8")
+    gmail_impl._load_client_config.cache_clear()
+    return path
+
+
+def test_login_parses_client_config_once(client_secrets: Path, tmp_path: Path) -> None:
+    db_path = str(tmp_path / "tokens.sqlite")
+    urls = []
+    for user_id in ("u1", "u2", "u3"):
+        client = GmailClient(
+            user_id=user_id,
+            credentials_path=str(client_secrets),
+            redirect_uri="http://localhost/auth/mail/callback",
+            db_path=db_path,
+        )
+        urls.append(client.login())
+
+    info = gmail_impl._load_client_config.cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+    states = [parse_qs(urlsplit(data["authorization_url"]).query)["state"][0] for data in urls]
+    assert states == [data["state"] for data in urls]
+    assert len(set(states)) == 3
@@ -1,6 +1,8 @@
 import base64
 
-from gmail_client_impl.gmail_impl import _decode_body, _extract_headers
+import pytest
+
+from gmail_client_impl.gmail_impl import _Base64Decoder, _decode_body, _extract_headers, _json_string_value
 
 
 def test_extract_headers_lowercases_keys() -> None:
@@ -19,3 +21,22 @@ def test_decode_body_base64url() -> None:
     raw = "Hello world"
     encoded = base64.urlsafe_b64encode(raw.encode("utf-8")).decode("utf-8")
     assert _decode_body(encoded) == raw
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64])
+def test_attachment_data_decodes_across_chunk_boundaries(chunk_size: int) -> None:
+    data = bytes(range(256)) * 3 + b"tail"
+    encoded = base64.urlsafe_b64encode(data).rstrip(b"=")
+    document = b'{\n  "size": 772,\n  "data" : "' + encoded + b'"\n}\n'
+    chunks = (document[start : start + chunk_size] for start in range(0, len(document), chunk_size))
+
+    decoder = _Base64Decoder()
+    decoded = b"".join(decoder.decode(piece) for piece in _json_string_value(chunks, b"data"))
+    assert decoded + decoder.flush() == data
+
+
+def test_attachment_data_must_be_complete() -> None:
+    with pytest.raises(ValueError):
+        list(_json_string_value([b'{"data": "YWJj'], b"data"))
+    with pytest.raises(ValueError):
+        list(_json_string_value([b'{"data": 12}'], b"data"))
@@ -1,4 +1,18 @@
-from .client import MailClient, get_mail_client
-from .message import Message
+from . import providers
+from .attachment import Attachment, AttachmentTooLargeError
+from .client import MailClient, get_linked_user_ids, get_mail_client
+from telemetry.deadline import call_deadline, call_timeout
+from .message import Message, MessageFormat
 
-__all__ = ["MailClient", "get_mail_client", "Message"]
+__all__ = [
+    "Attachment",
+    "AttachmentTooLargeError",
+    "call_deadline",
+    "call_timeout",
+    "MailClient",
+    "get_linked_user_ids",
+    "get_mail_client",
+    "Message",
+    "MessageFormat",
+    "providers",
+]
@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+
+
+class Attachment(ABC):
+    """Abstract base class describing a file attached to an email message."""
+
+    @property
+    @abstractmethod
+    def id(self) -> str:
+        """Return the provider's identifier for the attachment."""
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def message_id(self) -> str:
+        """Return the id of the message the attachment belongs to."""
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def filename(self) -> str:
+        """Return the attachment's file name."""
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def mime_type(self) -> str:
+        """Return the attachment's MIME type."""
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def size(self) -> int:
+        """Return the decoded size of the attachment in bytes."""
+        raise NotImplementedError
+
+
+class AttachmentTooLargeError(ValueError):
+    """Raised when an attachment is larger than the caller allows."""
+
+    def __init__(self, name: str, limit: int) -> None:
+        super().__init__(f"Attachment {name!r} is larger than {limit} bytes")
+        self.name = name
+        self.limit = limit
@@ -1,7 +1,11 @@
+import datetime
 from abc import ABC, abstractmethod
-from collections.abc import Iterator
+from collections.abc import Iterator, Sequence
+from typing import IO
 
-from .message import Message
+from . import providers
+from .attachment import Attachment
+from .message import Message, MessageFormat
 
 class MailClient(ABC):
     @abstractmethod
@@ -24,8 +28,8 @@ class MailClient(ABC):
         raise NotImplementedError
     
     @abstractmethod
-    def get_message(self, message_id: str) -> Message:
-        """Return a full message including the body."""
+    def get_message(self, message_id: str, *, format: MessageFormat = "full") -> Message:
+        """Return a message; the default "full" format includes the body."""
         raise NotImplementedError
     
     @abstractmethod
@@ -39,14 +43,106 @@ class MailClient(ABC):
         raise NotImplementedError
     
     @abstractmethod
-    def get_messages(self, max_results: int=10) -> Iterator[Message]:
-        """Return a list of recent messages.
+    def get_messages(
+        self,
+        max_results: int = 10,
+        *,
+        query: str | None = None,
+        labels: Sequence[str] | None = None,
+        after: datetime.date | None = None,
+        before: datetime.date | None = None,
+        format: MessageFormat = "metadata",
+    ) -> Iterator[Message]:
+        """Yield up to max_results recent messages, newest first, matching the filters.
 
+        query uses the provider's search syntax (e.g. ``from:alice is:unread``),
+        labels are label ids every result must carry, and after/before bound
+        the received date; a date means midnight UTC. Filtering happens on the
+        provider's side, and results stream as pages arrive, so callers should
+        not over-fetch and filter locally.
+
+        format picks how much of each message is fetched; see MessageFormat.
         Implementations may return summaries only. In that case, Message.body
         can be empty or partial and callers should use get_message() for full
         content.
         """
         raise NotImplementedError
-    
+
+    def list_message_ids(
+        self,
+        max_results: int = 10,
+        *,
+        query: str | None = None,
+        labels: Sequence[str] | None = None,
+        after: datetime.date | None = None,
+        before: datetime.date | None = None,
+    ) -> list[str]:
+        """Return the ids of recent messages matching the get_messages filters, newest first.
+
+        The default goes through get_messages; providers that can list ids
+        without fetching each message should override it.
+        """
+        messages = self.get_messages(
+            max_results=max_results, query=query, labels=labels, after=after, before=before
+        )
+        return [message.id for message in messages]
+
+    def get_messages_by_id(
+        self, message_ids: list[str], *, format: MessageFormat = "full"
+    ) -> list[Message]:
+        """Return messages in the order of message_ids, by default including bodies.
+
+        The default calls get_message once per id. Providers with a batch
+        endpoint should override it. Ids that no longer exist may be skipped.
+        """
+        return [self.get_message(message_id, format=format) for message_id in message_ids]
+
+    def list_attachments(self, message_id: str) -> list[Attachment]:
+        """Return the files attached to a message, without their contents."""
+        raise NotImplementedError
+
+    def download_attachment(
+        self, message_id: str, attachment_id: str, *, max_bytes: int | None = None
+    ) -> IO[bytes]:
+        """Return an attachment's contents as a binary file positioned at the start.
+
+        The contents are streamed to a temporary file that stays in memory
+        only while small, so large attachments do not grow the process.
+        The caller must close the file. Raises AttachmentTooLargeError once
+        more than max_bytes arrive, or the provider's own limit when None.
+        """
+        raise NotImplementedError
+
+    def poll_new_message_ids(self) -> list[str]:
+        """Return ids of inbox messages added since the previous poll, oldest first.
+
+        The provider keeps the cursor with the user's credentials, so polling
+        resumes where it left off after a restart. The first poll for a user
+        only records the starting point and returns an empty list.
+
+        The default fetches and commits in one step. Callers that act on the
+        ids should call fetch_new_message_ids and commit_poll_cursor instead,
+        so a failure before the commit leaves the messages to the next poll.
+        """
+        message_ids, cursor = self.fetch_new_message_ids()
+        self.commit_poll_cursor(cursor)
+        return message_ids
+
+    def fetch_new_message_ids(self) -> tuple[list[str], str]:
+        """Return ids added since the stored cursor, oldest first, and the cursor after them.
+
+        The stored cursor does not move until commit_poll_cursor is called.
+        """
+        raise NotImplementedError
+
+    def commit_poll_cursor(self, cursor: str) -> None:
+        """Store a cursor from fetch_new_message_ids, so the next poll starts after it."""
+        raise NotImplementedError
+
 def get_mail_client(*, user_id: str) -> MailClient:
-    raise NotImplementedError
+    """Build a client from the provider registered under ``providers.PROVIDER_GROUP``."""
+    return providers.provider().get_client_impl(user_id=user_id)
+
+def get_linked_user_ids() -> list[str]:
+    """Return every user that has linked a mailbox with the installed provider."""
+    return providers.provider().get_linked_user_ids_impl()
@@ -1,4 +1,10 @@
 from abc import ABC, abstractmethod
+from typing import Literal
+
+# How much of each message to fetch: "minimal" is id and snippet only,
+# "metadata" adds the headers, "full" adds the body, and "raw" fetches the
+# RFC 2822 source and parses headers and body from it.
+MessageFormat = Literal["minimal", "metadata", "full", "raw"]
 
 class Message(ABC):
     """Abstract base class representing an email message."""
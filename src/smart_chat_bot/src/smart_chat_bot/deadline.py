@@ -0,0 +1,87 @@
+"""Per-message time budgets shared by every call made while handling a DM.
+
+A ``Deadline`` is stored in a context variable, so the handler sets it once
+and helpers deep in the call path can read the remaining time without it
+being threaded through every signature. ``asyncio.to_thread`` copies the
+context, so worker threads see the same deadline.
+
+    with deadline_scope(20.0):
+        messages = await run_blocking(mail_client.get_messages, max_results=5)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+__all__ = [
+    "Deadline",
+    "current_deadline",
+    "deadline_scope",
+    "remaining_timeout",
+    "run_blocking",
+]
+
+T = TypeVar("T")
+
+_current: ContextVar[Deadline | None] = ContextVar("smart_chat_bot_deadline", default=None)
+
+
+class Deadline:
+    def __init__(self, seconds: float, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.budget = seconds
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self, reserve: float = 0.0) -> float:
+        """Seconds left after holding back ``reserve``; never negative."""
+        return max(0.0, self.expires_at - reserve - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+def current_deadline() -> Deadline | None:
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(
+    seconds: float, *, clock: Callable[[], float] = time.monotonic
+) -> Iterator[Deadline]:
+    """Set a deadline for the enclosed block; an outer, tighter deadline wins."""
+    deadline = Deadline(seconds, clock=clock)
+    outer = _current.get()
+    if outer is not None and outer.expires_at <= deadline.expires_at:
+        deadline = outer
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def remaining_timeout(reserve: float = 0.0) -> float | None:
+    """Timeout to pass to a call, or None when no deadline is set."""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining(reserve)
+
+
+async def run_blocking(
+    func: Callable[..., T], *args: Any, reserve: float = 0.0, **kwargs: Any
+) -> T:
+    """Run a blocking call in a worker thread bounded by the current deadline.
+
+    Raises TimeoutError without starting the call when the budget is spent.
+    The worker thread itself cannot be interrupted, so transports should also
+    carry their own socket timeouts.
+    """
+    timeout = remaining_timeout(reserve)
+    if timeout is not None and timeout <= 0:
+        raise TimeoutError("Deadline exceeded before call started")
+    return await asyncio.wait_for(asyncio.to_thread(func, *args, **kwargs), timeout)
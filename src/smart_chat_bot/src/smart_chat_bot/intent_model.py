@@ -0,0 +1,289 @@
+"""Offline intent classifier for chat commands.
+
+Character n-grams are hashed into a fixed-size vector and scored by a
+softmax linear model trained with NumPy, so a prediction is a handful of
+vector operations with no network access. The model is trained from a JSONL
+corpus of ``{"message": ..., "command": {...}}`` lines recorded from past AI
+parses.
+
+    python -m smart_chat_bot.intent_model train corpus.jsonl --out intent_model.npz
+    python -m smart_chat_bot.intent_model evaluate intent_model.npz corpus.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import time
+import zlib
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+DEFAULT_DIMENSIONS = 2**13
+DEFAULT_THRESHOLD = 0.9
+NGRAM_SIZES = (2, 3, 4)
+# Actions the model may answer only when the argument can be read off the text.
+MESSAGE_ID_ACTIONS = {"get_message", "delete_message", "mark_as_read", "get_attachments"}
+# Labels that still need the AI, e.g. chit-chat that wants a written reply.
+DEFERRED_ACTIONS = {"reply"}
+
+_WHITESPACE = re.compile(r"\s+")
+_DIGITS = re.compile(r"\d")
+_NUMBER = re.compile(r"(?<![\w-])(\d{1,3})(?![\w-])")
+_MESSAGE_ID = re.compile(r"(?<![\w-])(?=[\w-]*\d)[A-Za-z0-9_-]{6,}(?![\w-])")
+# Wording that maps to query, labels, after/before or filename. The model reads
+# only the action and a count or id, so such messages are left to the AI.
+_FILTER_WORDS = re.compile(
+    r"\b(?:from|sender|subject|about|unread|starred|important|labell?ed|label|spam|"
+    r"today|yesterday|since|before|after|until|between|(?:this|last|past)\s+(?:week|month|year)|"
+    r"january|february|march|april|june|july|august|september|october|november|december|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b"
+    r"|\d{4}-\d{1,2}-\d{1,2}|\b\d{1,2}/\d{1,2}\b",
+    re.IGNORECASE,
+)
+_FILE_WORDS = re.compile(
+    r"\b(?:pdfs?|docx?|xlsx?|csv|pptx?|zip|jpe?g|png|gif|images?|photos?|pictures?|"
+    r"spreadsheets?|invoices?|receipts?)\b|\.\w{2,4}\b",
+    re.IGNORECASE,
+)
+
+
+def _ngram_ids(text: str, dimensions: int) -> np.ndarray:
+    normalized = " " + _WHITESPACE.sub(" ", _DIGITS.sub("0", text.lower())).strip() + " "
+    ids = [
+        zlib.crc32(normalized[start : start + size].encode("utf-8")) % dimensions
+        for size in NGRAM_SIZES
+        for start in range(max(1, len(normalized) - size + 1))
+    ]
+    return np.asarray(ids, dtype=np.int64)
+
+
+def featurize(text: str, dimensions: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return the sparse (indices, values) L2-normalized n-gram count vector."""
+    indices, counts = np.unique(_ngram_ids(text, dimensions), return_counts=True)
+    values = counts.astype(np.float32)
+    values /= np.linalg.norm(values)
+    return indices, values
+
+
+def _dense(texts: Sequence[str], dimensions: int) -> np.ndarray:
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        indices, values = featurize(text, dimensions)
+        matrix[row, indices] = values
+    return matrix
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+class IntentModel:
+    def __init__(
+        self,
+        labels: list[str],
+        weights: np.ndarray,
+        bias: np.ndarray,
+    ) -> None:
+        self.labels = labels
+        self.weights = weights
+        self.bias = bias
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.weights.shape[0])
+
+    @classmethod
+    def train(
+        cls,
+        messages: Sequence[str],
+        labels: Sequence[str],
+        *,
+        dimensions: int = DEFAULT_DIMENSIONS,
+        epochs: int = 40,
+        learning_rate: float = 20.0,
+        l2: float = 1e-5,
+        batch_size: int = 256,
+        seed: int = 0,
+    ) -> IntentModel:
+        if not messages or len(messages) != len(labels):
+            raise ValueError("Training needs the same non-zero number of messages and labels")
+        label_names = sorted(set(labels))
+        targets = np.array([label_names.index(label) for label in labels])
+        rng = np.random.default_rng(seed)
+        weights = np.zeros((dimensions, len(label_names)), dtype=np.float32)
+        bias = np.zeros(len(label_names), dtype=np.float32)
+        for _ in range(epochs):
+            order = rng.permutation(len(messages))
+            for start in range(0, len(order), batch_size):
+                batch = order[start : start + batch_size]
+                features = _dense([messages[i] for i in batch], dimensions)
+                probs = _softmax(features @ weights + bias)
+                probs[np.arange(len(batch)), targets[batch]] -= 1.0
+                probs /= len(batch)
+                weights -= learning_rate * (features.T @ probs + l2 * weights)
+                bias -= learning_rate * probs.sum(axis=0)
+        return cls(label_names, weights, bias)
+
+    def predict(self, message: str) -> tuple[str, float]:
+        """Return the most likely action and its probability."""
+        indices, values = featurize(message, self.dimensions)
+        probs = _softmax(values @ self.weights[indices] + self.bias)
+        best = int(probs.argmax())
+        return self.labels[best], float(probs[best])
+
+    def predict_command(
+        self, message: str, threshold: float = DEFAULT_THRESHOLD
+    ) -> dict[str, Any] | None:
+        """Return a command dict when confident and all arguments are present."""
+        action, confidence = self.predict(message)
+        if confidence < threshold or action in DEFERRED_ACTIONS:
+            return None
+        return build_command(action, message)
+
+    def save(self, path: str | Path) -> None:
+        with open(path, "wb") as handle:
+            np.savez(handle, labels=np.array(self.labels), weights=self.weights, bias=self.bias)
+
+    @classmethod
+    def load(cls, path: str | Path) -> IntentModel:
+        with np.load(path) as data:
+            return cls([str(label) for label in data["labels"]], data["weights"], data["bias"])
+
+
+def build_command(action: str, message: str) -> dict[str, Any] | None:
+    """Fill in the arguments the model can read off the text, or None to defer to the AI."""
+    if action in {"get_messages", "summarize"} and _FILTER_WORDS.search(message):
+        return None
+    if action == "get_attachments" and _FILE_WORDS.search(message):
+        return None
+    command: dict[str, Any] = {"action": action}
+    if action in MESSAGE_ID_ACTIONS:
+        match = _MESSAGE_ID.search(message)
+        if not match:
+            return None
+        command["message_id"] = match.group(0)
+    elif action in {"get_messages", "summarize"}:
+        match = _NUMBER.search(message)
+        if match:
+            command["max_results"] = int(match.group(1))
+    return command
+
+
+def load_corpus(path: str | Path) -> list[tuple[str, str]]:
+    """Read (message, action) pairs from a recorded JSONL corpus."""
+    examples: list[tuple[str, str]] = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            action = (record.get("command") or {}).get("action")
+            if record.get("message") and action:
+                examples.append((str(record["message"]), str(action)))
+    return examples
+
+
+def record_example(path: str | Path, message: str, command: dict[str, Any]) -> None:
+    """Append one parsed message to the corpus, dropping free-text replies."""
+    kept = {key: value for key, value in command.items() if key != "reply"}
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write(json.dumps({"message": message, "command": kept}) + "\n")
+
+
+def evaluate(
+    model: IntentModel,
+    examples: Sequence[tuple[str, str]],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> dict[str, float]:
+    """Report accuracy, confident coverage/precision and per-call latency.
+
+    Coverage counts the messages ``predict_command`` answers without the AI,
+    so it excludes those ``build_command`` defers as well as low-confidence ones.
+    """
+    correct = answered = answered_correct = 0
+    latencies: list[float] = []
+    for message, action in examples:
+        started = time.perf_counter()
+        predicted, confidence = model.predict(message)
+        latencies.append(time.perf_counter() - started)
+        correct += predicted == action
+        if (
+            confidence >= threshold
+            and predicted not in DEFERRED_ACTIONS
+            and build_command(predicted, message) is not None
+        ):
+            answered += 1
+            answered_correct += predicted == action
+    latencies.sort()
+    total = max(1, len(examples))
+    return {
+        "examples": len(examples),
+        "accuracy": correct / total,
+        "coverage": answered / total,
+        "confident_precision": answered_correct / answered if answered else 0.0,
+        "latency_p50_us": latencies[len(latencies) // 2] * 1e6 if latencies else 0.0,
+        "latency_p99_us": latencies[int(len(latencies) * 0.99)] * 1e6 if latencies else 0.0,
+    }
+
+
+def _split(
+    examples: list[tuple[str, str]], holdout: float, seed: int
+) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    shuffled = list(examples)
+    random.Random(seed).shuffle(shuffled)
+    cut = int(len(shuffled) * (1 - holdout))
+    return shuffled[:cut], shuffled[cut:]
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m smart_chat_bot.intent_model")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="train a model from a JSONL corpus")
+    train_parser.add_argument("corpus")
+    train_parser.add_argument("--out", required=True)
+    train_parser.add_argument("--dimensions", type=int, default=DEFAULT_DIMENSIONS)
+    train_parser.add_argument("--epochs", type=int, default=40)
+    train_parser.add_argument("--holdout", type=float, default=0.2)
+    train_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    train_parser.add_argument("--seed", type=int, default=0)
+
+    eval_parser = commands.add_parser("evaluate", help="report accuracy and latency")
+    eval_parser.add_argument("model")
+    eval_parser.add_argument("corpus")
+    eval_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args(argv)
+    examples = load_corpus(args.corpus)
+    if args.command == "train":
+        train, test = _split(examples, args.holdout, args.seed)
+        started = time.perf_counter()
+        model = IntentModel.train(
+            [message for message, _ in train],
+            [action for _, action in train],
+            dimensions=args.dimensions,
+            epochs=args.epochs,
+            seed=args.seed,
+        )
+        report: dict[str, Any] = {
+            "train_examples": len(train),
+            "train_seconds": round(time.perf_counter() - started, 3),
+            "labels": model.labels,
+        }
+        if test:
+            report["holdout"] = evaluate(model, test, args.threshold)
+        model.save(args.out)
+    else:
+        report = evaluate(IntentModel.load(args.model), examples, args.threshold)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Per-user conversation memory, so follow-ups resolve in a single AI call.
+
+Each user has a ring buffer of recent turns and the ids of the messages
+the bot last listed for them. Turns are passed to the AI as ``history``,
+and ``resolve_reference`` maps "2" or "#2" to the second listed id
+without asking the AI at all.
+
+- A user's turns are trimmed to ``budget_tokens``, oldest first, and
+  always start with a user turn.
+- Users idle for ``idle_seconds`` are dropped. Once the estimated size of
+  all conversations passes ``max_bytes``, the least recently active users
+  are dropped first.
+- With ``db_path`` set, conversations are written through to SQLite and
+  reloaded on a user's next message after a restart or eviction.
+
+    store = ConversationStore(MemoryConfig(), db_path="conversations.sqlite")
+    history = store.history(user_id)
+    store.record(user_id, "get 2 mail", "1. ...", message_ids=["m1", "m2"])
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import ai_client_api
+from telemetry import metrics
+
+from .summarize import estimate_tokens, truncate
+
+__all__ = ["ConversationStore", "MemoryConfig", "resolve_reference"]
+
+_USERS = metrics.gauge("conversation_memory_users", "Users with conversation memory loaded.")
+_BYTES = metrics.gauge("conversation_memory_bytes", "Estimated size of loaded conversation memory.")
+
+# Rough cost of the containers around each conversation and turn, for the size cap.
+_CONVERSATION_OVERHEAD = 512
+_TURN_OVERHEAD = 128
+_REFERENCE = re.compile(r"#?(\d{1,2})")
+
+
+@dataclass
+class MemoryConfig:
+    max_turns: int = 12
+    budget_tokens: int = 1500
+    # Longer turns, such as message listings, are cut before they are stored.
+    max_turn_chars: int = 1200
+    max_message_ids: int = 50
+    idle_seconds: float = 30 * 60.0
+    max_bytes: int = 32 * 1024 * 1024
+
+
+@dataclass
+class _Conversation:
+    turns: deque[ai_client_api.Turn]
+    message_ids: list[str] = field(default_factory=list)
+    last_active: float = 0.0
+    size: int = 0
+
+
+def resolve_reference(reference: str, message_ids: Sequence[str]) -> str:
+    """Map a 1-based position such as "2" or "#2" to a listed message id; else return it unchanged."""
+    match = _REFERENCE.fullmatch(reference.strip())
+    if match is None:
+        return reference
+    index = int(match.group(1)) - 1
+    return message_ids[index] if 0 <= index < len(message_ids) else reference
+
+
+class ConversationStore:
+    """Thread-safe, size-capped conversation memory keyed by user id."""
+
+    def __init__(
+        self,
+        config: MemoryConfig | None = None,
+        *,
+        db_path: str | Path | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.config = config or MemoryConfig()
+        self._clock = clock
+        self._conversations: OrderedDict[str, _Conversation] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db_path = Path(db_path) if db_path else None
+        if self._db_path is not None:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._ensure_schema()
+
+    @property
+    def persistent(self) -> bool:
+        return self._db_path is not None
+
+    @property
+    def bytes_used(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def history(self, user_id: str) -> list[ai_client_api.Turn]:
+        """Earlier turns for ``user_id``, oldest first, within the token budget."""
+        with self._lock:
+            conversation = self._get_locked(user_id)
+            return list(conversation.turns) if conversation else []
+
+    def message_ids(self, user_id: str) -> list[str]:
+        """Ids of the messages last listed for ``user_id``, in the order shown."""
+        with self._lock:
+            conversation = self._get_locked(user_id)
+            return list(conversation.message_ids) if conversation else []
+
+    def record(
+        self,
+        user_id: str,
+        user_text: str,
+        reply_text: str,
+        *,
+        message_ids: Sequence[str] | None = None,
+    ) -> None:
+        """Append one exchange; ``message_ids`` replaces the listed ids when given."""
+        config = self.config
+        now = self._clock()
+        with self._lock:
+            conversation = self._get_locked(user_id) or _Conversation(deque(maxlen=config.max_turns))
+            self._bytes -= conversation.size
+            conversation.turns.append(ai_client_api.Turn("user", truncate(user_text, config.max_turn_chars)))
+            if reply_text.strip():
+                conversation.turns.append(
+                    ai_client_api.Turn("assistant", truncate(reply_text, config.max_turn_chars))
+                )
+            _trim(conversation.turns, config.budget_tokens)
+            if message_ids is not None:
+                conversation.message_ids = list(message_ids)[: config.max_message_ids]
+            conversation.last_active = now
+            conversation.size = _size(conversation)
+            self._bytes += conversation.size
+            self._conversations[user_id] = conversation
+            self._conversations.move_to_end(user_id)
+            self._evict_locked(now)
+            row = _to_row(conversation)
+        if self._db_path is not None:
+            self._save(user_id, row, now)
+
+    def forget(self, user_id: str) -> None:
+        with self._lock:
+            conversation = self._conversations.pop(user_id, None)
+            if conversation is not None:
+                self._bytes -= conversation.size
+            self._update_gauges()
+        if self._db_path is not None:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
+                conn.commit()
+
+    def evict_idle(self) -> int:
+        """Drop idle users from memory; return how many were dropped."""
+        with self._lock:
+            return self._evict_locked(self._clock())
+
+    def _get_locked(self, user_id: str) -> _Conversation | None:
+        cutoff = self._clock() - self.config.idle_seconds
+        conversation = self._conversations.get(user_id)
+        if conversation is not None and conversation.last_active < cutoff:
+            del self._conversations[user_id]
+            self._bytes -= conversation.size
+            conversation = None
+        if conversation is None and self._db_path is not None:
+            # Loaded users join at the back; the next record() enforces the caps.
+            conversation = self._load(user_id, cutoff)
+            if conversation is not None:
+                self._conversations[user_id] = conversation
+                self._bytes += conversation.size
+        self._update_gauges()
+        return conversation
+
+    def _evict_locked(self, now: float) -> int:
+        # Ordered by last activity, so idle and least recent users are at the front.
+        cutoff = now - self.config.idle_seconds
+        evicted = 0
+        while self._conversations:
+            user_id, conversation = next(iter(self._conversations.items()))
+            if conversation.last_active >= cutoff and self._bytes <= self.config.max_bytes:
+                break
+            del self._conversations[user_id]
+            self._bytes -= conversation.size
+            evicted += 1
+        self._update_gauges()
+        return evicted
+
+    def _update_gauges(self) -> None:
+        _USERS.set(len(self._conversations))
+        _BYTES.set(self._bytes)
+
+    def _connect(self) -> sqlite3.Connection:
+        assert self._db_path is not None
+        return sqlite3.connect(self._db_path)
+
+    def _ensure_schema(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conversations (
+                    user_id TEXT PRIMARY KEY,
+                    turns_json TEXT NOT NULL,
+                    message_ids_json TEXT NOT NULL,
+                    last_active REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS conversations_last_active ON conversations (last_active)"
+            )
+            conn.commit()
+
+    def _load(self, user_id: str, cutoff: float) -> _Conversation | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT turns_json, message_ids_json, last_active FROM conversations"
+                " WHERE user_id = ? AND last_active >= ?",
+                (user_id, cutoff),
+            ).fetchone()
+        if not row:
+            return None
+        turns: deque[ai_client_api.Turn] = deque(
+            (ai_client_api.Turn(role, content) for role, content in json.loads(row[0])),
+            maxlen=self.config.max_turns,
+        )
+        _trim(turns, self.config.budget_tokens)
+        conversation = _Conversation(turns, json.loads(row[1])[: self.config.max_message_ids], row[2])
+        conversation.size = _size(conversation)
+        return conversation
+
+    def _save(self, user_id: str, row: tuple[str, str, float], now: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO conversations (user_id, turns_json, message_ids_json, last_active)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    turns_json = excluded.turns_json,
+                    message_ids_json = excluded.message_ids_json,
+                    last_active = excluded.last_active
+                """,
+                (user_id, *row),
+            )
+            conn.execute(
+                "DELETE FROM conversations WHERE last_active < ?", (now - self.config.idle_seconds,)
+            )
+            conn.commit()
+
+
+def _trim(turns: deque[ai_client_api.Turn], budget_tokens: int) -> None:
+    used = sum(estimate_tokens(turn.content) for turn in turns)
+    while turns and (used > budget_tokens or turns[0].role != "user"):
+        used -= estimate_tokens(turns.popleft().content)
+
+
+def _size(conversation: _Conversation) -> int:
+    return (
+        _CONVERSATION_OVERHEAD
+        + sum(_TURN_OVERHEAD + len(turn.content) for turn in conversation.turns)
+        + sum(_TURN_OVERHEAD + len(message_id) for message_id in conversation.message_ids)
+    )
+
+
+def _to_row(conversation: _Conversation) -> tuple[str, str, float]:
+    turns = [[turn.role, turn.content] for turn in conversation.turns]
+    return json.dumps(turns), json.dumps(conversation.message_ids), conversation.last_active
@@ -0,0 +1,274 @@
+"""Map-reduce inbox digests under a per-call token budget.
+
+Bodies are cleaned and truncated, then packed several to a call so each
+AI request stays under ``budget_tokens`` (map). The per-message summaries
+are merged into one digest, in rounds if they do not fit one call (reduce).
+Per-message summaries are cached by user and message id, so a repeat
+digest only fetches and pays for mail that arrived since the last one.
+
+    summarizer = Summarizer(ai_client, SummaryCache(), user_id)
+    digest = await summarizer.summarize(message_ids, fetch_full_messages)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import html
+import logging
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import ai_client_api
+import mail_client_api
+
+from telemetry import metrics
+
+from . import deadline
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "SummaryCache",
+    "Summarizer",
+    "clean_body",
+    "estimate_tokens",
+    "pack",
+    "truncate",
+]
+
+_CACHE_LOOKUPS = metrics.counter("summary_cache_lookups_total", "Summary cache lookups by result.", ["result"])
+_CACHE_ENTRIES = metrics.gauge("summary_cache_entries", "Per-message summaries cached.")
+
+Fetch = Callable[[list[str]], Awaitable[list[mail_client_api.Message]]]
+
+DEFAULT_BUDGET_TOKENS = 6000
+DEFAULT_BODY_CHARS = 2000
+# Roughly four characters per token for English prose; only used for packing.
+CHARS_PER_TOKEN = 4
+
+_TAG = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_QUOTE_HEADER = re.compile(r"^On .+ wrote:\s*$", re.MULTILINE)
+_URL = re.compile(r"https?://\S+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_SPACES = re.compile(r"[ \t\r\f\v\xa0]+")
+
+_MAP_SYSTEM_PROMPT = (
+    "You summarize emails. For each email give its id and one or two sentences "
+    "on what it is about and anything the reader must act on. Do not invent details."
+)
+_MAP_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "summaries": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "string"}, "summary": {"type": "string"}},
+                "required": ["id", "summary"],
+            },
+        },
+    },
+    "required": ["summaries"],
+}
+_REDUCE_SYSTEM_PROMPT = (
+    "Merge these email summaries into a short digest for a Discord DM. "
+    "Lead with what needs action or is time-sensitive, group the rest, "
+    "and skip newsletters and notifications unless they matter."
+)
+
+
+def clean_body(text: str) -> str:
+    """Strip markup, quoted replies and links, and collapse whitespace."""
+    text = html.unescape(_TAG.sub(" ", text))
+    quote = _QUOTE_HEADER.search(text)
+    if quote:
+        text = text[: quote.start()]
+    lines = [
+        _SPACES.sub(" ", line).strip()
+        for line in text.splitlines()
+        if not line.lstrip().startswith(">")
+    ]
+    text = _URL.sub("[link]", "\n".join(lines))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """Cut at the last word boundary before ``max_chars``."""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[: cut if cut > 0 else max_chars].rstrip() + " …"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack(entries: Sequence[str], budget_tokens: int) -> list[list[str]]:
+    """Group entries in order so each group's estimated size fits the budget.
+
+    An entry larger than the budget gets a group of its own.
+    """
+    groups: list[list[str]] = []
+    current: list[str] = []
+    used = 0
+    for entry in entries:
+        tokens = estimate_tokens(entry)
+        if current and used + tokens > budget_tokens:
+            groups.append(current)
+            current = []
+            used = 0
+        current.append(entry)
+        used += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+class SummaryCache:
+    """Thread-safe LRU of per-message summary lines keyed by user and message id.
+
+    Message ids are only unique within a mailbox, so one user's summaries
+    are never served to another.
+    """
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, message_id: str) -> str | None:
+        key = (user_id, message_id)
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is None:
+                self.misses += 1
+                _CACHE_LOOKUPS.labels(result="miss").inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            _CACHE_LOOKUPS.labels(result="hit").inc()
+            return summary
+
+    def put(self, user_id: str, message_id: str, summary: str) -> None:
+        key = (user_id, message_id)
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            _CACHE_ENTRIES.set(len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@dataclass
+class Summarizer:
+    ai_client: ai_client_api.AIClient
+    cache: SummaryCache
+    # Whose mailbox the messages come from; scopes the cache.
+    user_id: str
+    budget_tokens: int = DEFAULT_BUDGET_TOKENS
+    body_chars: int = DEFAULT_BODY_CHARS
+    # Seconds of the message deadline kept back for posting the digest.
+    reserve: float = 0.0
+
+    async def summarize(self, message_ids: Sequence[str], fetch: Fetch) -> str:
+        """Digest ``message_ids`` in order; ``fetch`` loads full messages for cache misses."""
+        lines: dict[str, str] = {}
+        missing = []
+        for message_id in message_ids:
+            line = self.cache.get(self.user_id, message_id)
+            if line is None:
+                missing.append(message_id)
+            else:
+                lines[message_id] = line
+        if missing:
+            lines.update(await self._map(await fetch(missing)))
+        return await self._reduce([lines[message_id] for message_id in message_ids if message_id in lines])
+
+    async def _map(self, messages: Sequence[mail_client_api.Message]) -> dict[str, str]:
+        by_id = {message.id: message for message in messages}
+        groups = pack([self._entry(message) for message in messages], self.budget_tokens)
+        # Each group caches its own lines, so one failed call does not discard the rest.
+        results = await asyncio.gather(
+            *(self._map_group(group, by_id) for group in groups), return_exceptions=True
+        )
+        failures = [result for result in results if isinstance(result, BaseException)]
+        if len(failures) == len(results):
+            raise failures[0]
+        if failures:
+            logger.warning("%d of %d summary calls failed: %r", len(failures), len(results), failures[0])
+        return {
+            message_id: line
+            for result in results
+            if not isinstance(result, BaseException)
+            for message_id, line in result.items()
+        }
+
+    async def _map_group(
+        self, entries: list[str], by_id: dict[str, mail_client_api.Message]
+    ) -> dict[str, str]:
+        summaries = await self._summarize_group(entries)
+        lines: dict[str, str] = {}
+        for message_id, summary in summaries.items():
+            message = by_id.get(message_id)
+            if message is not None:
+                lines[message_id] = f"- {_header(message)}: {summary}"
+                self.cache.put(self.user_id, message_id, lines[message_id])
+        return lines
+
+    async def _summarize_group(self, entries: list[str]) -> dict[str, str]:
+        result = await self.ai_client.generate_response_async(
+            "\n\n".join(entries),
+            system_prompt=_MAP_SYSTEM_PROMPT,
+            response_schema=_MAP_SCHEMA,
+            timeout=deadline.remaining_timeout(self.reserve),
+            cache_prompt=True,
+            profile=ai_client_api.SUMMARIZE,
+        )
+        if not isinstance(result, dict):
+            return {}
+        return {
+            str(item["id"]): str(item["summary"]).strip()
+            for item in result.get("summaries") or []
+            if isinstance(item, dict) and item.get("id") and item.get("summary")
+        }
+
+    async def _reduce(self, lines: list[str]) -> str:
+        if not lines:
+            return "No messages to summarize."
+        while True:
+            groups = pack(lines, self.budget_tokens)
+            if len(groups) == len(lines) > 1:
+                # Every line is over budget on its own; merge them in one call rather than loop.
+                groups = [lines]
+            digests = await asyncio.gather(*(self._reduce_group(group) for group in groups))
+            if len(digests) == 1:
+                return digests[0]
+            lines = list(digests)
+
+    async def _reduce_group(self, lines: list[str]) -> str:
+        result = await self.ai_client.generate_response_async(
+            "\n".join(lines),
+            system_prompt=_REDUCE_SYSTEM_PROMPT,
+            timeout=deadline.remaining_timeout(self.reserve),
+            cache_prompt=True,
+            profile=ai_client_api.SUMMARIZE,
+        )
+        return str(result).strip()
+
+    def _entry(self, message: mail_client_api.Message) -> str:
+        body = truncate(clean_body(message.body or message.snippet), self.body_chars)
+        return f"id: {message.id}\n{_header(message)}\n{body}"
+
+
+def _header(message: mail_client_api.Message) -> str:
+    return f"{html.unescape(message.from_).strip()} — {html.unescape(message.subject).strip()}"
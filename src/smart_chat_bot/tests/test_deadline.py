@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+from smart_chat_bot import deadline
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_remaining_holds_back_reserve() -> None:
+    clock = _Clock()
+    with deadline.deadline_scope(10.0, clock=clock) as budget:
+        clock.now += 4.0
+        assert budget.remaining() == pytest.approx(6.0)
+        assert deadline.remaining_timeout(reserve=2.0) == pytest.approx(4.0)
+        clock.now += 7.0
+        assert budget.expired
+        assert budget.remaining() == 0.0
+    assert deadline.remaining_timeout() is None
+
+
+def test_inner_scope_cannot_extend_outer_deadline() -> None:
+    with deadline.deadline_scope(1.0) as outer:
+        with deadline.deadline_scope(60.0) as inner:
+            assert inner is outer
+        with deadline.deadline_scope(0.5) as tighter:
+            assert tighter is not outer
+            assert deadline.current_deadline() is tighter
+        assert deadline.current_deadline() is outer
+
+
+@pytest.mark.asyncio
+async def test_run_blocking_times_out_and_skips_spent_budget() -> None:
+    calls: list[str] = []
+
+    def _slow() -> str:
+        calls.append("slow")
+        time.sleep(0.2)
+        return "done"
+
+    with deadline.deadline_scope(0.05):
+        with pytest.raises(TimeoutError):
+            await deadline.run_blocking(_slow)
+        with pytest.raises(TimeoutError):
+            await deadline.run_blocking(_slow)
+    assert calls == ["slow"]
+    assert await deadline.run_blocking(_slow) == "done"
@@ -0,0 +1,111 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from smart_chat_bot import intent_model
+from smart_chat_bot.intent_model import IntentModel
+
+_CORPUS = [
+    ("show me my last 3 emails", "get_messages"),
+    ("what are my newest 5 mails", "get_messages"),
+    ("check my inbox", "get_messages"),
+    ("list recent messages", "get_messages"),
+    ("log me in", "login"),
+    ("connect my gmail", "login"),
+    ("sign in to gmail", "login"),
+    ("log me out", "logout"),
+    ("disconnect my gmail", "logout"),
+    ("sign out of gmail", "logout"),
+    ("delete email 18c2a9f0aa12", "delete_message"),
+    ("trash message 18c2a9f0bb34", "delete_message"),
+    ("remove mail 18c2a9f0cc56", "delete_message"),
+    ("hi there", "reply"),
+    ("thanks a lot", "reply"),
+    ("how are you", "reply"),
+]
+
+
+@pytest.fixture(scope="module")
+def model() -> IntentModel:
+    messages = [message for message, _ in _CORPUS] * 4
+    labels = [label for _, label in _CORPUS] * 4
+    return IntentModel.train(messages, labels, dimensions=2**10, epochs=60)
+
+
+def test_predict_paraphrase(model: IntentModel) -> None:
+    assert model.predict("show my last 10 emails")[0] == "get_messages"
+    assert model.predict("please log me out")[0] == "logout"
+
+
+def test_predict_command_extracts_arguments(model: IntentModel) -> None:
+    assert model.predict_command("delete email 18c2a9f0ffff", threshold=0.5) == {
+        "action": "delete_message",
+        "message_id": "18c2a9f0ffff",
+    }
+    assert model.predict_command("show me my last 7 emails", threshold=0.5) == {
+        "action": "get_messages",
+        "max_results": 7,
+    }
+
+
+def test_predict_command_defers_chit_chat_and_missing_ids(model: IntentModel) -> None:
+    assert model.predict_command("thanks a lot", threshold=0.0) is None
+    assert intent_model.build_command("delete_message", "delete that one") is None
+
+
+def test_build_command_defers_filters_to_the_ai() -> None:
+    assert intent_model.build_command("get_messages", "show unread mail from Alice") is None
+    assert intent_model.build_command("summarize", "summarize this week's mail") is None
+    assert intent_model.build_command("get_messages", "emails since 2026-10-01") is None
+    assert intent_model.build_command("get_attachments", "send the pdf from 18c2a9f0aa12") is None
+    assert intent_model.build_command("get_messages", "show my last 5 emails") == {
+        "action": "get_messages",
+        "max_results": 5,
+    }
+    assert intent_model.build_command("get_attachments", "attachments from 18c2a9f0aa12") == {
+        "action": "get_attachments",
+        "message_id": "18c2a9f0aa12",
+    }
+
+
+def test_evaluate_coverage_excludes_deferred_commands(model: IntentModel) -> None:
+    examples = [("show me my last 3 emails", "get_messages"), ("show me my last 3 emails from Alice", "get_messages")]
+    assert model.predict(examples[1][0])[0] == "get_messages"
+    report = intent_model.evaluate(model, examples, threshold=0.0)
+    assert report["accuracy"] == 1.0
+    assert report["coverage"] == 0.5
+
+
+def test_save_load_roundtrip(model: IntentModel, tmp_path: Path) -> None:
+    path = tmp_path / "model.npz"
+    model.save(path)
+    loaded = IntentModel.load(path)
+    assert loaded.labels == model.labels
+    assert loaded.predict("connect my gmail") == model.predict("connect my gmail")
+
+
+def test_record_and_load_corpus(tmp_path: Path) -> None:
+    path = tmp_path / "corpus.jsonl"
+    intent_model.record_example(path, "hello", {"action": "reply", "reply": "Hi!"})
+    intent_model.record_example(path, "log me in", {"action": "login"})
+    assert json.loads(path.read_text().splitlines()[0])["command"] == {"action": "reply"}
+    assert intent_model.load_corpus(path) == [("hello", "reply"), ("log me in", "login")]
+
+
+def test_cli_train_and_evaluate(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text(
+        "".join(
+            json.dumps({"message": message, "command": {"action": label}}) + "\n"
+            for message, label in _CORPUS * 3
+        )
+    )
+    model_path = tmp_path / "model.npz"
+    intent_model.main(["train", str(corpus), "--out", str(model_path), "--dimensions", "1024"])
+    capsys.readouterr()
+    intent_model.main(["evaluate", str(model_path), str(corpus)])
+    report = json.loads(capsys.readouterr().out)
+    assert report["examples"] == len(_CORPUS) * 3
+    assert report["accuracy"] > 0.9
+    assert report["latency_p50_us"] > 0
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import ai_client_api
+from smart_chat_bot import memory
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_history_is_trimmed_to_budget_and_starts_with_user() -> None:
+    store = memory.ConversationStore(memory.MemoryConfig(budget_tokens=30, max_turn_chars=80))
+    store.record("u", "first " * 5, "reply " * 5)
+    store.record("u", "second", "long " * 40)
+
+    history = store.history("u")
+    # The oldest exchange no longer fits, and the long reply was cut to max_turn_chars.
+    assert [turn.role for turn in history] == ["user", "assistant"]
+    assert history[0] == ai_client_api.Turn("user", "second")
+    assert len(history[1].content) < 100 and history[1].content.endswith("…")
+    assert store.history("someone else") == []
+
+
+def test_resolve_reference_maps_positions_to_listed_ids() -> None:
+    store = memory.ConversationStore()
+    store.record("u", "get 3 mail", "…", message_ids=["a", "b", "c"])
+    store.record("u", "thanks", "You're welcome.")
+
+    ids = store.message_ids("u")
+    assert ids == ["a", "b", "c"]
+    assert memory.resolve_reference("2", ids) == "b"
+    assert memory.resolve_reference(" #3 ", ids) == "c"
+    assert memory.resolve_reference("4", ids) == "4"
+    assert memory.resolve_reference("18c2f0a9", ids) == "18c2f0a9"
+
+
+def test_idle_users_and_overflow_are_evicted() -> None:
+    clock = _Clock()
+    store = memory.ConversationStore(memory.MemoryConfig(idle_seconds=60.0), clock=clock)
+    store.record("old", "hi", "hello")
+    clock.now += 30
+    store.record("recent", "hi", "hello")
+    clock.now += 45
+
+    assert store.evict_idle() == 1
+    assert store.history("old") == []
+    assert len(store) == 1
+
+    one_user = store.bytes_used
+    small = memory.ConversationStore(memory.MemoryConfig(max_bytes=2 * one_user), clock=clock)
+    for user_id in ("a", "b", "c"):
+        small.record(user_id, "hi", "hello")
+    assert len(small) == 2
+    assert small.history("a") == []
+    assert small.bytes_used <= 2 * one_user
+
+
+def test_sqlite_persistence_survives_restart_until_idle(tmp_path: Path) -> None:
+    clock = _Clock()
+    db_path = tmp_path / "memory.sqlite"
+    config = memory.MemoryConfig(idle_seconds=60.0)
+    store = memory.ConversationStore(config, db_path=db_path, clock=clock)
+    store.record("u", "get 2 mail", "listing", message_ids=["a", "b"])
+    store.record("gone", "hi", "hello")
+    store.forget("gone")
+
+    restarted = memory.ConversationStore(config, db_path=db_path, clock=clock)
+    assert restarted.message_ids("u") == ["a", "b"]
+    assert [turn.content for turn in restarted.history("u")] == ["get 2 mail", "listing"]
+    assert restarted.history("gone") == []
+
+    clock.now += 61
+    assert memory.ConversationStore(config, db_path=db_path, clock=clock).history("u") == []
@@ -0,0 +1,221 @@
+import asyncio
+import random
+import threading
+import time
+
+import pytest
+
+from smart_chat_bot import notifier
+
+
+class _QuotaError(Exception):
+    def __init__(self, status_code: int, reason: str) -> None:
+        super().__init__(f"<HttpError {status_code}: {reason}>")
+        self.status_code = status_code
+
+
+class _Message:
+    def __init__(self, message_id: str) -> None:
+        self.id = message_id
+        self.from_ = "alice@example.com"
+        self.subject = f"Subject {message_id}"
+
+
+class _Mailbox:
+    """Fake mail client for one user; ``arrivals`` is consumed one committed poll at a time."""
+
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, arrivals: list[list[str] | Exception] | None = None) -> None:
+        self.arrivals = list(arrivals or [])
+        self.polls: list[float] = []
+
+    def fetch_new_message_ids(self) -> tuple[list[str], str]:
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            time.sleep(0.002)
+            self.polls.append(time.monotonic())
+            if not self.arrivals:
+                return [], "same"
+            result = self.arrivals[0]
+            if isinstance(result, Exception):
+                self.arrivals.pop(0)
+                raise result
+            return result, "next"
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def commit_poll_cursor(self, cursor: str) -> None:
+        if cursor == "next":
+            self.arrivals.pop(0)
+
+    def get_messages_by_id(self, message_ids: list[str], *, format: str = "full") -> list[_Message]:
+        assert format == "metadata"
+        return [_Message(message_id) for message_id in message_ids]
+
+
+def _config(**overrides: float) -> notifier.NotifierConfig:
+    values = {
+        "min_interval": 0.02,
+        "max_interval": 0.2,
+        "backoff": 2.0,
+        "jitter": 0.0,
+        "polls_per_second": 1000.0,
+        "quota_pause": 0.2,
+        "refresh_users_every": 0.05,
+        **overrides,
+    }
+    return notifier.NotifierConfig(**values)  # type: ignore[arg-type]
+
+
+async def _run_for(scheduler: notifier.NotificationScheduler, seconds: float) -> None:
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(seconds)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+def _scheduler(
+    mailboxes: dict[str, _Mailbox], sent: list[tuple[str, str]], config: notifier.NotifierConfig
+) -> notifier.NotificationScheduler:
+    async def _notify(user_id: str, text: str) -> None:
+        sent.append((user_id, text))
+
+    return notifier.NotificationScheduler(
+        list_user_ids=lambda: list(mailboxes),
+        get_mail_client=lambda user_id: mailboxes[user_id],  # type: ignore[arg-type, return-value]
+        notify=_notify,
+        config=config,
+        rng=random.Random(0),
+    )
+
+
+def test_format_notification_lists_newest_and_remainder() -> None:
+    text = notifier.format_notification(5, [_Message("m5"), _Message("m4")])  # type: ignore[list-item]
+    assert text.splitlines() == [
+        "You have 5 new emails:",
+        "- alice@example.com — Subject m5",
+        "- alice@example.com — Subject m4",
+        "…and 3 more.",
+    ]
+
+
+def test_is_quota_error_separates_user_and_project_limits() -> None:
+    assert notifier.is_quota_error(_QuotaError(429, "rateLimitExceeded")) == "global"
+    assert notifier.is_quota_error(_QuotaError(403, "userRateLimitExceeded")) == "user"
+    assert notifier.is_quota_error(_QuotaError(500, "backendError")) is None
+
+
+@pytest.mark.asyncio
+async def test_quiet_mailboxes_back_off_and_new_mail_resets() -> None:
+    busy = _Mailbox([["a1"], ["a2", "a3"], ["a4"], ["a5"], ["a6"], ["a7"]])
+    quiet = _Mailbox()
+    sent: list[tuple[str, str]] = []
+    scheduler = _scheduler({"busy": busy, "quiet": quiet}, sent, _config())
+
+    await _run_for(scheduler, 0.4)
+
+    assert len(busy.polls) > len(quiet.polls) >= 3
+    quiet_gaps = [later - earlier for earlier, later in zip(quiet.polls, quiet.polls[1:])]
+    assert quiet_gaps[-1] > 2 * quiet_gaps[0]
+    assert sent[1] == (
+        "busy",
+        "You have 2 new emails:\n- alice@example.com — Subject a3\n- alice@example.com — Subject a2",
+    )
+    assert {user for user, _ in sent} == {"busy"}
+
+
+@pytest.mark.asyncio
+async def test_failed_notification_is_retried_on_the_next_poll() -> None:
+    mailbox = _Mailbox([["a1"]])
+    sent: list[tuple[str, str]] = []
+
+    async def _notify(user_id: str, text: str) -> None:
+        if not sent:
+            sent.append(("failed", text))
+            raise ConnectionError("Discord unavailable")
+        sent.append((user_id, text))
+
+    scheduler = notifier.NotificationScheduler(
+        list_user_ids=lambda: ["u"],
+        get_mail_client=lambda _user_id: mailbox,  # type: ignore[arg-type, return-value]
+        notify=_notify,
+        config=_config(),
+        rng=random.Random(0),
+    )
+
+    await _run_for(scheduler, 0.2)
+
+    assert [user for user, _ in sent] == ["failed", "u"]
+    assert sent[0][1] == sent[1][1]
+
+
+@pytest.mark.asyncio
+async def test_polls_are_bounded_and_spread_out() -> None:
+    _Mailbox.peak = 0
+    mailboxes = {f"user{index}": _Mailbox() for index in range(200)}
+    scheduler = _scheduler(mailboxes, [], _config(min_interval=0.1, concurrency=4, polls_per_second=2000.0))
+
+    await _run_for(scheduler, 0.2)
+
+    first_polls = sorted(mailbox.polls[0] for mailbox in mailboxes.values() if mailbox.polls)
+    assert len(first_polls) > 100
+    assert _Mailbox.peak <= 4
+    # Start times are spread over min_interval rather than all at once.
+    assert first_polls[-1] - first_polls[0] > 0.05
+
+
+@pytest.mark.asyncio
+async def test_clients_are_built_once_per_polled_user() -> None:
+    mailboxes = {f"user{index}": _Mailbox() for index in range(50)}
+    built: list[str] = []
+
+    def _get_mail_client(user_id: str) -> _Mailbox:
+        built.append(user_id)
+        return mailboxes[user_id]
+
+    async def _notify(user_id: str, text: str) -> None:
+        return None
+
+    scheduler = notifier.NotificationScheduler(
+        list_user_ids=lambda: list(mailboxes),
+        get_mail_client=_get_mail_client,  # type: ignore[arg-type]
+        notify=_notify,
+        config=_config(min_interval=0.01, max_interval=0.02),
+        rng=random.Random(0),
+    )
+
+    await _run_for(scheduler, 0.3)
+
+    assert min(len(mailbox.polls) for mailbox in mailboxes.values()) >= 2
+    assert sorted(built) == sorted(mailboxes)
+
+
+@pytest.mark.asyncio
+async def test_project_quota_pauses_everyone() -> None:
+    throttled = _Mailbox([_QuotaError(429, "rateLimitExceeded")])
+    other = _Mailbox()
+    scheduler = _scheduler({"throttled": throttled, "other": other}, [], _config(min_interval=0.01))
+
+    await _run_for(scheduler, 0.15)
+
+    quota_hit = throttled.polls[0]
+    assert all(not quota_hit + 0.01 < poll < quota_hit + 0.15 for poll in other.polls + throttled.polls)
+
+
+@pytest.mark.asyncio
+async def test_unlinked_users_are_dropped() -> None:
+    gone = _Mailbox([ValueError("No stored credentials for user")])
+    scheduler = _scheduler({"gone": gone}, [], _config(min_interval=0.01, refresh_users_every=1.0))
+
+    await _run_for(scheduler, 0.1)
+
+    assert len(gone.polls) == 1
+    assert scheduler.user_count == 0
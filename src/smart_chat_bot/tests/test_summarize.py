@@ -0,0 +1,152 @@
+from collections.abc import Sequence
+from typing import Any
+
+import pytest
+
+import ai_client_api
+import mail_client_api
+from smart_chat_bot import summarize
+
+
+class _Message(mail_client_api.Message):
+    def __init__(self, msg_id: str, body: str) -> None:
+        self._id = msg_id
+        self._body = body
+
+    id = property(lambda self: self._id)
+    from_ = property(lambda self: "alice@example.com")
+    to = property(lambda self: "me@example.com")
+    date = property(lambda self: "Mon, 1 Jan 2024")
+    subject = property(lambda self: f"Subject {self._id}")
+    snippet = property(lambda self: "")
+    body = property(lambda self: self._body)
+
+
+class _RecordingAI(ai_client_api.AIClient):
+    def __init__(self) -> None:
+        self.map_inputs: list[str] = []
+        self.reduce_inputs: list[str] = []
+
+    def generate_response(
+        self,
+        user_input: str,
+        system_prompt: str | None = None,
+        response_schema: dict[str, Any] | None = None,
+        cache_prompt: bool = False,
+        profile: str | None = None,
+        history: Sequence[ai_client_api.Turn] = (),
+    ) -> str | dict[str, Any]:
+        assert profile == ai_client_api.SUMMARIZE
+        if response_schema is not None:
+            self.map_inputs.append(user_input)
+            ids = [line.removeprefix("id: ") for line in user_input.splitlines() if line.startswith("id: ")]
+            return {"summaries": [{"id": msg_id, "summary": f"about {msg_id}"} for msg_id in ids]}
+        self.reduce_inputs.append(user_input)
+        return f"digest of {len(user_input.splitlines())}"
+
+
+def test_clean_body_drops_markup_quotes_and_links() -> None:
+    body = (
+        "<p>Hi&nbsp;team,</p><style>p {color: red}</style>\n"
+        "Review https://example.com/doc?id=1 by Friday.\n\n\n\n"
+        "On Mon, Jan 1, 2024 Bob wrote:\n> older thread"
+    )
+    assert summarize.clean_body(body) == "Hi team,\nReview [link] by Friday."
+
+
+def test_truncate_cuts_at_word_boundary() -> None:
+    assert summarize.truncate("short", 10) == "short"
+    assert summarize.truncate("one two three four", 10) == "one two …"
+
+
+def test_pack_respects_budget_and_order() -> None:
+    entries = ["a" * 40, "b" * 40, "c" * 40, "d" * 200]
+    groups = summarize.pack(entries, budget_tokens=25)
+    assert groups == [["a" * 40, "b" * 40], ["c" * 40], ["d" * 200]]
+
+
+@pytest.mark.asyncio
+async def test_summarize_packs_messages_and_reuses_cache() -> None:
+    ai = _RecordingAI()
+    cache = summarize.SummaryCache()
+    summarizer = summarize.Summarizer(ai, cache, "u", budget_tokens=100, body_chars=120)
+    mailbox = {f"m{index}": _Message(f"m{index}", "word " * 100) for index in range(6)}
+    fetched: list[list[str]] = []
+
+    async def _fetch(message_ids: list[str]) -> list[mail_client_api.Message]:
+        fetched.append(message_ids)
+        return [mailbox[message_id] for message_id in message_ids]
+
+    digest = await summarizer.summarize(["m3", "m4", "m5"], _fetch)
+    assert digest == "digest of 3"
+    assert fetched == [["m3", "m4", "m5"]]
+    # Three truncated bodies fit two to a call.
+    assert len(ai.map_inputs) == 2
+    assert ai.reduce_inputs[0].splitlines()[0] == "- alice@example.com — Subject m3: about m3"
+
+    await summarizer.summarize(["m1", "m2", "m3", "m4"], _fetch)
+    assert fetched[1] == ["m1", "m2"]
+    assert len(ai.map_inputs) == 3
+    assert [line.split(":")[-1] for line in ai.reduce_inputs[1].splitlines()] == [
+        " about m1",
+        " about m2",
+        " about m3",
+        " about m4",
+    ]
+    assert cache.hits == 2
+
+    # Message ids are per mailbox, so another user's digest never reuses these lines.
+    other = summarize.Summarizer(ai, cache, "v", budget_tokens=100, body_chars=120)
+    await other.summarize(["m3"], _fetch)
+    assert fetched[2] == ["m3"]
+    assert cache.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_group_keeps_the_others_cached() -> None:
+    class _FlakyAI(_RecordingAI):
+        failing = True
+
+        def generate_response(self, user_input: str, *args: Any, **kwargs: Any) -> str | dict[str, Any]:
+            if self.failing and "id: m2\n" in user_input:
+                raise TimeoutError("map call timed out")
+            return super().generate_response(user_input, *args, **kwargs)
+
+    ai = _FlakyAI()
+    cache = summarize.SummaryCache()
+    summarizer = summarize.Summarizer(ai, cache, "u", budget_tokens=100, body_chars=120)
+    mailbox = {f"m{index}": _Message(f"m{index}", "word " * 100) for index in range(6)}
+    fetched: list[list[str]] = []
+
+    async def _fetch(message_ids: list[str]) -> list[mail_client_api.Message]:
+        fetched.append(message_ids)
+        return [mailbox[message_id] for message_id in message_ids]
+
+    # Three groups of two; the middle one fails and the digest covers the rest.
+    assert await summarizer.summarize(list(mailbox), _fetch) == "digest of 4"
+    assert len(cache) == 4
+
+    ai.failing = False
+    assert await summarizer.summarize(list(mailbox), _fetch) == "digest of 6"
+    assert fetched[1] == ["m2", "m3"]
+
+
+@pytest.mark.asyncio
+async def test_reduce_merges_in_rounds_when_over_budget() -> None:
+    ai = _RecordingAI()
+    summarizer = summarize.Summarizer(ai, summarize.SummaryCache(), "u", budget_tokens=40)
+    lines = [f"- sender — subject {index}: " + "x" * 40 for index in range(6)]
+
+    assert await summarizer._reduce(lines) == "digest of 3"
+    assert [len(text.splitlines()) for text in ai.reduce_inputs] == [2, 2, 2, 3]
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    cache = summarize.SummaryCache(max_entries=2)
+    cache.put("u", "a", "A")
+    cache.put("u", "b", "B")
+    assert cache.get("u", "a") == "A"
+    assert cache.get("v", "a") is None
+    cache.put("u", "c", "C")
+    assert cache.get("u", "b") is None
+    assert len(cache) == 2
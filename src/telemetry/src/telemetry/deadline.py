@@ -0,0 +1,51 @@
+"""Caller deadlines for synchronous client calls.
+
+Mail and chat clients are synchronous and usually run in worker threads,
+so a caller cannot pass its remaining time through every method. It sets
+a deadline around a block of calls instead; ``asyncio.to_thread`` copies
+the context, so an implementation sees it in the worker and bounds each
+request with ``call_timeout``. The client APIs re-export both helpers.
+
+    with mail_client_api.call_deadline(2.5):
+        await asyncio.to_thread(client.delete_message, message_id)
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+__all__ = ["call_deadline", "call_timeout"]
+
+_expires_at: ContextVar[float | None] = ContextVar("telemetry_call_deadline", default=None)
+
+
+@contextmanager
+def call_deadline(seconds: float | None) -> Iterator[None]:
+    """Bound calls made in this block to ``seconds`` from now; None adds no bound."""
+    outer = _expires_at.get()
+    expires_at = outer if seconds is None else time.monotonic() + seconds
+    if outer is not None and expires_at is not None:
+        expires_at = min(outer, expires_at)
+    token = _expires_at.set(expires_at)
+    try:
+        yield
+    finally:
+        _expires_at.reset(token)
+
+
+def call_timeout(default: float | None) -> float | None:
+    """Timeout for the next request: the caller's remaining time, capped at ``default``.
+
+    Raises TimeoutError once the deadline has passed, so a call that waited
+    too long for a worker thread gives up before it reaches the network.
+    """
+    expires_at = _expires_at.get()
+    if expires_at is None:
+        return default
+    remaining = expires_at - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Caller deadline passed before the request started")
+    return remaining if default is None else min(default, remaining)
@@ -0,0 +1,95 @@
+"""Detect event-loop stalls and capture the stack that caused them.
+
+A heartbeat task sleeps for ``interval`` and records how late it woke up
+as scheduling lag. A watchdog thread checks the heartbeat; when the loop
+has not beaten for ``threshold`` seconds it grabs the loop thread's stack
+while the blocking call is still running, logs it and keeps it for
+``/debug/stalls``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Any
+
+from telemetry import metrics
+
+__all__ = ["LoopLagMonitor"]
+
+logger = logging.getLogger(__name__)
+
+_LAG_SECONDS = metrics.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop heartbeat woke up.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+_STALLS = metrics.counter("event_loop_stalls_total", "Event loop stalls over the threshold.")
+
+
+class LoopLagMonitor:
+    def __init__(self, *, interval: float = 0.1, threshold: float = 0.25, history: int = 50) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.max_lag = 0.0
+        self._stalls: collections.deque[dict[str, Any]] = collections.deque(maxlen=history)
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._stopped = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start monitoring the running loop; call from a coroutine on it."""
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = loop.create_task(self._heartbeat(), name="loop-lag-heartbeat")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+    def stalls(self) -> list[dict[str, Any]]:
+        """Recent stalls, newest first."""
+        return list(self._stalls)[::-1]
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._last_beat = time.monotonic()
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.max_lag = max(self.max_lag, lag)
+            _LAG_SECONDS.observe(lag)
+
+    def _watch(self) -> None:
+        reported_beat: float | None = None
+        while not self._stopped.wait(self.interval / 2):
+            beat = self._last_beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.threshold or beat == reported_beat:
+                continue
+            # One report per stall; the next heartbeat re-arms the watchdog.
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id or 0)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            _STALLS.inc()
+            self._stalls.append({"at": time.time(), "blocked_seconds": round(blocked, 3), "stack": stack})
+            logger.warning("Event loop blocked for at least %.3fs at:\n%s", blocked, stack)
@@ -0,0 +1,110 @@
+"""Prometheus instruments with a no-op stand-in when metrics are disabled.
+
+Modules declare their instruments once at import time and use the usual
+prometheus_client calls on them:
+
+    GMAIL_SECONDS = metrics.histogram("gmail_request_seconds", "...", ["operation"])
+
+    with GMAIL_SECONDS.labels(operation="get_message").time():
+        ...
+
+With ``SMART_CHAT_BOT_METRICS=0`` every factory returns one shared no-op
+object, so instrumented code pays a method call and nothing else.
+"""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Sequence
+from typing import Any
+
+__all__ = [
+    "ENABLED",
+    "REGISTRY",
+    "counter",
+    "gauge",
+    "histogram",
+    "render",
+]
+
+ENABLED = os.environ.get("SMART_CHAT_BOT_METRICS", "1") != "0"
+
+# Latency buckets in seconds, from cache hits to a slow AI reply.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _NoopMetric:
+    """Accepts every instrument call and records nothing."""
+
+    def labels(self, *_args: Any, **_kwargs: Any) -> _NoopMetric:
+        return self
+
+    def observe(self, _amount: float) -> None:
+        pass
+
+    def inc(self, _amount: float = 1) -> None:
+        pass
+
+    def dec(self, _amount: float = 1) -> None:
+        pass
+
+    def set(self, _value: float) -> None:
+        pass
+
+    def time(self) -> _NoopMetric:
+        return self
+
+    def __enter__(self) -> _NoopMetric:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        pass
+
+
+_NOOP = _NoopMetric()
+_instruments: dict[str, Any] = {}
+
+if ENABLED:
+    import prometheus_client
+
+    REGISTRY: Any = prometheus_client.CollectorRegistry()
+else:
+    REGISTRY = None
+
+
+def _get_or_create(factory_name: str, name: str, documentation: str, **kwargs: Any) -> Any:
+    if not ENABLED:
+        return _NOOP
+    # Declaring the same name twice (e.g. on re-import) returns the first instrument.
+    instrument = _instruments.get(name)
+    if instrument is None:
+        factory = getattr(prometheus_client, factory_name)
+        instrument = factory(name, documentation, registry=REGISTRY, **kwargs)
+        _instruments[name] = instrument
+    return instrument
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = LATENCY_BUCKETS,
+) -> Any:
+    return _get_or_create(
+        "Histogram", name, documentation, labelnames=labelnames, buckets=buckets
+    )
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Any:
+    return _get_or_create("Counter", name, documentation, labelnames=labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Any:
+    return _get_or_create("Gauge", name, documentation, labelnames=labelnames)
+
+
+def render() -> tuple[bytes, str] | None:
+    """Return the exposition body and content type, or None when disabled."""
+    if not ENABLED:
+        return None
+    return prometheus_client.generate_latest(REGISTRY), prometheus_client.CONTENT_TYPE_LATEST
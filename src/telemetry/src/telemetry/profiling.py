@@ -0,0 +1,145 @@
+"""On-demand CPU profiles, memory snapshots and task dumps for a live process.
+
+``profile_cpu`` runs cProfile on the event-loop thread for a few seconds of
+real traffic and returns a pstats file. ``sample_stacks`` samples every
+thread, including ``asyncio.to_thread`` workers, and returns collapsed
+stacks for flame graph tools. ``MemoryTracker`` wraps tracemalloc and diffs
+each snapshot against the previous one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import collections
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any
+
+__all__ = [
+    "MAX_SECONDS",
+    "MemoryTracker",
+    "ProfilerBusyError",
+    "profile_cpu",
+    "sample_stacks",
+    "task_stacks",
+]
+
+MAX_SECONDS = 60.0
+
+_session_lock = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when another profiling session is already running."""
+
+
+async def profile_cpu(seconds: float) -> bytes:
+    """Profile the running event loop's thread for ``seconds``; return pstats data."""
+    if not _session_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profiling session is already running")
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(min(seconds, MAX_SECONDS))
+        finally:
+            profiler.disable()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "profile.pstats")
+            profiler.dump_stats(path)
+            with open(path, "rb") as handle:
+                return handle.read()
+    finally:
+        _session_lock.release()
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> str:
+    """Sample all other threads and return ``root;...;leaf count`` lines.
+
+    Blocks the calling thread, so run it with ``asyncio.to_thread``.
+    """
+    if not _session_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profiling session is already running")
+    try:
+        counts: collections.Counter[str] = collections.Counter()
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        deadline = time.monotonic() + min(seconds, MAX_SECONDS)
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels: list[str] = []
+                current: Any = frame
+                while current is not None:
+                    labels.append(_frame_label(current))
+                    current = current.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                counts[";".join(reversed(labels))] += 1
+            time.sleep(interval)
+    finally:
+        _session_lock.release()
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class MemoryTracker:
+    """Take tracemalloc snapshots and report top allocations or growth."""
+
+    def __init__(self, frames: int = 10) -> None:
+        self.frames = frames
+        self._previous: tracemalloc.Snapshot | None = None
+        self._lock = threading.Lock()
+
+    def snapshot(self, top: int = 25, diff: bool = False) -> dict[str, Any]:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                # Allocations made before this point are invisible to tracemalloc.
+                tracemalloc.start(self.frames)
+                self._previous = None
+                return {"tracing_started": True, "stats": []}
+            current = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)]
+            )
+            previous, self._previous = self._previous, current
+        traced, peak = tracemalloc.get_traced_memory()
+        compared = diff and previous is not None
+        if diff and previous is not None:
+            stats = [
+                {
+                    "location": str(stat.traceback),
+                    "size_diff": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in current.compare_to(previous, "lineno")[:top]
+            ]
+        else:
+            stats = [
+                {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+                for stat in current.statistics("lineno")[:top]
+            ]
+        return {"traced_bytes": traced, "peak_bytes": peak, "diff": compared, "stats": stats}
+
+    def stop(self) -> None:
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+
+
+def task_stacks(limit: int = 20) -> str:
+    """Format the stack of every task on the running loop."""
+    lines: list[str] = []
+    for task in sorted(asyncio.all_tasks(), key=lambda item: item.get_name()):
+        lines.append(f"{task.get_name()} {task.get_coro()!r}")
+        for frame in task.get_stack(limit=limit):
+            lines.append(f"  {_frame_label(frame)} line {frame.f_lineno}")
+    return "\n".join(lines) + "\n"
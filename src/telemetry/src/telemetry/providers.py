@@ -0,0 +1,59 @@
+"""Find an installed provider through package entry points.
+
+Each client API keeps one registry for its entry point group. A provider
+package names itself in its pyproject.toml:
+
+    [project.entry-points."smart_chat_bot.ai_providers"]
+    claude = "claude_client_impl"
+
+and is only imported the first time a factory needs it, so its SDK adds
+nothing to startup. When several are installed, the registry's
+environment variable picks one by entry point name.
+
+    registry = ProviderRegistry("smart_chat_bot.ai_providers", "SMART_CHAT_BOT_AI_PROVIDER")
+    client = registry.provider().get_ai_client_impl()
+"""
+
+from __future__ import annotations
+
+import importlib.metadata
+import os
+import threading
+from typing import Any
+
+__all__ = ["ProviderRegistry"]
+
+
+class ProviderRegistry:
+    def __init__(self, group: str, env_var: str) -> None:
+        self.group = group
+        self.env_var = env_var
+        self._module: Any = None
+        self._lock = threading.Lock()
+
+    def provider(self) -> Any:
+        """Import the configured provider module on first use and return it."""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = self._load()
+        return self._module
+
+    def _load(self) -> Any:
+        name = os.environ.get(self.env_var)
+        found = {
+            entry_point.name: entry_point
+            for entry_point in importlib.metadata.entry_points(group=self.group)
+        }
+        if name:
+            if name not in found:
+                raise NotImplementedError(f"No {self.group} provider named {name!r} is installed")
+            return found[name].load()
+        if not found:
+            raise NotImplementedError(f"No {self.group} provider is installed")
+        if len(found) > 1:
+            raise NotImplementedError(
+                f"Several {self.group} providers are installed ({', '.join(sorted(found))}); "
+                f"set {self.env_var} to choose one"
+            )
+        return next(iter(found.values())).load()
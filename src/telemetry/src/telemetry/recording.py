@@ -0,0 +1,91 @@
+"""Record anonymized inbound chat traffic for replay and soak tests.
+
+When ``SMART_CHAT_BOT_RECORD_FILE`` is set, every inbound DM is appended to
+that rotating JSONL file with its offset in seconds from the first recorded
+event. Sender and channel ids are replaced by salted hashes that keep the
+shape of a Discord snowflake, and emails, URLs and long numbers in the
+content are masked. Set ``SMART_CHAT_BOT_RECORD_SALT`` to keep hashes stable
+across restarts; by default each process uses a random salt.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import logging.handlers
+import os
+import re
+import threading
+import time
+
+__all__ = ["TrafficRecorder", "anonymize_id", "get_recorder", "scrub"]
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_URL = re.compile(r"https?://\S+")
+_LONG_NUMBER = re.compile(r"\d{6,}")
+
+
+def anonymize_id(value: str, salt: bytes) -> str:
+    """Map an id to a stable 18-digit pseudonym."""
+    digest = hmac.new(salt, value.encode("utf-8"), hashlib.sha256).hexdigest()
+    return str(int(digest[:15], 16)).rjust(18, "1")[:18]
+
+
+def scrub(content: str) -> str:
+    """Mask emails, URLs and long numbers; keep length and wording otherwise."""
+    content = _EMAIL.sub("user@example.com", content)
+    content = _URL.sub("https://example.com", content)
+    return _LONG_NUMBER.sub(lambda match: "0" * len(match.group()), content)
+
+
+class TrafficRecorder:
+    def __init__(
+        self,
+        path: str,
+        *,
+        salt: bytes | None = None,
+        max_bytes: int = 50 * 1024 * 1024,
+        backup_count: int = 3,
+    ) -> None:
+        self.salt = salt if salt is not None else os.urandom(16)
+        self._started: float | None = None
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(f"{__name__}.{path}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger.addHandler(self._handler)
+
+    def record(self, *, sender_id: str, channel_id: str, content: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._started is None:
+                self._started = now
+            offset = now - self._started
+        event = {
+            "offset": round(offset, 3),
+            "sender": anonymize_id(sender_id, self.salt),
+            "channel": anonymize_id(channel_id, self.salt),
+            "content": scrub(content),
+        }
+        self._logger.info(json.dumps(event))
+
+    def close(self) -> None:
+        self._logger.removeHandler(self._handler)
+        self._handler.close()
+
+
+@functools.lru_cache(maxsize=1)
+def get_recorder() -> TrafficRecorder | None:
+    """The process-wide recorder, or None unless SMART_CHAT_BOT_RECORD_FILE is set."""
+    path = os.environ.get("SMART_CHAT_BOT_RECORD_FILE")
+    if not path:
+        return None
+    salt = os.environ.get("SMART_CHAT_BOT_RECORD_SALT")
+    return TrafficRecorder(path, salt=salt.encode("utf-8") if salt else None)
@@ -0,0 +1,214 @@
+"""Lightweight span tracing propagated through context variables.
+
+The first ``span`` opened with no active trace starts one; nested spans,
+including those opened in ``asyncio.to_thread`` workers, attach to it.
+When the root span ends the trace is kept if it was head-sampled
+(``SMART_CHAT_BOT_TRACE_SAMPLE_RATE``) or took at least
+``SMART_CHAT_BOT_TRACE_SLOW_MS``. Kept traces go to an in-memory ring buffer
+and, when ``SMART_CHAT_BOT_TRACE_FILE`` is set, to a rotating JSONL file.
+
+    with tracing.span("gmail.get_message", message_id=message_id):
+        ...
+"""
+
+from __future__ import annotations
+
+import collections
+import json
+import logging
+import logging.handlers
+import os
+import random
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+__all__ = [
+    "ENABLED",
+    "Span",
+    "configure",
+    "current_span",
+    "recent_traces",
+    "span",
+]
+
+ENABLED = os.environ.get("SMART_CHAT_BOT_TRACING", "1") != "0"
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    duration_ms: float | None = None
+    error: str | None = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+@dataclass
+class _Trace:
+    root: Span
+    sampled: bool
+    spans: list[Span] = field(default_factory=list)
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self.sample_rate = 0.0
+        self.slow_ms = 0.0
+        self._lock = threading.Lock()
+        self._buffer: collections.deque[dict[str, Any]] = collections.deque(maxlen=200)
+        self._file_logger: logging.Logger | None = None
+
+    def configure(
+        self,
+        *,
+        sample_rate: float,
+        slow_ms: float,
+        buffer_size: int,
+        path: str | None,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 3,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        with self._lock:
+            self._buffer = collections.deque(maxlen=buffer_size)
+        self._file_logger = None
+        file_logger = logging.getLogger(f"{__name__}.sink")
+        for old_handler in list(file_logger.handlers):
+            file_logger.removeHandler(old_handler)
+            old_handler.close()
+        if path:
+            file_logger.propagate = False
+            file_logger.setLevel(logging.INFO)
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            file_logger.addHandler(handler)
+            self._file_logger = file_logger
+
+    def finish(self, trace: _Trace) -> None:
+        duration = trace.root.duration_ms or 0.0
+        slow = duration >= self.slow_ms
+        if not (trace.sampled or slow):
+            return
+        record = {
+            "trace_id": trace.root.trace_id,
+            "name": trace.root.name,
+            "duration_ms": duration,
+            "slow": slow,
+            "spans": [item.to_dict() for item in trace.spans],
+        }
+        with self._lock:
+            self._buffer.append(record)
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(record, default=str))
+
+    def recent(self, limit: int, min_ms: float) -> list[dict[str, Any]]:
+        with self._lock:
+            records = list(self._buffer)
+        matching = [record for record in records if record["duration_ms"] >= min_ms]
+        return matching[-limit:][::-1]
+
+
+_recorder = _Recorder()
+_current_span: ContextVar[Span | None] = ContextVar("telemetry_span", default=None)
+_current_trace: ContextVar[_Trace | None] = ContextVar("telemetry_trace", default=None)
+
+
+def configure(
+    *,
+    sample_rate: float | None = None,
+    slow_ms: float | None = None,
+    buffer_size: int | None = None,
+    path: str | None = None,
+) -> None:
+    """Set sampling and sinks; unset arguments fall back to the environment."""
+    env = os.environ
+    _recorder.configure(
+        sample_rate=(
+            sample_rate
+            if sample_rate is not None
+            else float(env.get("SMART_CHAT_BOT_TRACE_SAMPLE_RATE", "0.01"))
+        ),
+        slow_ms=(
+            slow_ms if slow_ms is not None else float(env.get("SMART_CHAT_BOT_TRACE_SLOW_MS", "2000"))
+        ),
+        buffer_size=(
+            buffer_size
+            if buffer_size is not None
+            else int(env.get("SMART_CHAT_BOT_TRACE_BUFFER", "200"))
+        ),
+        path=path if path is not None else env.get("SMART_CHAT_BOT_TRACE_FILE"),
+    )
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    """Time the enclosed block as a span of the current trace, starting one if needed."""
+    if not ENABLED:
+        yield None
+        return
+    parent = _current_span.get()
+    trace = _current_trace.get()
+    new_span = Span(
+        name=name,
+        trace_id=trace.root.trace_id if trace else uuid.uuid4().hex,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id if parent else None,
+        start=time.time(),
+        attributes=attributes,
+    )
+    trace_token = None
+    if trace is None:
+        trace = _Trace(new_span, sampled=random.random() < _recorder.sample_rate)
+        trace_token = _current_trace.set(trace)
+    trace.spans.append(new_span)
+    span_token = _current_span.set(new_span)
+    started = time.perf_counter()
+    try:
+        yield new_span
+    except BaseException as exc:
+        new_span.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        new_span.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        _current_span.reset(span_token)
+        if trace_token is not None:
+            _current_trace.reset(trace_token)
+            _recorder.finish(trace)
+
+
+def recent_traces(limit: int = 20, min_ms: float = 0.0) -> list[dict[str, Any]]:
+    """Newest kept traces first, optionally only those slower than min_ms."""
+    return _recorder.recent(limit, min_ms)
+
+
+configure()
@@ -0,0 +1,19 @@
+import pytest
+
+from telemetry.deadline import call_deadline, call_timeout
+
+
+def test_call_timeout_follows_the_tightest_deadline() -> None:
+    assert call_timeout(30.0) == 30.0
+    with call_deadline(5.0):
+        assert 4.0 < call_timeout(30.0) <= 5.0  # type: ignore[operator]
+        with call_deadline(60.0):
+            assert call_timeout(None) <= 5.0  # type: ignore[operator]
+        with call_deadline(None):
+            assert call_timeout(1.0) == 1.0
+    assert call_timeout(None) is None
+
+
+def test_call_timeout_raises_once_the_deadline_passed() -> None:
+    with call_deadline(0.0), pytest.raises(TimeoutError):
+        call_timeout(30.0)
@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+import pytest
+
+from telemetry.loop_monitor import LoopLagMonitor
+
+
+def _blocking_call() -> None:
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_stall_is_reported_with_blocking_stack() -> None:
+    monitor = LoopLagMonitor(interval=0.02, threshold=0.1)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        _blocking_call()
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    (stall,) = monitor.stalls()
+    assert "_blocking_call" in stall["stack"]
+    assert stall["blocked_seconds"] >= 0.1
+    assert monitor.max_lag >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_idle_loop_reports_no_stalls() -> None:
+    monitor = LoopLagMonitor(interval=0.02, threshold=0.1)
+    monitor.start()
+    await asyncio.sleep(0.15)
+    await monitor.stop()
+    assert monitor.stalls() == []
@@ -0,0 +1,32 @@
+import pytest
+
+from telemetry import metrics
+
+
+def test_instruments_are_registered_once_and_rendered() -> None:
+    first = metrics.counter("telemetry_test_events_total", "Test events.", ["kind"])
+    again = metrics.counter("telemetry_test_events_total", "Test events.", ["kind"])
+    assert again is first
+
+    first.labels(kind="hit").inc()
+    with metrics.histogram("telemetry_test_seconds", "Test latency.").time():
+        pass
+
+    rendered = metrics.render()
+    assert rendered is not None
+    body, content_type = rendered
+    assert content_type.startswith("text/plain")
+    assert b'telemetry_test_events_total{kind="hit"} 1.0' in body
+    assert b"telemetry_test_seconds_count 1.0" in body
+
+
+def test_disabled_metrics_are_shared_noops(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    histogram = metrics.histogram("telemetry_test_disabled_seconds", "Unused.", ["stage"])
+    gauge = metrics.gauge("telemetry_test_disabled_depth", "Unused.")
+
+    assert histogram is gauge
+    with histogram.labels(stage="ai").time():
+        gauge.inc()
+        gauge.dec()
+    assert metrics.render() is None
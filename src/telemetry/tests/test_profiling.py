@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from telemetry import profiling
+
+
+def _busy_worker(stop: threading.Event) -> None:
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+def test_sample_stacks_reports_collapsed_stacks_per_thread() -> None:
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_worker, args=(stop,), name="bench-worker")
+    worker.start()
+    try:
+        stacks = profiling.sample_stacks(0.05, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    worker_lines = [line for line in stacks.splitlines() if line.startswith("bench-worker;")]
+    assert worker_lines
+    stack, count = worker_lines[0].rsplit(" ", 1)
+    assert "_busy_worker" in stack
+    assert int(count) >= 1
+
+
+@pytest.mark.asyncio
+async def test_profiling_sessions_are_exclusive() -> None:
+    import asyncio
+
+    session = asyncio.create_task(profiling.profile_cpu(0.05))
+    await asyncio.sleep(0)
+    with pytest.raises(profiling.ProfilerBusyError):
+        profiling.sample_stacks(0.01)
+    assert await session
+
+
+def test_memory_tracker_reports_growth_between_snapshots() -> None:
+    tracker = profiling.MemoryTracker(frames=1)
+    try:
+        assert tracker.snapshot()["tracing_started"] is True
+        tracker.snapshot()
+        retained = [bytearray(1024) for _ in range(200)]
+        report = tracker.snapshot(top=5, diff=True)
+    finally:
+        tracker.stop()
+
+    assert report["diff"] is True
+    assert any(
+        "test_profiling.py" in stat["location"] and stat["size_diff"] >= 200 * 1024
+        for stat in report["stats"]
+    )
+    assert len(retained) == 200
@@ -0,0 +1,51 @@
+import importlib.metadata
+import types
+
+import pytest
+
+from telemetry.providers import ProviderRegistry
+
+_GROUP = "telemetry_test.providers"
+
+
+class _EntryPoint:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.loads = 0
+
+    def load(self) -> types.ModuleType:
+        self.loads += 1
+        return types.ModuleType(f"{self.name}_impl")
+
+
+def _install(monkeypatch: pytest.MonkeyPatch, *names: str) -> list[_EntryPoint]:
+    entry_points = [_EntryPoint(name) for name in names]
+
+    def _entry_points(*, group: str) -> list[_EntryPoint]:
+        return entry_points if group == _GROUP else []
+
+    monkeypatch.setattr(importlib.metadata, "entry_points", _entry_points)
+    return entry_points
+
+
+def test_single_provider_is_loaded_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    (only,) = _install(monkeypatch, "claude")
+    registry = ProviderRegistry(_GROUP, "TELEMETRY_TEST_PROVIDER")
+
+    assert registry.provider().__name__ == "claude_impl"
+    assert registry.provider() is registry.provider()
+    assert only.loads == 1
+
+
+def test_several_providers_need_the_env_var(monkeypatch: pytest.MonkeyPatch) -> None:
+    _install(monkeypatch, "claude", "other")
+
+    with pytest.raises(NotImplementedError, match="TELEMETRY_TEST_PROVIDER"):
+        ProviderRegistry(_GROUP, "TELEMETRY_TEST_PROVIDER").provider()
+
+    monkeypatch.setenv("TELEMETRY_TEST_PROVIDER", "other")
+    assert ProviderRegistry(_GROUP, "TELEMETRY_TEST_PROVIDER").provider().__name__ == "other_impl"
+
+    monkeypatch.setenv("TELEMETRY_TEST_PROVIDER", "missing")
+    with pytest.raises(NotImplementedError, match="missing"):
+        ProviderRegistry(_GROUP, "TELEMETRY_TEST_PROVIDER").provider()
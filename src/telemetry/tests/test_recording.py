@@ -0,0 +1,21 @@
+import json
+from pathlib import Path
+
+from telemetry import recording
+
+
+def test_recorder_writes_anonymized_events(tmp_path: Path) -> None:
+    path = tmp_path / "traffic.jsonl"
+    recorder = recording.TrafficRecorder(str(path), salt=b"salt")
+    recorder.record(sender_id="111", channel_id="222", content="mail bob@corp.io about 1234567")
+    recorder.record(sender_id="111", channel_id="333", content="see https://x.test/a?b=1 ok")
+    recorder.close()
+
+    first, second = [json.loads(line) for line in path.read_text().splitlines()]
+    assert first["offset"] == 0.0 and second["offset"] >= 0.0
+    assert first["content"] == "mail user@example.com about 0000000"
+    assert second["content"] == "see https://example.com ok"
+    assert first["sender"] == second["sender"] != "111"
+    assert first["channel"] != second["channel"]
+    assert len(first["sender"]) == 18 and first["sender"].isdigit()
+    assert recording.anonymize_id("111", b"other") != first["sender"]
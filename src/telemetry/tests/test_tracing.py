@@ -0,0 +1,68 @@
+import asyncio
+import json
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from telemetry import tracing
+
+
+@pytest.fixture(autouse=True)
+def _reset_tracing() -> Iterator[None]:
+    tracing.configure(sample_rate=0.0, slow_ms=50.0, buffer_size=10, path="")
+    yield
+    tracing.configure(path="")
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_across_worker_threads() -> None:
+    tracing.configure(sample_rate=1.0, slow_ms=1e9, buffer_size=10, path="")
+
+    def _blocking() -> None:
+        with tracing.span("gmail.get_message"):
+            pass
+
+    with tracing.span("chat.handle", sender_id="u1") as root:
+        with tracing.span("parse.rule"):
+            pass
+        await asyncio.to_thread(_blocking)
+    assert tracing.current_span() is None
+
+    (trace,) = tracing.recent_traces()
+    names = {item["name"]: item for item in trace["spans"]}
+    assert trace["name"] == "chat.handle"
+    assert root is not None and trace["trace_id"] == root.trace_id
+    assert names["parse.rule"]["parent_id"] == root.span_id
+    assert names["gmail.get_message"]["parent_id"] == root.span_id
+    assert names["chat.handle"]["attributes"] == {"sender_id": "u1"}
+
+
+def test_unsampled_traces_are_kept_only_when_slow() -> None:
+    with tracing.span("fast"):
+        pass
+    with tracing.span("slow"):
+        time.sleep(0.06)
+    with pytest.raises(RuntimeError):
+        with tracing.span("failed"):
+            time.sleep(0.06)
+            raise RuntimeError("boom")
+
+    traces = tracing.recent_traces()
+    assert [trace["name"] for trace in traces] == ["failed", "slow"]
+    assert traces[0]["slow"] is True
+    assert traces[0]["spans"][0]["error"] == "RuntimeError: boom"
+    assert tracing.recent_traces(min_ms=1e6) == []
+
+
+def test_kept_traces_are_written_as_jsonl(tmp_path: Path) -> None:
+    path = tmp_path / "traces.jsonl"
+    tracing.configure(sample_rate=1.0, slow_ms=1e9, buffer_size=10, path=str(path))
+    with tracing.span("chat.handle"):
+        with tracing.span("chat.send", chars=5):
+            pass
+
+    (line,) = path.read_text(encoding="utf-8").splitlines()
+    record = json.loads(line)
+    assert [item["name"] for item in record["spans"]] == ["chat.handle", "chat.send"]
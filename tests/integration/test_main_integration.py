@@ -1,6 +1,9 @@
+import asyncio
+
 from fastapi.testclient import TestClient
 
 import main
+from telemetry import tracing
 
 
 class _DummyMailClient:
@@ -36,3 +39,54 @@ def test_auth_callback_returns_html(monkeypatch) -> None:
     response = client.get("/auth/mail/callback", params={"code": "abc", "state": "state"})
     assert response.status_code == 200
     assert "Mail authorized" in response.text
+
+
+def test_metrics_route_exposes_parse_stages() -> None:
+    asyncio.run(main._parse_command("get 3 mail"))
+    client = TestClient(main.app)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'smart_chat_bot_parsed_total{stage="rule"}' in response.text
+    assert "smart_chat_bot_parse_seconds_bucket" in response.text
+
+
+def test_debug_traces_route_lists_slow_handlers(monkeypatch) -> None:
+    monkeypatch.setattr(main, "_DEBUG_TOKEN", "secret")
+    tracing.configure(sample_rate=1.0, slow_ms=1e9, buffer_size=10, path="")
+    try:
+        asyncio.run(main._parse_command("get 3 mail"))
+        with tracing.span("chat.handle"):
+            asyncio.run(main._parse_command("get 4 mail"))
+        response = TestClient(main.app).get(
+            "/debug/traces", params={"limit": 1}, headers={"X-Debug-Token": "secret"}
+        )
+    finally:
+        tracing.configure(path="")
+    assert response.status_code == 200
+    (trace,) = response.json()["traces"]
+    assert [item["name"] for item in trace["spans"]] == ["chat.handle", "parse.rule"]
+
+
+def test_debug_routes_require_token(monkeypatch) -> None:
+    client = TestClient(main.app)
+    assert client.get("/debug/tasks").status_code == 404
+    monkeypatch.setattr(main, "_DEBUG_TOKEN", "secret")
+    assert client.get("/debug/tasks", headers={"X-Debug-Token": "wrong"}).status_code == 404
+    response = client.get("/debug/tasks", headers={"X-Debug-Token": "secret"})
+    assert response.status_code == 200
+    assert "coroutine" in response.text
+
+
+def test_debug_profile_returns_pstats(monkeypatch, tmp_path) -> None:
+    import pstats
+
+    monkeypatch.setattr(main, "_DEBUG_TOKEN", "secret")
+    response = TestClient(main.app).get(
+        "/debug/profile", params={"seconds": 0.05}, headers={"X-Debug-Token": "secret"}
+    )
+    assert response.status_code == 200
+    assert "profile.pstats" in response.headers["content-disposition"]
+    path = tmp_path / "profile.pstats"
+    path.write_bytes(response.content)
+    assert pstats.Stats(str(path)).get_stats_profile().func_profiles
@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import main
+from benchmarks import field_masks, replay, throughput
+from benchmarks.fakes import Latency
+from benchmarks.standins import GmailStandIn
+from gmail_client_impl import gmail_impl
+
+
+def test_latency_spec_parsing() -> None:
+    assert Latency.parse("0.25").sample() == (0.25, False)
+    low, _ = Latency.parse("uniform:0.1:0.2", seed=1).sample()
+    assert 0.1 <= low <= 0.2
+    assert Latency.parse("0", error_rate=1.0).sample() == (0.0, True)
+    with pytest.raises(ValueError):
+        Latency.parse("pareto:1:2")
+
+
+@pytest.mark.asyncio
+async def test_throughput_harness_reports_offline_run(monkeypatch: pytest.MonkeyPatch) -> None:
+    for name in ("_STREAM_REPLIES", "_COMBINED_REPLY", "_AI_BREAKER", "_get_mail_client"):
+        monkeypatch.setattr(main, name, getattr(main, name))
+    monkeypatch.setattr(main.ai_client_api, "get_ai_client", main.ai_client_api.get_ai_client)
+
+    config = throughput.BenchmarkConfig(
+        messages=30, users=5, concurrency=4, ai_latency="0", mail_latency="0", chat_latency="0"
+    )
+    report = await throughput.run(config)
+
+    assert report["messages"] == 30
+    assert report["errors"] == 0
+    assert report["throughput_msg_s"] > 0
+    assert set(report["latency"]) >= {"p50_ms", "p95_ms", "p99_ms"}
+    assert report["chat_sends"] >= 30
+    deltas = throughput.compare(report, report)
+    assert deltas["throughput_pct"] == 0.0
+
+
+def _write_recording(path: Path, contents: list[str]) -> None:
+    lines = [
+        json.dumps(
+            {"offset": index * 0.01, "sender": f"10{index % 2}", "channel": f"20{index % 2}", "content": text}
+        )
+        for index, text in enumerate(contents)
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_replay_schedule_scales_and_loops() -> None:
+    events = [replay.ReplayEvent(offset, "1", "2", "hi") for offset in (0.0, 1.0, 2.0)]
+    assert [due for due, _ in replay.schedule(events, speed=2.0)] == [0.0, 0.5, 1.0]
+    looped = replay.schedule(events, speed=1.0, loop=True)
+    assert [next(looped)[0] for _ in range(4)] == [0.0, 1.0, 2.0, 3.0]
+    assert {due for due, _ in replay.schedule(events, speed=None)} == {0.0}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["fakes", "standins"])
+async def test_replay_reports_recorded_traffic(
+    backend: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for name in ("_AI_BREAKER", "_get_mail_client"):
+        monkeypatch.setattr(main, name, getattr(main, name))
+    monkeypatch.setattr(main.ai_client_api, "get_ai_client", main.ai_client_api.get_ai_client)
+    monkeypatch.setattr(gmail_impl, "API_BASE_URL", gmail_impl.API_BASE_URL)
+    recording_path = tmp_path / "traffic.jsonl"
+    _write_recording(recording_path, ["hi!", "get 3 mail", "thanks, that helps", "lol ok"])
+
+    config = replay.ReplayConfig(
+        path=str(recording_path),
+        speed=None,
+        backend=backend,
+        ai_latency="0",
+        mail_latency="0",
+        chat_latency="0",
+        report_interval=0.05,
+    )
+    windows: list[dict[str, Any]] = []
+    report = await replay.run(config, windows.append)
+
+    assert report["messages"] == 4
+    assert report["errors"] == 0
+    assert report["latency"]["p99_ms"] >= report["latency"]["p50_ms"]
+    assert windows and windows[-1] == report["windows"][-1]
+    assert report["rss_end_mb"] > 0
+    if backend == "standins":
+        # "get 3 mail" is one list call plus one batch of metadata gets.
+        assert report["backend"]["gmail_requests"] == 2
+        assert report["backend"]["discord_requests"] >= 4
+
+
+def test_field_masks_shrink_responses_without_changing_results() -> None:
+    server = GmailStandIn(mailbox_size=20, body_bytes=512)
+    history_start = server.history_id
+    server.deliver(5)
+    with server:
+        results = field_masks.measure(server, history_start, rounds=2)
+    print(field_masks.report(results))
+
+    assert [result.operation for result in results] == [
+        "list_messages",
+        "get_metadata",
+        "get_full",
+        "list_history",
+        "get_profile",
+    ]
+    assert all(result.same_result for result in results)
+    assert all(result.masked_bytes < result.unmasked_bytes for result in results)
@@ -0,0 +1,52 @@
+from benchmarks import import_time
+
+# Provider SDKs and optional dependencies that must load on first use, not at startup.
+_LAZY_MODULES = {
+    "anthropic",
+    "discord",
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "httplib2",
+    "numpy",
+    "uvicorn",
+    "claude_client_impl",
+    "discord_client_impl",
+    "gmail_client_impl",
+}
+
+
+def test_importing_main_skips_provider_sdks() -> None:
+    records = import_time.measure("main")
+    print(import_time.report(records))
+
+    imported = {record.module.split(".")[0] for record in records}
+    assert "main" in imported
+    assert imported & _LAZY_MODULES == set()
+
+
+def test_providers_load_through_entry_points() -> None:
+    import ai_client_api
+    import chat_client_api
+    import mail_client_api
+
+    assert ai_client_api.providers.provider().__name__ == "claude_client_impl"
+    assert mail_client_api.providers.provider().__name__ == "gmail_client_impl"
+    assert chat_client_api.providers.provider().__name__ == "discord_client_impl"
+    message = chat_client_api.get_message({"id": "1", "channel_id": "2", "author": {"id": "3"}})
+    assert message.id == "1"
+
+
+def test_parse_importtime_output() -> None:
+    output = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     _io\n"
+        "import time:       300 |        420 |   json.decoder\n"
+        "import time:      1000 |       1420 | json\n"
+    )
+    records = import_time.parse(output)
+    assert [(record.module, record.depth, record.cumulative_us) for record in records] == [
+        ("_io", 2, 120),
+        ("json.decoder", 1, 420),
+        ("json", 0, 1420),
+    ]
+    assert "json" in import_time.report(records, top=2)
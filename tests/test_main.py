@@ -1,9 +1,17 @@
-from typing import cast
+import asyncio
+import contextlib
+import datetime
+import io
+import threading
+import time
+from typing import Any, cast
 
 import pytest
 
 import main
+import ai_client_api
 import chat_client_api
+from smart_chat_bot import memory
 
 
 class _DummyMessage:
@@ -14,6 +22,8 @@ class _DummyMessage:
 
 
 class _DummyChatClient:
+    supports_edits = False
+
     def __init__(self) -> None:
         self.sent: list[tuple[str, str]] = []
 
@@ -54,11 +64,64 @@ class _DummyMailClient:
         return True
 
 
+@pytest.fixture(autouse=True)
+def _fresh_ai_breaker(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(main, "_AI_BREAKER", ai_client_api.CircuitBreaker())
+    monkeypatch.setattr(main, "_CONVERSATIONS", memory.ConversationStore())
+
+
+def _parsed(command: dict[str, object]):
+    async def _parse(_content: str) -> tuple[dict[str, object], None]:
+        return command, None
+
+    return _parse
+
+
 def test_parse_command_fallback_get_messages() -> None:
     result = main._parse_command_fallback("get 5 mail")
     assert result == {"action": "get_messages", "max_results": 5}
 
 
+def test_parse_command_fallback_summarize() -> None:
+    assert main._parse_command_fallback("summarize 30 mail") == {"action": "summarize", "max_results": 30}
+    assert main._parse_command_fallback("summarise mail") == {"action": "summarize", "max_results": 10}
+    assert main._parse_command_fallback("get 5 mail from alice") is None
+    assert main._parse_command_fallback("summarize unread mail") is None
+
+
+@pytest.mark.asyncio
+async def test_handler_passes_filters_to_mail_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[dict[str, object]] = []
+
+    class _FilteringMailClient(_DummyMailClient):
+        def get_messages(self, max_results: int = 10, **filters: object):
+            calls.append({"max_results": max_results, **filters})
+            return []
+
+    command: dict[str, object] = {
+        "action": "get_messages",
+        "query": "is:unread from:alice",
+        "labels": ["INBOX"],
+        "after": "2026-10-01",
+    }
+    monkeypatch.setattr(main, "_parse_command", _parsed(command))
+    monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _FilteringMailClient())
+    chat_client = _DummyChatClient()
+    handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
+
+    await handler(_DummyMessage("unread from alice since october"))
+
+    assert calls == [
+        {
+            "max_results": 10,
+            "query": "is:unread from:alice",
+            "labels": ["INBOX"],
+            "after": datetime.date(2026, 10, 1),
+        }
+    ]
+    assert chat_client.sent == [("chan1", "No messages found.")]
+
+
 def test_split_message_chunks() -> None:
     text = "\n".join(["x" * 1000, "y" * 1000, "z" * 1000])
     chunks = main._split_message(text, limit=1900)
@@ -72,7 +135,7 @@ async def test_handler_login_sends_link(monkeypatch: pytest.MonkeyPatch) -> None
     chat_client = _DummyChatClient()
     handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
 
-    monkeypatch.setattr(main, "_parse_command", lambda _content: ({"action": "login"}, None))
+    monkeypatch.setattr(main, "_parse_command", _parsed({"action": "login"}))
     monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _DummyMailClient())
 
     await handler(_DummyMessage("login"))
@@ -85,7 +148,7 @@ async def test_handler_logout(monkeypatch: pytest.MonkeyPatch) -> None:
     chat_client = _DummyChatClient()
     handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
 
-    monkeypatch.setattr(main, "_parse_command", lambda _content: ({"action": "logout"}, None))
+    monkeypatch.setattr(main, "_parse_command", _parsed({"action": "logout"}))
     monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _DummyMailClient())
 
     await handler(_DummyMessage("logout"))
@@ -98,7 +161,7 @@ async def test_handler_not_logged_in_sends_login_link(monkeypatch: pytest.Monkey
     chat_client = _DummyChatClient()
     handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
 
-    monkeypatch.setattr(main, "_parse_command", lambda _content: ({"action": "get_messages"}, None))
+    monkeypatch.setattr(main, "_parse_command", _parsed({"action": "get_messages"}))
     monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _DummyMailClient(raise_on_get=True))
 
     await handler(_DummyMessage("get 1 mail"))
@@ -111,7 +174,7 @@ async def test_handler_get_message_missing_id(monkeypatch: pytest.MonkeyPatch) -
     chat_client = _DummyChatClient()
     handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
 
-    monkeypatch.setattr(main, "_parse_command", lambda _content: ({"action": "get_message"}, None))
+    monkeypatch.setattr(main, "_parse_command", _parsed({"action": "get_message"}))
     monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _DummyMailClient())
 
     await handler(_DummyMessage("get mail"))
@@ -124,7 +187,7 @@ async def test_handler_mark_as_read_missing_id(monkeypatch: pytest.MonkeyPatch)
     chat_client = _DummyChatClient()
     handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
 
-    monkeypatch.setattr(main, "_parse_command", lambda _content: ({"action": "mark_as_read"}, None))
+    monkeypatch.setattr(main, "_parse_command", _parsed({"action": "mark_as_read"}))
     monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _DummyMailClient())
 
     await handler(_DummyMessage("read mail"))
@@ -137,7 +200,7 @@ async def test_handler_delete_missing_id(monkeypatch: pytest.MonkeyPatch) -> Non
     chat_client = _DummyChatClient()
     handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
 
-    monkeypatch.setattr(main, "_parse_command", lambda _content: ({"action": "delete_message"}, None))
+    monkeypatch.setattr(main, "_parse_command", _parsed({"action": "delete_message"}))
     monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _DummyMailClient())
 
     await handler(_DummyMessage("delete mail"))
@@ -145,29 +208,510 @@ async def test_handler_delete_missing_id(monkeypatch: pytest.MonkeyPatch) -> Non
     assert "Missing message id" in chat_client.sent[0][1]
 
 
-def test_fallback_ai_reply(monkeypatch: pytest.MonkeyPatch) -> None:
+@pytest.mark.asyncio
+async def test_fallback_ai_reply(monkeypatch: pytest.MonkeyPatch) -> None:
     class _DummyAI:
-        def generate_response(self, _content: str, **kwargs: object) -> str:
+        async def generate_response_async(self, _content: str, **kwargs: object) -> str:
             system_prompt = str(kwargs.get("system_prompt", ""))
             if "Parsing failed because: reason" in system_prompt:
                 return "failed: reason"
             return "hello"
 
     monkeypatch.setattr(main.ai_client_api, "get_ai_client", lambda: _DummyAI())
-    assert main._fallback_ai_reply("hi", None) == "hello"
+    assert await main._fallback_ai_reply("hi", None) == "hello"
 
 
-def test_fallback_ai_reply_includes_reason(monkeypatch: pytest.MonkeyPatch) -> None:
+@pytest.mark.asyncio
+async def test_fallback_ai_reply_includes_reason(monkeypatch: pytest.MonkeyPatch) -> None:
     class _DummyAI:
-        def generate_response(self, _content: str, **kwargs: object) -> str:
+        async def generate_response_async(self, _content: str, **kwargs: object) -> str:
             system_prompt = str(kwargs.get("system_prompt", ""))
             return "ok" if "Parsing failed because: bad" in system_prompt else "nope"
 
     monkeypatch.setattr(main.ai_client_api, "get_ai_client", lambda: _DummyAI())
-    assert main._fallback_ai_reply("hi", "bad") == "ok"
+    assert await main._fallback_ai_reply("hi", "bad") == "ok"
 
 
-def test_parse_command_ai_failure_fallback() -> None:
-    command, reason = main._parse_command("get 2 mail")
+@pytest.mark.asyncio
+async def test_parse_command_ai_failure_fallback() -> None:
+    command, reason = await main._parse_command("get 2 mail")
     assert command == {"action": "get_messages", "max_results": 2}
     assert reason is None
+
+
+class _DummyStreamChatClient:
+    supports_edits = True
+
+    def __init__(self) -> None:
+        self.messages: dict[str, str] = {}
+        self.edits = 0
+
+    def create_message(self, channel_id: str, content: str):
+        class _Posted:
+            id = str(len(self.messages) + 1)
+
+        self.messages[_Posted.id] = content
+        return _Posted()
+
+    def edit_message(self, channel_id: str, message_id: str, content: str) -> bool:
+        self.messages[message_id] = content
+        self.edits += 1
+        return True
+
+
+async def _deltas(parts: list[str], delay: float = 0.0):
+    for part in parts:
+        if delay:
+            await asyncio.sleep(delay)
+        yield part
+
+
+@pytest.mark.asyncio
+async def test_stream_to_chat_coalesces_edits() -> None:
+    chat_client = _DummyStreamChatClient()
+    parts = [f"word{i} " for i in range(20)]
+    await main._stream_to_chat(
+        cast(chat_client_api.ChatClient, chat_client),
+        "chan1",
+        _deltas(parts, delay=0.005),
+        edit_interval=0.05,
+    )
+    assert chat_client.messages == {"1": "".join(parts)}
+    assert 0 < chat_client.edits < len(parts) - 1
+
+
+@pytest.mark.asyncio
+async def test_stream_to_chat_continues_in_new_message() -> None:
+    chat_client = _DummyStreamChatClient()
+    parts = ["a" * 30 + "\n", "b" * 30 + "\n", "c" * 30]
+    await main._stream_to_chat(
+        cast(chat_client_api.ChatClient, chat_client),
+        "chan1",
+        _deltas(parts),
+        limit=50,
+    )
+    assert list(chat_client.messages.values()) == ["a" * 30, "b" * 30, "c" * 30]
+
+
+@pytest.mark.asyncio
+async def test_stream_to_chat_sends_once_without_edits() -> None:
+    chat_client = _DummyChatClient()
+    await main._stream_to_chat(
+        cast(chat_client_api.ChatClient, chat_client),
+        "chan1",
+        _deltas(["Hel", "lo ", "there"]),
+    )
+    assert chat_client.sent == [("chan1", "Hello there")]
+
+
+@pytest.mark.asyncio
+async def test_handler_sends_combined_reply(monkeypatch: pytest.MonkeyPatch) -> None:
+    chat_client = _DummyChatClient()
+    handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
+
+    monkeypatch.setattr(main, "_parse_command", _parsed({"action": "reply", "reply": "Hi there!"}))
+
+    await handler(_DummyMessage("hello"))
+    assert chat_client.sent == [("chan1", "Hi there!")]
+
+
+@pytest.mark.asyncio
+async def test_parse_command_with_ai_uses_combined_schema(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[dict[str, object]] = []
+
+    class _DummyAI:
+        async def generate_response_async(self, _content: str, **kwargs: object) -> dict[str, str]:
+            calls.append(kwargs)
+            return {"action": "reply", "reply": ""}
+
+    monkeypatch.setattr(main, "_COMBINED_REPLY", True)
+    monkeypatch.setattr(main.ai_client_api, "get_ai_client", lambda: _DummyAI())
+    command, reason = await main._parse_command_with_ai("how are you?")
+    assert command is None
+    assert reason == "Reply action missing reply text"
+    assert calls[0]["response_schema"] is main._COMBINED_SCHEMA
+    assert calls[0]["profile"] == ai_client_api.COMBINED
+
+
+@pytest.mark.asyncio
+async def test_parse_command_uses_local_model_before_ai(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def _no_ai(_content: str) -> tuple[None, str]:
+        raise AssertionError("AI should not be called")
+
+    monkeypatch.setattr(main, "_parse_command_local", lambda _content: {"action": "logout"})
+    monkeypatch.setattr(main, "_parse_command_with_ai", _no_ai)
+    command, reason = await main._parse_command("please sign me out")
+    assert command == {"action": "logout"}
+    assert reason is None
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_skips_ai_and_sends_canned_reply(monkeypatch: pytest.MonkeyPatch) -> None:
+    class _DownAI:
+        calls = 0
+
+        async def generate_response_async(self, _content: str, **kwargs: object) -> str:
+            _DownAI.calls += 1
+            raise ConnectionError("provider down")
+
+    breaker = ai_client_api.CircuitBreaker(min_calls=1)
+    monkeypatch.setattr(main, "_AI_BREAKER", breaker)
+    monkeypatch.setattr(main.ai_client_api, "get_ai_client", lambda: _DownAI())
+
+    _, reason = await main._parse_command("what's up?")
+    assert reason is not None and "provider down" in reason
+    assert breaker.state == "open"
+
+    chat_client = _DummyChatClient()
+    monkeypatch.setattr(main, "_STREAM_REPLIES", True)
+    handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
+    await handler(_DummyMessage("still there?"))
+    assert chat_client.sent == [("chan1", main._AI_UNAVAILABLE_REPLY)]
+    assert _DownAI.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_handler_skips_fallback_reply_when_budget_spent(monkeypatch: pytest.MonkeyPatch) -> None:
+    class _SlowAI:
+        calls: list[object] = []
+
+        async def generate_response_async(self, _content: str, **kwargs: object) -> str:
+            _SlowAI.calls.append(kwargs.get("timeout"))
+            await asyncio.sleep(10)
+            return "late"
+
+    monkeypatch.setattr(main, "_MESSAGE_BUDGET_SECONDS", 0.2)
+    monkeypatch.setattr(main, "_REPLY_RESERVE_SECONDS", 0.1)
+    monkeypatch.setattr(main, "_STREAM_REPLIES", False)
+    monkeypatch.setattr(main.ai_client_api, "get_ai_client", lambda: _SlowAI())
+    chat_client = _DummyChatClient()
+    handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
+
+    await asyncio.wait_for(handler(_DummyMessage("how are you?")), 1.0)
+
+    assert len(_SlowAI.calls) == 1
+    assert 0 < cast(float, _SlowAI.calls[0]) <= 0.1
+    assert chat_client.sent == [("chan1", main._TIMEOUT_REPLY)]
+
+
+@pytest.mark.asyncio
+async def test_stalled_provider_opens_breaker(monkeypatch: pytest.MonkeyPatch) -> None:
+    class _StalledAI:
+        calls = 0
+
+        async def generate_response_async(self, _content: str, **kwargs: object) -> str:
+            # Ignores its timeout, so only the handler's safety net ends the call.
+            _StalledAI.calls += 1
+            await asyncio.sleep(10)
+            return "late"
+
+    breaker = ai_client_api.CircuitBreaker(min_calls=4)
+    monkeypatch.setattr(main, "_AI_BREAKER", breaker)
+    monkeypatch.setattr(main, "_MESSAGE_BUDGET_SECONDS", 0.2)
+    monkeypatch.setattr(main, "_REPLY_RESERVE_SECONDS", 0.1)
+    monkeypatch.setattr(main, "_STREAM_REPLIES", False)
+    monkeypatch.setattr(main.ai_client_api, "get_ai_client", lambda: _StalledAI())
+    chat_client = _DummyChatClient()
+    handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
+
+    for _ in range(4):
+        await asyncio.wait_for(handler(_DummyMessage("how are you?")), 1.0)
+    assert breaker.state == "open"
+
+    calls = _StalledAI.calls
+    await handler(_DummyMessage("still there?"))
+    assert _StalledAI.calls == calls
+    assert chat_client.sent[-1] == ("chan1", main._AI_UNAVAILABLE_REPLY)
+
+
+@pytest.mark.asyncio
+async def test_handler_bounds_slow_mail_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    class _SlowMailClient(_DummyMailClient):
+        def get_messages(self, max_results: int = 10):
+            time.sleep(0.5)
+            return []
+
+    monkeypatch.setattr(main, "_MESSAGE_BUDGET_SECONDS", 0.2)
+    monkeypatch.setattr(main, "_REPLY_RESERVE_SECONDS", 0.1)
+    monkeypatch.setattr(main, "_parse_command", _parsed({"action": "get_messages"}))
+    monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _SlowMailClient())
+    chat_client = _DummyChatClient()
+    handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
+
+    await asyncio.wait_for(handler(_DummyMessage("get mail")), 0.4)
+
+    assert chat_client.sent == [("chan1", main._TIMEOUT_REPLY)]
+
+
+@pytest.mark.asyncio
+async def test_auth_routes_bound_token_exchanges_off_the_loop(monkeypatch: pytest.MonkeyPatch) -> None:
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    class _SlowAuthClient:
+        def callback(self, code: str, state: str | None = None) -> dict[str, str]:
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.05)
+            with lock:
+                in_flight -= 1
+            return {"user_id": "user1"}
+
+    monkeypatch.setattr(main, "_AUTH_SLOTS", asyncio.Semaphore(2))
+    monkeypatch.setattr(main, "_get_mail_client", lambda user_id: _SlowAuthClient())
+    ticks = 0
+
+    async def _ticker() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    ticker = asyncio.create_task(_ticker())
+    responses = await asyncio.gather(
+        *(main.gmail_auth_callback(code="code", state=f"s{index}") for index in range(6))
+    )
+    ticker.cancel()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert peak == 2
+    assert ticks >= 10
+
+
+@pytest.mark.asyncio
+async def test_handler_summarize_fetches_only_uncached_bodies(monkeypatch: pytest.MonkeyPatch) -> None:
+    fetched: list[list[str]] = []
+
+    class _Mail(_DummyMailClient):
+        def list_message_ids(self, max_results: int = 10) -> list[str]:
+            return ["m1", "m2", "m3"][:max_results]
+
+        def get_messages_by_id(self, message_ids: list[str]):
+            fetched.append(message_ids)
+            return [self.get_message(message_id) for message_id in message_ids]
+
+        def get_message(self, message_id: str):
+            class _Msg:
+                id = message_id
+                subject = f"Subject {message_id}"
+                from_ = "from@example.com"
+                snippet = ""
+                body = "Please review the attached budget."
+
+            return _Msg()
+
+    class _SummaryAI:
+        async def generate_response_async(self, user_input: str, **kwargs: object):
+            if kwargs.get("response_schema"):
+                ids = [line[4:] for line in user_input.splitlines() if line.startswith("id: ")]
+                return {"summaries": [{"id": msg_id, "summary": "budget review"} for msg_id in ids]}
+            return "Digest:\n" + user_input
+
+    monkeypatch.setattr(main, "_SUMMARY_CACHE", main.summarize.SummaryCache())
+    monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _Mail())
+    monkeypatch.setattr(main, "_get_ai_client", lambda: _SummaryAI())
+    chat_client = _DummyChatClient()
+    handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
+
+    monkeypatch.setattr(main, "_parse_command", _parsed({"action": "summarize", "max_results": 2}))
+    await handler(_DummyMessage("summarize 2 mail"))
+    monkeypatch.setattr(main, "_parse_command", _parsed({"action": "summarize", "max_results": 3}))
+    await handler(_DummyMessage("summarize 3 mail"))
+
+    assert fetched == [["m1", "m2"], ["m3"]]
+    assert chat_client.sent[-1][1].splitlines() == [
+        "Digest:",
+        "- from@example.com — Subject m1: budget review",
+        "- from@example.com — Subject m2: budget review",
+        "- from@example.com — Subject m3: budget review",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_notifier_dms_the_linked_user(monkeypatch: pytest.MonkeyPatch) -> None:
+    class _ChatWithDMs(_DummyChatClient):
+        def __init__(self) -> None:
+            super().__init__()
+            self.opened: list[str] = []
+
+        def open_direct_channel(self, user_id: str) -> str:
+            self.opened.append(user_id)
+            return f"dm-{user_id}"
+
+    monkeypatch.setattr(main.mail_client_api, "get_linked_user_ids", lambda: ["user1"])
+    chat_client = _ChatWithDMs()
+    scheduler = main._make_notifier(cast(chat_client_api.ChatClient, chat_client))
+    await scheduler.refresh_users()
+    await scheduler._notify("user1", "You have 1 new email:")
+    await scheduler._notify("user1", "You have 2 new emails:")
+
+    assert scheduler.user_count == 1
+    assert chat_client.opened == ["user1"]
+    assert chat_client.sent == [("dm-user1", "You have 1 new email:"), ("dm-user1", "You have 2 new emails:")]
+
+
+def test_local_parse_waits_for_the_startup_load(monkeypatch: pytest.MonkeyPatch) -> None:
+    class _Model:
+        def predict_command(self, content: str, threshold: float | None = None) -> dict[str, Any]:
+            return {"action": "logout"}
+
+    monkeypatch.setattr(main, "_INTENT_MODEL", None)
+    assert main._parse_command_local("log me out") is None
+    monkeypatch.setattr(main, "_INTENT_MODEL", _Model())
+    assert main._parse_command_local("log me out") == {"action": "logout"}
+
+
+def test_parse_command_fallback_get_attachments() -> None:
+    assert main._parse_command_fallback("get attachments abc123") == {
+        "action": "get_attachments",
+        "message_id": "abc123",
+    }
+
+
+@pytest.mark.asyncio
+async def test_handler_forwards_matching_attachments_within_limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    downloads: list[tuple[str, int]] = []
+    uploads: list[tuple[str, bytes]] = []
+
+    class _Attachment:
+        def __init__(self, attachment_id: str, filename: str, size: int) -> None:
+            self.id = attachment_id
+            self.message_id = "m1"
+            self.filename = filename
+            self.size = size
+
+    class _Mail(_DummyMailClient):
+        def list_attachments(self, message_id: str):
+            return [
+                _Attachment("a1", "report.pdf", 100),
+                _Attachment("a2", "photo.jpg", 100),
+                _Attachment("a3", "scan.PDF", 5000),
+            ]
+
+        def download_attachment(self, message_id: str, attachment_id: str, *, max_bytes: int | None = None):
+            assert max_bytes is not None
+            downloads.append((attachment_id, max_bytes))
+            return io.BytesIO(b"%PDF-1.7")
+
+    class _UploadingChatClient(_DummyChatClient):
+        def send_file(self, channel_id: str, file, filename: str, content: str = ""):
+            uploads.append((filename, file.read()))
+
+    monkeypatch.setattr(main, "_ATTACHMENT_MAX_BYTES", 1024)
+    monkeypatch.setattr(main, "_ATTACHMENT_USER_BYTES", 150)
+    monkeypatch.setattr(main, "_ATTACHMENT_USAGE", {})
+    monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _Mail())
+    monkeypatch.setattr(
+        main, "_parse_command", _parsed({"action": "get_attachments", "message_id": "m1", "filename": "pdf"})
+    )
+    chat_client = _UploadingChatClient()
+    handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
+
+    await handler(_DummyMessage("send me the pdf from m1"))
+
+    assert downloads == [("a1", 150)]
+    assert uploads == [("report.pdf", b"%PDF-1.7")]
+    assert chat_client.sent == [("chan1", "Skipped scan.PDF: larger than 1 KB.")]
+
+    # The allowance is per user over a window, not per request.
+    chat_client.sent.clear()
+    await handler(_DummyMessage("send me the pdf from m1"))
+    assert len(uploads) == 1
+    assert chat_client.sent[0] == ("chan1", "Skipped report.pdf: attachment limit reached, try again later.")
+
+    monkeypatch.setattr(main, "_ATTACHMENT_USER_WINDOW_SECONDS", 0.0)
+    await handler(_DummyMessage("send me the pdf from m1"))
+    assert len(uploads) == 2
+
+
+
+@pytest.mark.asyncio
+async def test_handler_refunds_allowance_when_forward_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    uploads: list[str] = []
+    failures = [RuntimeError("download failed")]
+
+    class _Attachment:
+        id = "a1"
+        message_id = "m1"
+        filename = "report.pdf"
+        size = 100
+
+    class _Mail(_DummyMailClient):
+        def list_attachments(self, message_id: str):
+            return [_Attachment()]
+
+        def download_attachment(self, message_id: str, attachment_id: str, *, max_bytes: int | None = None):
+            if failures:
+                raise failures.pop()
+            return io.BytesIO(b"%PDF-1.7")
+
+    class _UploadingChatClient(_DummyChatClient):
+        def send_file(self, channel_id: str, file, filename: str, content: str = ""):
+            uploads.append(filename)
+
+    monkeypatch.setattr(main, "_ATTACHMENT_USER_BYTES", 150)
+    monkeypatch.setattr(main, "_ATTACHMENT_USAGE", {})
+    monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _Mail())
+    monkeypatch.setattr(
+        main, "_parse_command", _parsed({"action": "get_attachments", "message_id": "m1", "filename": "pdf"})
+    )
+    chat_client = _UploadingChatClient()
+    handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
+
+    with contextlib.suppress(RuntimeError):
+        await handler(_DummyMessage("send me the pdf from m1"))
+    assert uploads == []
+    assert main._ATTACHMENT_USAGE == {}
+
+    # The failed attempt did not use up the allowance for the retry.
+    await handler(_DummyMessage("send me the pdf from m1"))
+    assert uploads == ["report.pdf"]
+
+class _ListedMessage:
+    def __init__(self, message_id: str) -> None:
+        self.id = message_id
+        self.subject = f"Subject {message_id}"
+        self.from_ = "alice@example.com"
+        self.date = "Mon, 1 Jan 2024"
+        self.snippet = ""
+
+
+@pytest.mark.asyncio
+async def test_follow_ups_use_conversation_memory(monkeypatch: pytest.MonkeyPatch) -> None:
+    fetched: list[str] = []
+    histories: list[list[ai_client_api.Turn]] = []
+
+    class _ListingMailClient(_DummyMailClient):
+        def get_messages(self, max_results: int = 10, **_filters: object):
+            return [_ListedMessage("m-first"), _ListedMessage("m-second")][:max_results]
+
+        def get_message(self, message_id: str):
+            fetched.append(message_id)
+            return super().get_message(message_id)
+
+    class _DummyAI:
+        async def generate_response_async(self, _content: str, **kwargs: object) -> dict[str, str]:
+            histories.append(list(cast(list[ai_client_api.Turn], kwargs["history"])))
+            return {"action": "reply", "reply": "You're welcome."}
+
+    monkeypatch.setattr(main, "_COMBINED_REPLY", True)
+    monkeypatch.setattr(main, "_parse_command_local", lambda _content: None)
+    monkeypatch.setattr(main.ai_client_api, "get_ai_client", lambda: _DummyAI())
+    monkeypatch.setattr(main, "_get_mail_client", lambda _user_id: _ListingMailClient())
+    chat_client = _DummyChatClient()
+    handler = main._make_chat_handler(cast(chat_client_api.ChatClient, chat_client))
+
+    await handler(_DummyMessage("get 2 mail"))
+    await handler(_DummyMessage("get mail 2"))
+    await handler(_DummyMessage("thanks!"))
+    await handler(_DummyMessage("thanks!", sender_id="user2"))
+
+    # "2" is the second listed message, resolved without asking the AI.
+    assert fetched == ["m-second"]
+    assert [turn.role for turn in histories[0]] == ["user", "assistant", "user", "assistant"]
+    assert histories[0][1].content.startswith("Listed message ids: 1=m-first, 2=m-second\nID: m-first")
+    assert histories[1] == []
+    assert chat_client.sent[-1] == ("chan1", "You're welcome.")
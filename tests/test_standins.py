@@ -0,0 +1,300 @@
+import datetime
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError  # type: ignore[import-untyped]
+from googleapiclient.http import BatchHttpRequest  # type: ignore[import-untyped]
+
+import mail_client_api
+from benchmarks.fakes import Latency
+from benchmarks.standins import AnthropicStandIn, DiscordStandIn, GmailStandIn, Knobs
+from benchmarks.standins.base import Response
+from claude_client_impl.claude_impl import ClaudeClient, create_async_client
+from discord_client_impl.discord_impl import DiscordClient
+from gmail_client_impl import gmail_impl
+
+_SCHEMA = {
+    "type": "object",
+    "properties": {"action": {"type": "string"}, "reply": {"type": "string"}},
+    "required": ["action"],
+}
+
+
+@pytest.fixture
+def gmail() -> Iterator[GmailStandIn]:
+    with GmailStandIn(mailbox_size=5) as server:
+        yield server  # type: ignore[misc]
+
+
+def _gmail_client(
+    server: GmailStandIn, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> gmail_impl.GmailClient:
+    monkeypatch.setattr(gmail_impl, "API_BASE_URL", server.base_url + "/")
+    client = gmail_impl.GmailClient(
+        user_id="u1", credentials_path="", redirect_uri="", db_path=str(tmp_path / "tokens.sqlite")
+    )
+    credentials = Credentials(
+        token="token",
+        refresh_token="refresh",
+        client_id="id",
+        client_secret="secret",
+        expiry=datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+    )
+    client._token_store.save_credentials("u1", credentials)
+    return client
+
+
+def test_gmail_client_runs_against_stand_in(
+    gmail: GmailStandIn, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _gmail_client(gmail, tmp_path, monkeypatch)
+
+    listed = list(client.get_messages(max_results=3))
+    newest = listed[0].id
+    assert [message.subject for message in listed] == ["Subject 4", "Subject 3", "Subject 2"]
+    assert client.get_message(newest).body.startswith("Message 4 body.")
+
+    start = gmail.history_id
+    client.mark_as_read(newest)
+    client.delete_message(listed[1].id)
+    history = client._get_service().users().history().list(userId="me", startHistoryId=start).execute()
+    assert [list(change)[1] for change in history["history"]] == ["labelsRemoved", "messagesDeleted"]
+    with pytest.raises(HttpError) as excinfo:
+        client.get_message(listed[1].id)
+    assert excinfo.value.status_code == 404
+
+
+def test_gmail_requests_follow_the_caller_deadline(
+    gmail: GmailStandIn, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _gmail_client(gmail, tmp_path, monkeypatch)
+    message_id = next(iter(gmail.messages))
+    client.get_message(message_id)
+
+    with mail_client_api.call_deadline(2.0):
+        client.mark_as_read(message_id)
+    http = client._http
+    assert http is not None and 0 < http.timeout <= 2.0
+    # The kept-alive connection from the first call is bounded too.
+    assert [conn.sock.gettimeout() <= 2.0 for conn in http.connections.values()] == [True]
+
+    with mail_client_api.call_deadline(0.0), pytest.raises(TimeoutError):
+        client.delete_message(message_id)
+    assert message_id in gmail.messages
+
+    client.get_message(message_id)
+    assert http.timeout == gmail_impl.DEFAULT_HTTP_TIMEOUT_SECONDS
+
+
+def test_gmail_filters_and_pages_on_the_server(
+    gmail: GmailStandIn, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _gmail_client(gmail, tmp_path, monkeypatch)
+    monkeypatch.setattr(gmail_impl, "LIST_PAGE_SIZE", 2)
+
+    streamed = client.get_messages(max_results=5)
+    assert next(streamed).subject == "Subject 4"
+    assert gmail.requests == [("GET", "/gmail/v1/users/me/messages"), ("POST", "/batch/gmail/v1")]
+    assert [message.subject for message in streamed] == ["Subject 3", "Subject 2", "Subject 1", "Subject 0"]
+    assert gmail.requests.count(("GET", "/gmail/v1/users/me/messages")) == 3
+
+    client.mark_as_read(client.list_message_ids(max_results=1)[0])
+    unread = client.get_messages(max_results=10, query="is:unread from:sender4", labels=["INBOX"])
+    assert list(unread) == []
+    after = datetime.datetime.fromtimestamp(1_790_000_150, tz=datetime.timezone.utc)
+    recent = client.get_messages(max_results=10, after=after, before=datetime.date(2026, 12, 1))
+    assert [message.subject for message in recent] == ["Subject 4", "Subject 3"]
+    assert gmail_impl._search_query("is:unread", datetime.date(2026, 1, 2), None) == "is:unread after:1767312000"
+
+
+def test_gmail_formats_request_only_the_fields_they_read(
+    gmail: GmailStandIn, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _gmail_client(gmail, tmp_path, monkeypatch)
+    newest = client.list_message_ids(max_results=1)[0]
+
+    minimal = client.get_message(newest, format="minimal")
+    assert (minimal.subject, minimal.body) == ("", "")
+    metadata = client.get_message(newest, format="metadata")
+    assert (metadata.subject, metadata.body) == ("Subject 4", "")
+    full = client.get_message(newest)
+    raw = client.get_message(newest, format="raw")
+    assert (raw.from_, raw.subject, raw.body.rstrip()) == (full.from_, full.subject, full.body.rstrip())
+    [batched] = client.get_messages_by_id([newest], format="metadata")
+    assert batched.subject == "Subject 4"
+
+    resource = client._get_service().users().messages().get(
+        userId="me", id=newest, format="full", fields=gmail_impl.MESSAGE_FIELDS["full"]
+    ).execute()
+    assert set(resource) == {"id", "snippet", "payload"}
+    assert set(resource["payload"]["parts"][0]) == {"mimeType", "body"}
+
+
+def test_gmail_attachments_stream_to_spooled_files(
+    gmail: GmailStandIn, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _gmail_client(gmail, tmp_path, monkeypatch)
+    monkeypatch.setattr(gmail_impl, "ATTACHMENT_SPOOL_BYTES", 1024)
+    monkeypatch.setattr(gmail_impl, "ATTACHMENT_CHUNK_BYTES", 1000)
+    message_id = client.list_message_ids(max_results=1)[0]
+    report = bytes(range(256)) * 40
+    gmail.attach(message_id, "report.pdf", report)
+    gmail.attach(message_id, "note.txt", b"hi", mime_type="text/plain")
+
+    attachments = client.list_attachments(message_id)
+    assert [(item.filename, item.mime_type, item.size) for item in attachments] == [
+        ("report.pdf", "application/pdf", len(report)),
+        ("note.txt", "text/plain", 2),
+    ]
+    assert client.get_message(message_id).body.startswith("Message 4 body.")
+
+    with client.download_attachment(message_id, attachments[0].id) as file:
+        assert file._rolled  # type: ignore[attr-defined]
+        assert file.read() == report
+    with client.download_attachment(message_id, attachments[1].id) as file:
+        assert not file._rolled  # type: ignore[attr-defined]
+        assert file.read() == b"hi"
+    with pytest.raises(mail_client_api.AttachmentTooLargeError):
+        client.download_attachment(message_id, attachments[0].id, max_bytes=len(report) - 1)
+    with pytest.raises(HttpError) as excinfo:
+        client.download_attachment(message_id, "missing")
+    assert excinfo.value.status_code == 404
+
+
+def test_gmail_batch_endpoint(gmail: GmailStandIn, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    service = _gmail_client(gmail, tmp_path, monkeypatch)._get_service()
+    results: dict[str, Any] = {}
+
+    def _collect(request_id: str, response: Any, exception: Exception | None) -> None:
+        results[request_id] = exception or response["payload"]["headers"]
+
+    batch = BatchHttpRequest(callback=_collect, batch_uri=gmail.base_url + "/batch/gmail/v1")
+    for message_id in [*list(gmail.messages)[:2], "missing"]:
+        batch.add(
+            service.users().messages().get(
+                userId="me", id=message_id, format="metadata", metadataHeaders=["Subject"]
+            ),
+            request_id=message_id,
+        )
+    batch.execute()
+
+    assert gmail.requests == [("POST", "/batch/gmail/v1")]
+    assert [header["name"] for header in results[list(gmail.messages)[0]]] == ["Subject"]
+    assert isinstance(results["missing"], HttpError)
+
+
+def test_gmail_batch_fetches_bodies_in_one_request(
+    gmail: GmailStandIn, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _gmail_client(gmail, tmp_path, monkeypatch)
+    monkeypatch.setattr(gmail_impl, "BATCH_SIZE", 2)
+
+    message_ids = client.list_message_ids(max_results=3)
+    messages = client.get_messages_by_id([message_ids[0], "missing", *message_ids[1:]])
+
+    assert [message.id for message in messages] == message_ids
+    assert messages[0].body.startswith("Message 4 body.")
+    assert gmail.requests == [("GET", "/gmail/v1/users/me/messages")] + [("POST", "/batch/gmail/v1")] * 2
+
+
+def test_gmail_batch_retries_failed_items_once(
+    gmail: GmailStandIn, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _gmail_client(gmail, tmp_path, monkeypatch)
+    message_ids = client.list_message_ids(max_results=3)
+    flaky = message_ids[1]
+    batch_part = gmail._batch_part
+
+    def _failing_part(text: str) -> Response:
+        if f"/messages/{flaky}" in text:
+            return Response(status=500, body={"error": {"code": 500, "message": "backendError"}})
+        return batch_part(text)
+
+    monkeypatch.setattr(gmail, "_batch_part", _failing_part)
+
+    messages = client.get_messages_by_id(message_ids)
+
+    assert [message.id for message in messages] == message_ids
+    assert gmail.requests[-2:] == [("POST", "/batch/gmail/v1"), ("GET", f"/gmail/v1/users/me/messages/{flaky}")]
+
+
+def test_gmail_polls_new_inbox_mail_from_history(
+    gmail: GmailStandIn, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _gmail_client(gmail, tmp_path, monkeypatch)
+    monkeypatch.setattr(gmail_impl, "HISTORY_PAGE_SIZE", 2)
+
+    assert client.poll_new_message_ids() == []
+    delivered = gmail.deliver(3)
+    client.mark_as_read(delivered[0])
+
+    # Without a commit the cursor stays put, so the same mail comes back.
+    assert client.fetch_new_message_ids()[0] == delivered
+    assert client.poll_new_message_ids() == delivered
+    assert client.poll_new_message_ids() == []
+    monkeypatch.setenv("GMAIL_TOKEN_DB_PATH", str(tmp_path / "tokens.sqlite"))
+    assert gmail_impl.get_linked_user_ids_impl() == ["u1"]
+
+
+def test_gmail_quota_errors(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    with GmailStandIn(Knobs(rate_limit_rate=1.0), mailbox_size=1) as server:
+        client = _gmail_client(server, tmp_path, monkeypatch)  # type: ignore[arg-type]
+        with pytest.raises(HttpError) as excinfo:
+            client.mark_as_read("anything")
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.error_details[0]["reason"] == "rateLimitExceeded"
+
+
+def test_discord_client_retries_stand_in_rate_limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "token")
+    with DiscordStandIn(bucket_limit=2, bucket_window=0.2) as server:
+        client = DiscordClient({"api_base_url": f"{server.base_url}/api/v10"})
+        created = [client.create_message("42", f"hello {index}") for index in range(3)]
+        assert client.edit_message("42", created[0].id, "edited")
+        assert client.get_message("42", created[0].id).content == "edited"
+        dm_channel = client.open_direct_channel("7")
+        assert client.open_direct_channel("7") == dm_channel
+
+    assert server.status_counts[429] >= 1
+    assert [message.content for message in created] == ["hello 0", "hello 1", "hello 2"]
+
+
+def test_discord_uploads_files_as_multipart(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "token")
+    report = tmp_path / "report.pdf"
+    report.write_bytes(bytes(range(256)) * 400)
+    with DiscordStandIn(bucket_limit=1, bucket_window=0.1) as server:
+        client = DiscordClient({"api_base_url": f"{server.base_url}/api/v10"})
+        client.create_message("42", "first")
+        with report.open("rb") as file:
+            # The bucket is spent, so the upload is retried after a 429 and must rewind.
+            posted = client.send_file("42", file, "report.pdf", "Here it is")
+
+    assert server.status_counts[429] >= 1
+    assert posted.content == "Here it is"
+    assert server.uploads[posted.id] == {"report.pdf": report.read_bytes()}  # type: ignore[attr-defined]
+
+
+@pytest.mark.asyncio
+async def test_claude_client_runs_against_stand_in(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    with AnthropicStandIn(reply_text="streamed words here") as server:
+        client = ClaudeClient(async_client=create_async_client(base_url=server.base_url))
+        command = await client.generate_response_async("any new mail?", response_schema=_SCHEMA)
+        chat = await client.generate_response_async("hi!", response_schema=_SCHEMA)
+        streamed = [chunk async for chunk in client.stream_response("hi!")]
+
+    assert command == {"action": "get_messages", "max_results": 10}
+    assert chat == {"action": "reply", "reply": "reply to hi!"}
+    assert "".join(streamed).split() == ["streamed", "words", "here"]
+
+
+def test_stand_in_injects_server_errors() -> None:
+    with AnthropicStandIn(Knobs(Latency(error_rate=1.0))) as server:
+        response = httpx.post(f"{server.base_url}/v1/messages", json={"messages": []})
+    assert response.status_code == 529
+    assert response.json()["error"]["type"] == "overloaded_error"